@@ -4,11 +4,21 @@ import json
 import toml
 import time
 import argparse
-from web3 import Web3
+import threading
 from mnemonic import Mnemonic
 from dotenv import load_dotenv
 from prettytable import PrettyTable
+from eth_account import Account
 from eth_account.messages import encode_defunct
+from concurrent.futures import ThreadPoolExecutor
+
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+BINDING_CACHE_FILE = 'binding_cache.json'
+
+# Signatures are over "{reward_wallet}-{hourly_time}", so they only change once per hour
+SIGNATURE_PERIOD = 3600
+# Seconds before the hour boundary from which the next hour's signature is computed
+SIGNATURE_PRECOMPUTE_WINDOW = 300
 
 class WalletGenerator:
     def __init__(self, config_file, abi_file):
@@ -16,16 +26,54 @@ class WalletGenerator:
         
         with open(config_file, 'r') as file:
             config = toml.load(file)
-            rpc_url = config['contract']['rpc']
-            contract_address = config['contract']['address']
+            self.rpc_url = config['contract']['rpc']
+            self.contract_address = config['contract']['address']
+            # Seconds for which a verified on-chain binding is trusted without another RPC
+            self.binding_cache_ttl = config['contract'].get('binding_cache_ttl', 86400)
             self.keys_dir = os.path.expanduser(config['storage']['keys_dir'])
-                
-        with open(abi_file, 'r') as file:
-            contract_abi = json.load(file)
+        self.abi_file = abi_file
         
         os.makedirs(self.keys_dir, exist_ok=True)
-        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
-        self.contract = self.w3.eth.contract(address=contract_address, abi=contract_abi)
+        # The Web3 provider and contract are only built on the first on-chain lookup
+        self._w3 = None
+        self._contract = None
+        self._web3_lock = threading.Lock()
+
+        # Identity keys derived once per reward wallet, and signatures keyed by (reward wallet, hour)
+        self._identity_keys = {}
+        self._signatures = {}
+        self._signature_lock = threading.Lock()
+        self._presigning = set()
+
+    def __getstate__(self):
+        # Locks and the Web3 provider are not picklable; they are rebuilt on demand
+        state = self.__dict__.copy()
+        state.update(_w3=None, _contract=None, _web3_lock=None, _signature_lock=None, _presigning=set())
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._web3_lock = threading.Lock()
+        self._signature_lock = threading.Lock()
+
+    @property
+    def w3(self):
+        with self._web3_lock:
+            if self._w3 is None:
+                # web3 is slow to import, and signing only needs eth_account
+                from web3 import Web3
+                self._w3 = Web3(Web3.HTTPProvider(self.rpc_url))
+            return self._w3
+
+    @property
+    def contract(self):
+        w3 = self.w3
+        with self._web3_lock:
+            if self._contract is None:
+                with open(self.abi_file, 'r') as file:
+                    contract_abi = json.load(file)
+                self._contract = w3.eth.contract(address=self.contract_address, abi=contract_abi)
+            return self._contract
 
     def print_table(self, data):
         table = PrettyTable()
@@ -48,10 +96,47 @@ class WalletGenerator:
                 print("Invalid input. Please type 'yes' (or 'y') or 'no' (or 'n').")
 
     def fetch_iw_address(self, rw_address):
-        return self.contract.functions.identityAddress(Web3.to_checksum_address(rw_address)).call()
+        contract = self.contract
+        return contract.functions.identityAddress(self.w3.to_checksum_address(rw_address)).call()
 
     def is_bind(self, rw_address):
-        return '0x0000000000000000000000000000000000000000' != self.fetch_iw_address(rw_address)
+        return ZERO_ADDRESS != self.fetch_iw_address(rw_address)
+
+    def _binding_cache_path(self):
+        return os.path.join(self.keys_dir, BINDING_CACHE_FILE)
+
+    def read_binding_cache(self):
+        """
+        Returns the verified bindings {reward_wallet: identity_address} that are younger than
+        binding_cache_ttl.
+        """
+        try:
+            with open(self._binding_cache_path(), 'r') as file:
+                cache = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        now = time.time()
+        return {
+            rw_address: entry['identity_address']
+            for rw_address, entry in cache.items()
+            if now - entry.get('checked_at', 0) < self.binding_cache_ttl
+        }
+
+    def write_binding_cache(self, bindings):
+        """Records verified bindings {reward_wallet: identity_address} in the binding cache."""
+        try:
+            with open(self._binding_cache_path(), 'r') as file:
+                cache = json.load(file)
+        except (OSError, ValueError):
+            cache = {}
+        now = time.time()
+        for rw_address, iw_address in bindings.items():
+            cache[rw_address] = {'identity_address': iw_address.lower(), 'checked_at': now}
+        # Write to a temporary file first so concurrently starting processes never read a partial file
+        temp_path = f"{self._binding_cache_path()}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump(cache, file)
+        os.replace(temp_path, self._binding_cache_path())
 
     def read_wallet_file(self, file_path):
         with open(file_path, 'r') as file:
@@ -81,8 +166,8 @@ class WalletGenerator:
                         print(f"\033[1mMiner ID: {miner_id}\033[0m - No binding identity wallet, generating one...")
                         mnemo = Mnemonic("english")
                         seed_phrase = mnemo.generate(strength=128)
-                        self.w3.eth.account.enable_unaudited_hdwallet_features()
-                        account = self.w3.eth.account.from_mnemonic(seed_phrase)
+                        Account.enable_unaudited_hdwallet_features()
+                        account = Account.from_mnemonic(seed_phrase)
                         iw_address = account.address
                         self.write_wallet_file(file_path, seed_phrase, iw_address)
 
@@ -93,8 +178,8 @@ class WalletGenerator:
                         print(f"\033[1mMiner ID: {miner_id}\033[0m - Binding identity wallet found yet text file missing...")
                         print("Please import the seed phrase for the Identity Wallet.")
                         seed_phrase = input("Seed Phrase: ")
-                        self.w3.eth.account.enable_unaudited_hdwallet_features()
-                        account = self.w3.eth.account.from_mnemonic(seed_phrase)
+                        Account.enable_unaudited_hdwallet_features()
+                        account = Account.from_mnemonic(seed_phrase)
                         imported_iw_address = account.address
 
                         bind_iw_address = self.fetch_iw_address(rw_address)
@@ -102,7 +187,7 @@ class WalletGenerator:
                             print("Imported Identity Wallet address does not match the bind address.")
                             print("Please try again with the correct seed phrase.")
                             seed_phrase = input("Seed Phrase: ")
-                            account = self.w3.eth.account.from_mnemonic(seed_phrase)
+                            account = Account.from_mnemonic(seed_phrase)
                             imported_iw_address = account.address
 
                         self.write_wallet_file(file_path, seed_phrase, imported_iw_address)
@@ -127,6 +212,7 @@ class WalletGenerator:
 
     def validate_miner_keys(self, miner_ids):
         # miner_id may be composite address, e.g., miner_id = 0x1234-GPUNAME"
+        wallets = {}
         for miner_id in miner_ids:
             reward_wallet = miner_id.split('-')[0].lower()  # Extract the address
             file_path = os.path.join(self.keys_dir, f'{reward_wallet}.txt')
@@ -136,33 +222,98 @@ class WalletGenerator:
                 raise ValueError(f"Identity wallet file not found in ~/.heurist-keys for Reward Wallet {reward_wallet}. Run `python3 auth/generator.py` to generate the identity wallet.")
 
             seed_phrase, iw_address = self.read_wallet_file(file_path)
+            wallets[reward_wallet] = iw_address
+
+        # Bindings verified within binding_cache_ttl are trusted; the rest are looked up
+        # concurrently, with a single RPC per reward wallet
+        cached_bindings = self.read_binding_cache()
+        bind_iw_addresses = {
+            reward_wallet: cached_bindings[reward_wallet]
+            for reward_wallet, iw_address in wallets.items()
+            if cached_bindings.get(reward_wallet) == iw_address.lower()
+        }
+        to_fetch = [reward_wallet for reward_wallet in wallets if reward_wallet not in bind_iw_addresses]
+        if to_fetch:
+            with ThreadPoolExecutor(max_workers=len(to_fetch)) as executor:
+                bind_iw_addresses.update(zip(to_fetch, executor.map(self.fetch_iw_address, to_fetch)))
 
-            if not self.is_bind(reward_wallet):
+        verified = {}
+        for miner_id in miner_ids:
+            reward_wallet = miner_id.split('-')[0].lower()
+            iw_address = wallets[reward_wallet]
+            bind_iw_address = bind_iw_addresses[reward_wallet]
+
+            if bind_iw_address == ZERO_ADDRESS:
                 print(f"Warning: Identity wallet binding is not established for Reward Wallet {reward_wallet}. The binding will be effective after completion of some compute jobs.")
             else:
-                bind_iw_address = self.fetch_iw_address(reward_wallet)
                 if iw_address.lower() != bind_iw_address.lower():
                     print(f"ERROR: Identity wallet mismatch found for Reward Wallet {reward_wallet}. Exiting...")
                     raise ValueError(f"Identity wallet mismatch found for Reward Wallet {reward_wallet}.")
+                if reward_wallet in to_fetch:
+                    verified[reward_wallet] = bind_iw_address
 
             print(f"MINER ID {miner_id} authenticated. Proceed to mining.")
 
+        if verified:
+            try:
+                self.write_binding_cache(verified)
+            except OSError as e:
+                print(f"Warning: Failed to write the identity wallet binding cache: {e}")
+
+    def _identity_key(self, reward_wallet):
+        # Reading the wallet file and deriving the key from the seed phrase (PBKDF2 + BIP32) is
+        # slow, so it happens once per reward wallet and process
+        identity = self._identity_keys.get(reward_wallet)
+        if identity is None:
+            file_path = os.path.join(self.keys_dir, f'{reward_wallet}.txt')
+            seed_phrase, iw_address = self.read_wallet_file(file_path)
+            Account.enable_unaudited_hdwallet_features()
+            private_key = Account.from_mnemonic(seed_phrase).key
+            identity = self._identity_keys[reward_wallet] = (iw_address.lower(), private_key)
+        return identity
+
+    def _sign_hour(self, reward_wallet, hourly_time):
+        key = (reward_wallet, hourly_time)
+        with self._signature_lock:
+            signature = self._signatures.get(key)
+            if signature is None:
+                iw_address, private_key = self._identity_key(reward_wallet)
+                message = f"{reward_wallet}-{hourly_time}" # Always lower case
+                signable_message = encode_defunct(text=message)
+                signature = Account.sign_message(signable_message, private_key=private_key).signature.hex()
+                # Keep only the signatures of the current and the next hour
+                for old_key in [k for k in self._signatures if k[0] == reward_wallet and k[1] < hourly_time - SIGNATURE_PERIOD]:
+                    del self._signatures[old_key]
+                self._signatures[key] = signature
+            return self._identity_keys[reward_wallet][0], signature
+
+    def warm_signatures(self, miner_ids):
+        """
+        Derives the identity keys and signs the current and the next hour for the given miner
+        IDs, so that no job submission pays the key derivation.
+        """
+        current_time_secs = int(time.time())
+        hourly_time = current_time_secs - (current_time_secs % SIGNATURE_PERIOD)
+        for miner_id in miner_ids:
+            reward_wallet = miner_id.split('-')[0].lower()
+            self._sign_hour(reward_wallet, hourly_time)
+            self._sign_hour(reward_wallet, hourly_time + SIGNATURE_PERIOD)
+
     def generate_signature(self, miner_id):
         reward_wallet = miner_id.split('-')[0].lower()  # Extract the address
-        file_path = os.path.join(self.keys_dir, f'{reward_wallet}.txt')
-        seed_phrase, iw_address = self.read_wallet_file(file_path)
-        
-        self.w3.eth.account.enable_unaudited_hdwallet_features()
-        private_key = self.w3.eth.account.from_mnemonic(seed_phrase).key
-        
+
         current_time_secs = int(time.time())
-        hourly_time = current_time_secs - (current_time_secs % 3600)  # Unix Timestamp Round down to the nearest hour
-        
-        message = f"{reward_wallet}-{hourly_time}" # Always lower case
-        signable_message = encode_defunct(text=message)
-        signature = self.w3.eth.account.sign_message(signable_message, private_key=private_key)
-        
-        return iw_address.lower(), signature.signature.hex()
+        hourly_time = current_time_secs - (current_time_secs % SIGNATURE_PERIOD)  # Unix Timestamp Round down to the nearest hour
+        iw_address, signature = self._sign_hour(reward_wallet, hourly_time)
+
+        # Sign the next hour ahead of the boundary in the background
+        next_hour = hourly_time + SIGNATURE_PERIOD
+        next_key = (reward_wallet, next_hour)
+        if next_hour - current_time_secs <= SIGNATURE_PRECOMPUTE_WINDOW and next_key not in self._signatures and next_key not in self._presigning:
+            self._presigning.add(next_key)
+            threading.Thread(target=self._sign_hour, args=(reward_wallet, next_hour), daemon=True).start()
+
+        return iw_address, signature
     
     def create_new_identity_wallet(self, miner_id):
         file_path = f'{miner_id}.txt'
@@ -172,8 +323,8 @@ class WalletGenerator:
 
         mnemo = Mnemonic("english")
         seed_phrase = mnemo.generate(strength=128)
-        self.w3.eth.account.enable_unaudited_hdwallet_features()
-        account = self.w3.eth.account.from_mnemonic(seed_phrase)
+        Account.enable_unaudited_hdwallet_features()
+        account = Account.from_mnemonic(seed_phrase)
         iw_address = account.address
         self.write_wallet_file(file_path, seed_phrase, iw_address)
 
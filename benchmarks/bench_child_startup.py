@@ -0,0 +1,67 @@
+"""
+Benchmark of child process start latency and memory with spawn and with forkserver.
+
+Starts --children processes through ChildLauncher with each start method. Every child
+imports --imports (modules that are not installed are skipped) and reports the seconds from
+Process.start() until its imports are done, and its RSS and PSS. With forkserver the
+--preload modules are imported once by the server process, so the children find them
+loaded and share their pages.
+
+    python benchmarks/bench_child_startup.py --children 4 --imports openai httpx requests web3
+"""
+import os
+import sys
+import time
+import argparse
+import importlib
+import statistics
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mining_common.launcher import ChildLauncher, process_memory
+
+DEFAULT_IMPORTS = ["openai", "httpx", "requests", "boto3", "web3", "eth_account", "toml"]
+
+def child(launched_at, imports, results):
+    loaded = []
+    for name in imports:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except ImportError:
+            pass
+    ready = time.time() - launched_at
+    rss, pss = process_memory()
+    results.put((ready, rss, pss, loaded))
+
+def run(start_method, preload, imports, children):
+    launcher = ChildLauncher(start_method, preload).configure()
+    results = multiprocessing.Queue()
+    if start_method == "forkserver":
+        # Start the server outside of the measurement, as the miners do before their first child
+        launcher.start("warmup", child, (time.time(), [], results)).join()
+        results.get()
+    processes = [launcher.start("bench", child, (time.time(), imports, results)) for _ in range(children)]
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return samples
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Child start latency and memory with spawn and forkserver.")
+    parser.add_argument("--children", type=int, default=4)
+    parser.add_argument("--imports", nargs="+", default=DEFAULT_IMPORTS)
+    parser.add_argument("--preload", nargs="+", default=None, help="Modules the forkserver preloads (default: --imports)")
+    args = parser.parse_args()
+    preload = args.preload if args.preload is not None else args.imports
+
+    print(f"{'method':<11} {'p50 start s':>11} {'max start s':>11} {'RSS MiB':>8} {'PSS MiB':>8}")
+    for start_method in ("spawn", "forkserver"):
+        samples = run(start_method, preload, args.imports, args.children)
+        starts = [sample[0] for sample in samples]
+        rss = statistics.mean(sample[1] for sample in samples) / 2**20
+        pss_values = [sample[2] for sample in samples if sample[2] is not None]
+        pss = f"{statistics.mean(pss_values) / 2**20:.1f}" if pss_values else "-"
+        print(f"{start_method:<11} {statistics.median(starts):>11.3f} {max(starts):>11.3f} {rss:>8.1f} {pss:>8}")
+    print(f"imported: {', '.join(samples[0][3]) or 'none'}")
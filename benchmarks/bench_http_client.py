@@ -0,0 +1,69 @@
+"""
+Benchmark of the per-request HTTP overhead of the miners against the local sequencer.
+
+Posts --requests small /miner_submit bodies to the local sequencer stand-in in this
+directory, addressed by --host so name resolution counts, with:
+
+  - bare requests.post, a new connection per request (previously the SD submissions),
+  - a new requests.Session per request (previously the LLM stream submissions),
+  - a session of HTTPClientFactory, with keep-alive connections and cached DNS lookups.
+
+With --threads N the requests are sent from N threads sharing one session, as the asyncio
+engine's job slots and the prefetch threads do.
+
+    python benchmarks/bench_http_client.py --requests 1000 --threads 4
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from mining_common.http_client import HTTPClientFactory
+from local_sequencer import start_local_sequencer
+
+BODY = {"miner_id": "0x0", "job_id": "bench", "result": {"Text": "ok"}}
+
+def fresh_session_post(url):
+    with requests.Session() as session:
+        return session.post(url, json=BODY, timeout=30)
+
+def measure(label, post, url, count, threads):
+    def timed(_):
+        start = time.perf_counter()
+        post(url).raise_for_status()
+        return time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = sorted(executor.map(timed, range(count)))
+    elapsed = time.perf_counter() - started
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<26} mean {statistics.mean(latencies) * 1000:7.3f} ms  p50 {statistics.median(latencies) * 1000:7.3f} ms  "
+          f"p99 {p99 * 1000:7.3f} ms  {count / elapsed:8.0f} req/s")
+    return statistics.mean(latencies)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-request HTTP overhead: bare requests vs HTTPClientFactory.")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--host", default="localhost", help="Hostname the requests are sent to")
+    args = parser.parse_args()
+
+    sequencer, _ = start_local_sequencer()
+    url = f"http://{args.host}:{sequencer.server_address[1]}/miner_submit"
+    session = HTTPClientFactory(pool_size=args.threads).session()
+
+    # Warm up imports, the server threads and the pooled connections
+    for post in (lambda url: requests.post(url, json=BODY, timeout=30), lambda url: session.post(url, json=BODY)):
+        post(url).raise_for_status()
+
+    bare = measure("bare requests.post", lambda url: requests.post(url, json=BODY, timeout=30), url, args.requests, args.threads)
+    measure("new session per request", fresh_session_post, url, args.requests, args.threads)
+    pooled = measure("HTTPClientFactory session", lambda url: session.post(url, json=BODY), url, args.requests, args.threads)
+    print(f"Per-request overhead saved: {(bare - pooled) * 1000:.3f} ms ({bare / pooled:.2f}x)")
+    sequencer.shutdown()
@@ -0,0 +1,252 @@
+"""
+End-to-end benchmark of the LLM miner: replays a JSONL job trace through the real
+generate() path of llm-miner.py (or the asyncio engine) against a local vLLM server or
+the mock server in this directory, with the results submitted to a local SubmitSink.
+
+Every trace line is a job as returned by /miner_request, e.g.
+
+    {"job_id": "j1", "model_id": "mock-model", "model_input": {"LLM": {"prompt": "[{\\"role\\": ...}]",
+     "temperature": 0.7, "max_tokens": 256, "seed": -1, "use_stream": true, "tools": "[...]", "extra_body": "{...}"}}}
+
+Reports time-to-first-token (as seen by the sequencer, streaming jobs only), output
+tokens/s (from vllm:generation_tokens_total), p50/p95/p99 end-to-end latency, submit
+overhead and the deadline-miss rate at the given concurrency.
+
+    python benchmarks/bench_llm_miner.py --mock --trace benchmarks/traces/sample_llm_trace.jsonl --concurrency 8 --jobs 200
+    python benchmarks/bench_llm_miner.py --target http://127.0.0.1:8000 --model dolphin-2.9-llama3-8b --trace my_trace.jsonl
+    python benchmarks/bench_llm_miner.py --write-sample-trace trace.jsonl --jobs 100
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import importlib.util
+import urllib.request
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from mining_common.config_snapshot import ConfigSnapshot
+from llm_mining_core.utils import load_config, get_config_path
+from llm_mining_core.utils.job_utils import extract_job_params
+from llm_mining_core.utils.metrics_utils import parse_prometheus_metrics
+from mock_openai_server import start_mock_server
+from submit_sink import start_submit_sink
+
+MINER_ID = "0x0000000000000000000000000000000000000000-bench"
+PROMPTS = [
+    "What is the capital of France?",
+    "Write a short poem about the ocean.",
+    "Explain how a hash map works in two paragraphs.",
+    "Summarize the plot of Hamlet.",
+]
+TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": "get_weather",
+        "description": "Get the current weather for a city",
+        "parameters": {"type": "object", "properties": {"city": {"type": "string"}}, "required": ["city"]},
+    },
+}]
+
+def load_llm_miner():
+    # llm-miner.py is not an importable module name
+    spec = importlib.util.spec_from_file_location("llm_miner", os.path.join(REPO_ROOT, "llm-miner.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def make_job(job_id, model_id, stream, tools=False, extra_body=False, max_tokens=256):
+    llm_input = {
+        "prompt": json.dumps([
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": random.choice(PROMPTS)},
+        ]),
+        "temperature": 0.7,
+        "max_tokens": max_tokens,
+        "seed": -1,
+        "use_stream": stream,
+    }
+    if tools:
+        llm_input["tools"] = json.dumps(TOOLS)
+    if extra_body:
+        llm_input["extra_body"] = json.dumps({"top_k": 40, "repetition_penalty": 1.05})
+    return {"job_id": str(job_id), "model_id": model_id, "model_input": {"LLM": llm_input}}
+
+def write_sample_trace(path, num_jobs, model_id):
+    """Writes a synthetic trace mixing streaming, non-streaming, tool and extra_body jobs."""
+    with open(path, "w") as file:
+        for i in range(num_jobs):
+            kind = i % 4
+            job = make_job(
+                f"trace-{i}", model_id,
+                stream=kind in (0, 1),
+                tools=kind == 2,
+                extra_body=kind in (1, 3),
+                max_tokens=random.choice([64, 128, 256, 512]),
+            )
+            file.write(json.dumps(job) + "\n")
+
+def load_trace(path, num_jobs=None, model_id=None):
+    with open(path) as file:
+        trace = [json.loads(line) for line in file if line.strip()]
+    if not trace:
+        raise ValueError(f"Trace {path} is empty")
+    num_jobs = num_jobs or len(trace)
+    jobs = []
+    for i in range(num_jobs):
+        job = json.loads(json.dumps(trace[i % len(trace)]))
+        # Job IDs must be unique per run for the sink to tell the results apart
+        job["job_id"] = f"{job['job_id']}-{i}"
+        if model_id:
+            job["model_id"] = model_id
+        jobs.append(job)
+    return jobs
+
+def build_config(target_url, served_model_name, sink_url):
+    """
+    Builds the miner configuration for the benchmark from config.toml, pointed at the target
+    server and the submit sink, with signatures disabled.
+    """
+    target = urlparse(target_url)
+    config_file = get_config_path()
+    snapshot = ConfigSnapshot.capture(config_file, argv=[
+        "llm-miner.py", served_model_name, "None", served_model_name, "0.9", "None", "0",
+        str(target.port), os.environ.get("CUDA_VISIBLE_DEVICES", "0"), "true", "None",
+    ])
+    config = json.loads(json.dumps(snapshot.config))
+    config["service"]["base_url"] = sink_url
+    config["service"]["llm_url"] = f"{target.scheme}://{target.hostname}"
+    return load_config(snapshot=ConfigSnapshot(config_file, config, snapshot.argv))
+
+def generation_tokens(target_url):
+    try:
+        with urllib.request.urlopen(f"{target_url}/metrics", timeout=5) as response:
+            metrics = parse_prometheus_metrics(response.read().decode())
+        return metrics["gauges"].get("generation_tokens_total")
+    except OSError:
+        return None
+
+def run_sync(llm_miner, base_config, server_config, jobs, concurrency):
+    def run_job(job):
+        params = extract_job_params(job, base_config)
+        start = time.time()
+        llm_miner.generate(base_config, server_config, MINER_ID, request_latency=0.0, **params)
+        return job["job_id"], start, time.time()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(run_job, jobs))
+
+def run_async(base_config, server_config, jobs, concurrency):
+    import httpx
+    from llm_mining_core.engine import AsyncJobEngine
+
+    async def run():
+        engine = AsyncJobEngine(base_config, server_config, MINER_ID, None, None)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_job(job):
+            async with semaphore:
+                params = extract_job_params(job, base_config)
+                start = time.time()
+                await engine.generate(request_latency=0.0, **params)
+                return job["job_id"], start, time.time()
+
+        timeout = httpx.Timeout(base_config.llm_timeout_seconds, connect=10.0)
+        async with httpx.AsyncClient(timeout=timeout) as http:
+            engine.http = http
+            return await asyncio.gather(*(run_job(job) for job in jobs))
+
+    return asyncio.run(run())
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+def summarize(label, values, unit="ms", scale=1000):
+    if not values:
+        print(f"{label:<22} n/a")
+        return
+    print(f"{label:<22} p50 {percentile(values, 50) * scale:9.1f} {unit}  p95 {percentile(values, 95) * scale:9.1f} {unit}  "
+          f"p99 {percentile(values, 99) * scale:9.1f} {unit}  (n={len(values)})")
+
+def report(results, sink, deadline, wall_time, tokens):
+    end_to_end, ttft, submit_overhead = [], [], []
+    missed = 0
+    for job_id, start, end in results:
+        submission = sink.get(job_id)
+        latency = end - start
+        end_to_end.append(latency)
+        if not submission or latency > deadline:
+            missed += 1
+            continue
+        if submission.get("stream"):
+            ttft.append(submission["first_byte_at"] - start)
+            submit_overhead.append(end - submission["completed_at"])
+        else:
+            submit_overhead.append(end - submission["started_at"])
+
+    print(f"{'jobs':<22} {len(results)} in {wall_time:.2f}s ({len(results) / wall_time:.2f} jobs/s)")
+    if tokens is not None:
+        print(f"{'output tokens/s':<22} {tokens / wall_time:.1f} ({int(tokens)} tokens)")
+    else:
+        print(f"{'output tokens/s':<22} n/a (no vllm:generation_tokens_total on the target)")
+    summarize("end-to-end latency", end_to_end)
+    summarize("TTFT (streaming)", ttft)
+    summarize("submit overhead", submit_overhead)
+    print(f"{'deadline misses':<22} {missed}/{len(results)} ({missed / len(results):.1%}) at a {deadline:.0f}s deadline")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a job trace through the LLM miner's generate() path.")
+    parser.add_argument("--trace", help="JSONL file of /miner_request jobs")
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="vLLM server URL (without /v1)")
+    parser.add_argument("--mock", action="store_true", help="Start the mock OpenAI server as the target")
+    parser.add_argument("--mock-ttft", type=float, default=0.05)
+    parser.add_argument("--mock-tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--model", default=None, help="Served model name; overrides the model_id of the trace jobs")
+    parser.add_argument("--engine", choices=["process", "asyncio"], default="process",
+                        help="Replay through generate() in llm-miner.py or through the asyncio engine")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--jobs", type=int, help="Number of jobs to replay, cycling through the trace (default: the trace length)")
+    parser.add_argument("--deadline", type=float, help="Deadline in seconds (default: llm_timeout_seconds)")
+    parser.add_argument("--write-sample-trace", metavar="PATH", help="Write a synthetic trace to PATH and exit")
+    args = parser.parse_args()
+
+    if args.write_sample_trace:
+        write_sample_trace(args.write_sample_trace, args.jobs or 100, args.model or "mock-model")
+        print(f"Wrote {args.jobs or 100} jobs to {args.write_sample_trace}")
+        sys.exit(0)
+    if not args.trace:
+        parser.error("--trace is required")
+
+    jobs = load_trace(args.trace, args.jobs, args.model)
+    served_model_name = args.model or jobs[0]["model_id"]
+    target = args.target
+    if args.mock:
+        mock, api_url = start_mock_server(model=served_model_name, ttft=args.mock_ttft, tokens_per_second=args.mock_tokens_per_second)
+        target = api_url[:-len("/v1")]
+    sink, sink_url = start_submit_sink()
+
+    base_config, server_config = build_config(target, served_model_name, sink_url)
+    deadline = args.deadline or base_config.llm_timeout_seconds
+    llm_miner = load_llm_miner() if args.engine == "process" else None
+
+    tokens_before = generation_tokens(target)
+    start = time.time()
+    if args.engine == "asyncio":
+        results = run_async(base_config, server_config, jobs, args.concurrency)
+    else:
+        results = run_sync(llm_miner, base_config, server_config, jobs, args.concurrency)
+    wall_time = time.time() - start
+    tokens_after = generation_tokens(target)
+    tokens = tokens_after - tokens_before if tokens_before is not None and tokens_after is not None else None
+
+    print(f"Replayed {args.trace} against {target} with the {args.engine} engine at concurrency {args.concurrency}")
+    report(results, sink, deadline, wall_time, tokens)
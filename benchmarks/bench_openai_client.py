@@ -0,0 +1,54 @@
+"""
+Microbenchmark of the per-job OpenAI client overhead in the LLM miner.
+
+Compares building a fresh OpenAI client for every job (the previous initialize_client()
+behaviour) with the pooled client from OpenAIClientManager, against the mock server in
+this directory so only client construction and connection setup are measured.
+
+    python benchmarks/bench_openai_client.py --jobs 500
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+from llm_mining_core.config.client import OpenAIClientManager
+from mock_openai_server import start_mock_server
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+def run_job(client, model):
+    client.chat.completions.create(messages=MESSAGES, model=model, max_tokens=1)
+
+def measure(label, get_client, model, jobs):
+    latencies = []
+    for _ in range(jobs):
+        start = time.perf_counter()
+        run_job(get_client(), model)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<28} mean {statistics.mean(latencies) * 1000:7.3f} ms  p50 {statistics.median(latencies) * 1000:7.3f} ms  p99 {p99 * 1000:7.3f} ms")
+    return statistics.mean(latencies)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-job OpenAI client overhead: fresh client vs pooled client.")
+    parser.add_argument("--jobs", type=int, default=300)
+    args = parser.parse_args()
+
+    model = "mock-model"
+    server, base_url = start_mock_server(model=model, response_tokens=1)
+    manager = OpenAIClientManager()
+
+    # Warm up both paths so imports and the first connection are not counted
+    run_job(OpenAI(base_url=base_url, api_key="N/A"), model)
+    run_job(manager.get_client(base_url), model)
+
+    fresh = measure("fresh client per job", lambda: OpenAI(base_url=base_url, api_key="N/A"), model, args.jobs)
+    pooled = measure("pooled client (manager)", lambda: manager.get_client(base_url), model, args.jobs)
+    print(f"Per-job overhead saved: {(fresh - pooled) * 1000:.3f} ms ({fresh / pooled:.2f}x)")
+    server.shutdown()
@@ -0,0 +1,108 @@
+"""
+Benchmark of building the /miner_submit body of non-streaming LLM jobs from large responses.
+
+Compares the previous path, which builds the OpenAI client's ChatCompletion from the
+response, rebuilds it from model_dump(), dumps every choice into the Text field with
+json.dumps and lets requests encode the payload again, with the raw-bytes path of
+result_utils: one decode of the vLLM body and one encode of the submit body, with the
+standard json module and with orjson if it is installed.
+
+    python benchmarks/bench_result_encoding.py --tokens 1000 4000 16000 --tool-calls 8 32
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_mining_core.utils import result_utils
+
+WORDS = ["the", "quick", "brown", "fox", "jumps", "über", "the", "lazy", "dog", "\"quoted\"", "naïve", "line\n"]
+
+def make_response(num_tokens=0, num_tool_calls=0):
+    content = " ".join(WORDS[i % len(WORDS)] for i in range(num_tokens)) or None
+    tool_calls = [
+        {
+            "id": f"chatcmpl-tool-{i}",
+            "type": "function",
+            "function": {
+                "name": f"lookup_{i}",
+                "arguments": json.dumps({"query": " ".join(WORDS) * 8, "filters": {"ids": list(range(64))}}),
+            },
+        }
+        for i in range(num_tool_calls)
+    ]
+    completion = {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "bench-model",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content, "tool_calls": tool_calls},
+            "logprobs": None,
+            "finish_reason": "tool_calls" if tool_calls else "length",
+            "stop_reason": None,
+        }],
+        "usage": {"prompt_tokens": 100, "total_tokens": 100 + num_tokens, "completion_tokens": num_tokens},
+    }
+    return json.dumps(completion).encode()
+
+def legacy_submit_body(content):
+    from openai.types.chat import ChatCompletion
+    # What the client's create() returned: the decoded body constructed into its models
+    response = ChatCompletion.construct(**json.loads(content))
+    chat_completion = ChatCompletion(**response.model_dump())
+    result = {
+        "miner_id": "0xminer",
+        "job_id": "job",
+        "result": {"Text": json.dumps([choice.model_dump() for choice in chat_completion.choices])},
+        "request_latency": 0.1,
+        "inference_latency": 1.0,
+    }
+    # requests' json= encoding
+    return json.dumps(result, allow_nan=False).encode("utf-8")
+
+def fast_submit_body(content):
+    choices, _ = result_utils.parse_chat_completion(content)
+    return result_utils.encode_submit_result("0xminer", "job", choices, 0.1, 1.0)
+
+def time_path(build, content, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cost of building /miner_submit bodies of non-streaming jobs.")
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1000, 4000, 16000])
+    parser.add_argument("--tool-calls", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        import openai  # noqa: F401
+        has_openai = True
+    except ImportError:
+        has_openai = False
+        print("openai is not installed, skipping the legacy path")
+    orjson = result_utils.orjson
+    if orjson is None:
+        print("orjson is not installed, skipping the orjson path")
+
+    cases = [(f"text {n}", make_response(num_tokens=n)) for n in args.tokens]
+    cases += [(f"tools {n}", make_response(num_tool_calls=n)) for n in args.tool_calls]
+
+    print(f"{'response':<12} {'KiB':>7} {'legacy ms':>10} {'json ms':>8} {'orjson ms':>10}")
+    for label, content in cases:
+        legacy = time_path(legacy_submit_body, content, args.repeat) if has_openai else None
+        result_utils.orjson = None
+        stdlib = time_path(fast_submit_body, content, args.repeat)
+        result_utils.orjson = orjson
+        fast = time_path(fast_submit_body, content, args.repeat) if orjson is not None else None
+        columns = [f"{value * 1000:.2f}" if value is not None else "-" for value in (legacy, stdlib, fast)]
+        print(f"{label:<12} {len(content) / 1024:>7.1f} {columns[0]:>10} {columns[1]:>8} {columns[2]:>10}")
@@ -0,0 +1,78 @@
+"""
+Benchmark of the streaming relay's stop-word handling on long streams.
+
+Compares the previous generate_data() loop, which re-splits the whole buffer and scans it
+for every stop word on each chunk, with StreamRelay, on synthetic streams of prose
+(frequent spaces) and of code-like text without spaces, where the old buffer grows
+with every token.
+
+    python benchmarks/bench_stream_relay.py --tokens 2000 4000 8000 16000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_mining_core.utils.stream_utils import StreamRelay
+
+STOP_WORDS = ["[End]", "[end]", "<|im_start|>", "<|im_end|>"]
+EOS = "[DONE]"
+
+def legacy_generate_data(stream, stop, eos):
+    buffer = ''
+    for data in stream:
+        buffer += data
+        if ' ' in buffer or '\n' in buffer:
+            words = buffer.split(' ')
+            for word in words[:-1]:
+                yield word + " "
+            buffer = words[-1]
+        if any(word in buffer for word in stop):
+            for word in stop:
+                if word in buffer:
+                    buffer = buffer[:buffer.index(word)]
+                    if buffer:
+                        yield buffer + " "
+                    yield eos
+                    break
+    if buffer:
+        yield buffer + " "
+    yield eos
+
+def relay_generate_data(stream, stop, eos):
+    relay = StreamRelay(stop, eos)
+    for data in stream:
+        yield from relay.feed(data)
+        if relay.finished:
+            break
+    yield from relay.finish()
+
+def make_stream(num_tokens, spaced):
+    if spaced:
+        return [f"word{i % 97} " if i % 3 else f"w{i % 13}" for i in range(num_tokens)]
+    return [f"x{i % 7};" for i in range(num_tokens)]
+
+def time_relay(relay, stream, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pieces = sum(1 for _ in relay(iter(stream), STOP_WORDS, EOS))
+        best = min(best, time.perf_counter() - start)
+    return best, pieces
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stop-word matching cost of the stream relay.")
+    parser.add_argument("--tokens", type=int, nargs="+", default=[2000, 4000, 8000, 16000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'stream':<10} {'tokens':>7} {'legacy ms':>10} {'relay ms':>9} {'speedup':>8}")
+    for spaced in (True, False):
+        for num_tokens in args.tokens:
+            stream = make_stream(num_tokens, spaced)
+            legacy, _ = time_relay(legacy_generate_data, stream, args.repeat)
+            relay, _ = time_relay(relay_generate_data, stream, args.repeat)
+            label = "prose" if spaced else "no-spaces"
+            print(f"{label:<10} {num_tokens:>7} {legacy * 1000:>10.2f} {relay * 1000:>9.2f} {legacy / relay:>7.1f}x")
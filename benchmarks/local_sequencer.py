@@ -0,0 +1,383 @@
+"""
+Local stand-in for the sequencer, for offline end-to-end load tests of both miners.
+
+Implements /miner_request, /miner_submit, /miner_submit_stream and /miner_signal with a
+configurable job mix (LLM streaming, non-streaming and tool jobs, SD jobs with temporary
+S3 credentials, and empty polls), injected latency, error responses and "Warning:"
+responses. Optionally it also accepts S3 PUT uploads so the SD miner can run against it
+with [storage] s3_endpoint_url pointing here. Every received request can be recorded to a
+JSONL file, and GET /stats returns throughput and latency from the sequencer's point of
+view. Only the standard library is used.
+
+Point a miner at it with [service] base_url and signal_url, e.g.
+
+    python benchmarks/local_sequencer.py --port 8080 --llm-mix stream=3,nonstream=1,tools=1,none=1 \\
+        --latency 0.05 --error-rate 0.01 --warning-rate 0.01 --record received.jsonl
+"""
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from submit_sink import read_chunked
+
+DEFAULT_LLM_MIX = "stream=3,nonstream=1,tools=1,none=1"
+DEFAULT_SD_MIX = "job=1,none=1"
+LLM_PROMPTS = [
+    "What is the capital of France?",
+    "Write a short poem about the ocean.",
+    "Explain how a hash map works in two paragraphs.",
+]
+SD_PROMPTS = [
+    "a lighthouse on a cliff at sunset, highly detailed",
+    "a cat astronaut floating in space, digital art",
+]
+TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": "get_weather",
+        "description": "Get the current weather for a city",
+        "parameters": {"type": "object", "properties": {"city": {"type": "string"}}, "required": ["city"]},
+    },
+}]
+
+def parse_mix(text):
+    """Parses "kind=weight,..." into a list of (kind, weight)."""
+    mix = []
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        mix.append((kind.strip(), float(weight or 1)))
+    return mix
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+class LocalSequencer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, llm_mix=DEFAULT_LLM_MIX, sd_mix=DEFAULT_SD_MIX, default_kind="llm",
+                 latency=0.0, latency_jitter=0.0, error_rate=0.0, warning_rate=0.0, submit_error_rate=0.0,
+                 llm_max_tokens=256, sd_size=512, sd_iterations=20, record_path=None, seed=None):
+        super().__init__(address, LocalSequencerHandler)
+        self.llm_mix = parse_mix(llm_mix)
+        self.sd_mix = parse_mix(sd_mix)
+        self.default_kind = default_kind
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.warning_rate = warning_rate
+        self.submit_error_rate = submit_error_rate
+        self.llm_max_tokens = llm_max_tokens
+        self.sd_size = sd_size
+        self.sd_iterations = sd_iterations
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.miner_kinds = {}
+        self.dispatched = {}
+        self.counts = {}
+        self.job_latencies = []
+        self.started_at = time.time()
+        self.record_file = open(record_path, "a") if record_path else None
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def record(self, entry):
+        if self.record_file is None:
+            return
+        line = json.dumps({"time": time.time(), **entry})
+        with self.lock:
+            self.record_file.write(line + "\n")
+            self.record_file.flush()
+
+    def miner_kind(self, request):
+        # Versions look like "llm-v1.2.0" or "sd-v1.2.0" and come with the heartbeat
+        miner_id = request.get("miner_id")
+        version = request.get("version") or ""
+        model_type = request.get("model_type") or ""
+        with self.lock:
+            if version or model_type:
+                self.miner_kinds[miner_id] = "sd" if version.startswith("sd") or model_type == "SD" else "llm"
+            return self.miner_kinds.get(miner_id, self.default_kind)
+
+    def choose(self, mix):
+        kinds, weights = zip(*mix)
+        with self.lock:
+            return self.random.choices(kinds, weights)[0]
+
+    def injected_delay(self):
+        with self.lock:
+            jitter = self.random.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0
+        return self.latency + jitter
+
+    def roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def make_llm_job(self, kind, model_id):
+        llm_input = {
+            "prompt": json.dumps([
+                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": self.random.choice(LLM_PROMPTS)},
+            ]),
+            "temperature": 0.7,
+            "max_tokens": self.llm_max_tokens,
+            "seed": -1,
+            "use_stream": kind == "stream",
+        }
+        if kind == "tools":
+            llm_input["tools"] = json.dumps(TOOLS)
+        return {"job_id": str(uuid.uuid4()), "model_id": model_id, "model_input": {"LLM": llm_input}}
+
+    def make_sd_job(self, model_id):
+        return {
+            "job_id": str(uuid.uuid4()),
+            "model_id": model_id,
+            "model_input": {"SD": {
+                "prompt": self.random.choice(SD_PROMPTS),
+                "neg_prompt": "blurry, low quality",
+                "height": self.sd_size,
+                "width": self.sd_size,
+                "num_iterations": self.sd_iterations,
+                "guidance_scale": 7.5,
+                "seed": -1,
+            }},
+            # Temporary S3 credentials: access key, secret key, session token
+            "temp_credentials": ["LOCALACCESSKEY", "localsecretkey", "local-session-token"],
+        }
+
+    def dispatch(self, job):
+        with self.lock:
+            self.dispatched[job["job_id"]] = time.time()
+
+    def complete(self, job_id):
+        with self.lock:
+            dispatched_at = self.dispatched.pop(str(job_id), None)
+            if dispatched_at is not None:
+                self.job_latencies.append(time.time() - dispatched_at)
+
+    def stats(self):
+        with self.lock:
+            latencies = list(self.job_latencies)
+            counts = dict(self.counts)
+            pending = len(self.dispatched)
+        elapsed = time.time() - self.started_at
+        return {
+            "elapsed_seconds": elapsed,
+            "counts": counts,
+            "jobs_completed": len(latencies),
+            "jobs_pending": pending,
+            "jobs_per_second": len(latencies) / elapsed if elapsed else 0.0,
+            "job_latency_seconds": {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+            },
+        }
+
+class LocalSequencerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY a keep-alive client waits
+    # for its delayed ACK (~40 ms) on every response, as no production server makes it
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            return json.loads(body or b"{}")
+        except ValueError:
+            return {}
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._reply(self.server.stats())
+        else:
+            self._reply({"error": "not found"}, 404)
+
+    def do_POST(self):
+        handler = {
+            "/miner_request": self._miner_request,
+            "/miner_submit": self._miner_submit,
+            "/miner_submit_stream": self._miner_submit_stream,
+            "/miner_signal": self._miner_signal,
+        }.get(self.path)
+        if handler is None:
+            self._reply({"error": "not found"}, 404)
+            return
+        handler()
+
+    def _miner_request(self):
+        server = self.server
+        request = self._read_json()
+        server.count("miner_request")
+        time.sleep(server.injected_delay())
+
+        if server.roll(server.error_rate):
+            server.count("miner_request_error")
+            server.record({"path": self.path, "request": request, "status": 503})
+            self._reply({"error": "injected error"}, 503)
+            return
+        if server.roll(server.warning_rate):
+            server.count("miner_request_warning")
+            server.record({"path": self.path, "request": request, "status": 200, "warning": True})
+            self._reply("Warning: injected warning from the local sequencer")
+            return
+
+        kind = server.miner_kind(request)
+        choice = server.choose(server.sd_mix if kind == "sd" else server.llm_mix)
+        if choice == "none":
+            server.count(f"{kind}_no_job")
+            server.record({"path": self.path, "request": request, "status": 200, "job": None})
+            self._reply("No job available")
+            return
+
+        model_id = request.get("model_id") or "local-model"
+        job = server.make_sd_job(model_id) if kind == "sd" else server.make_llm_job(choice, model_id)
+        server.dispatch(job)
+        server.count(f"{kind}_{choice}_dispatched")
+        server.record({"path": self.path, "request": request, "status": 200, "job": job})
+        self._reply(job)
+
+    def _submit_status(self):
+        server = self.server
+        time.sleep(server.injected_delay())
+        if server.roll(server.submit_error_rate):
+            server.count("submit_error")
+            return 503
+        return 200
+
+    def _miner_submit(self):
+        server = self.server
+        result = self._read_json()
+        server.count("miner_submit")
+        status = self._submit_status()
+        if status == 200:
+            server.complete(result.get("job_id"))
+        server.record({"path": self.path, "request": result, "status": status})
+        self._reply("Result submitted" if status == 200 else {"error": "injected error"}, status)
+
+    def _miner_submit_stream(self):
+        server = self.server
+        started_at = time.time()
+        state = {"first_byte_at": None, "chunks": 0, "text": []}
+
+        def on_chunk(data):
+            if state["first_byte_at"] is None:
+                state["first_byte_at"] = time.time()
+            state["chunks"] += 1
+            state["text"].append(data)
+
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            read_chunked(self.rfile, on_chunk)
+        else:
+            on_chunk(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        server.count("miner_submit_stream")
+        job_id = self.headers.get("job_id")
+        status = self._submit_status()
+        if status == 200:
+            server.complete(job_id)
+        text = b"".join(state["text"]).decode("utf-8", "replace")
+        server.record({
+            "path": self.path, "job_id": job_id, "miner_id": self.headers.get("miner_id"), "status": status,
+            "chunks": state["chunks"], "bytes": len(text.encode()), "text": text,
+            "first_byte_delay": state["first_byte_at"] - started_at if state["first_byte_at"] else None,
+            "duration": time.time() - started_at,
+        })
+        self._reply("Stream received" if status == 200 else {"error": "injected error"}, status)
+
+    def _miner_signal(self):
+        server = self.server
+        request = self._read_json()
+        server.count("miner_signal")
+        server.miner_kind(request)
+        server.record({"path": self.path, "request": request, "status": 200})
+        self._reply({"model_id": request.get("model_id")})
+
+    def do_PUT(self):
+        # S3 PutObject emulation (path-style: /bucket/key), see [storage] s3_endpoint_url
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            sizes = []
+            read_chunked(self.rfile, lambda data: sizes.append(len(data)))
+            length = sum(sizes)
+        else:
+            self.rfile.read(length)
+        time.sleep(server.injected_delay())
+        server.count("s3_put")
+        server.record({"path": self.path, "method": "PUT", "bytes": length, "status": 200})
+        self.send_response(200)
+        self.send_header("ETag", f'"{uuid.uuid4().hex}"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+def start_local_sequencer(host="127.0.0.1", port=0, **options):
+    """
+    Starts a LocalSequencer on a background thread.
+
+    Returns:
+        tuple: (sequencer, base URL to use as the miners' base_url and signal_url)
+    """
+    sequencer = LocalSequencer((host, port), **options)
+    threading.Thread(target=sequencer.serve_forever, daemon=True).start()
+    return sequencer, f"http://{host}:{sequencer.server_address[1]}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local sequencer stand-in for miner load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--llm-mix", default=DEFAULT_LLM_MIX, help="Weights of stream, nonstream, tools and none (no job)")
+    parser.add_argument("--sd-mix", default=DEFAULT_SD_MIX, help="Weights of job and none (no job)")
+    parser.add_argument("--default-kind", choices=["llm", "sd"], default="llm",
+                        help="Job shape for miners that have not sent a version or signal yet")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Up to this many extra seconds, uniformly")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of /miner_request answered with 503")
+    parser.add_argument("--warning-rate", type=float, default=0.0, help="Fraction of /miner_request answered with a Warning:")
+    parser.add_argument("--submit-error-rate", type=float, default=0.0, help="Fraction of submits answered with 503")
+    parser.add_argument("--llm-max-tokens", type=int, default=256)
+    parser.add_argument("--sd-size", type=int, default=512)
+    parser.add_argument("--sd-iterations", type=int, default=20)
+    parser.add_argument("--record", help="Append every received request to this JSONL file")
+    parser.add_argument("--seed", type=int, help="Seed for the job mix and injected faults")
+    parser.add_argument("--stats-interval", type=float, default=30.0, help="Seconds between printed stats, 0 to disable")
+    args = parser.parse_args()
+
+    sequencer = LocalSequencer(
+        (args.host, args.port), llm_mix=args.llm_mix, sd_mix=args.sd_mix, default_kind=args.default_kind,
+        latency=args.latency, latency_jitter=args.latency_jitter, error_rate=args.error_rate,
+        warning_rate=args.warning_rate, submit_error_rate=args.submit_error_rate,
+        llm_max_tokens=args.llm_max_tokens, sd_size=args.sd_size, sd_iterations=args.sd_iterations,
+        record_path=args.record, seed=args.seed,
+    )
+    print(f"Local sequencer listening on http://{args.host}:{args.port}")
+
+    if args.stats_interval > 0:
+        def print_stats():
+            while True:
+                time.sleep(args.stats_interval)
+                print(json.dumps(sequencer.stats()))
+        threading.Thread(target=print_stats, daemon=True).start()
+    try:
+        sequencer.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(sequencer.stats()))
@@ -0,0 +1,205 @@
+"""
+Mock OpenAI-compatible server standing in for a local vLLM instance.
+
+Serves /v1/chat/completions (streaming and non-streaming), /v1/models, /health and a
+vLLM-style /metrics payload so the LLM miner and the benchmarks in this directory can run
+without a GPU. Only the standard library is used.
+
+    python benchmarks/mock_openai_server.py --port 8000 --model dolphin-2.9-llama3-8b
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, model="mock-model", ttft=0.0, tokens_per_second=0.0, response_tokens=None,
+                 num_gpu_blocks=4096, block_size=16):
+        super().__init__(address, MockOpenAIHandler)
+        self.model = model
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.num_gpu_blocks = num_gpu_blocks
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.num_requests_running = 0
+        self.num_requests_total = 0
+        self.generation_tokens_total = 0
+
+    def completion_tokens(self, max_tokens):
+        if self.response_tokens is not None:
+            return min(self.response_tokens, max_tokens)
+        return max_tokens
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY a keep-alive client waits
+    # for its delayed ACK (~40 ms) on every response, as no production server makes it
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, text, status=200):
+        body = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        if self.path == "/health":
+            self._send_text("")
+        elif self.path == "/v1/models":
+            self._send_json({"object": "list", "data": [{"id": server.model, "object": "model", "owned_by": "mock"}]})
+        elif self.path == "/metrics":
+            with server.lock:
+                running = server.num_requests_running
+                total = server.num_requests_total
+                generation_tokens = server.generation_tokens_total
+            usage = min(1.0, running * 0.05)
+            self._send_text(
+                "# TYPE vllm:num_requests_running gauge\n"
+                f'vllm:num_requests_running{{model_name="{server.model}"}} {float(running)}\n'
+                "# TYPE vllm:num_requests_waiting gauge\n"
+                f'vllm:num_requests_waiting{{model_name="{server.model}"}} 0.0\n'
+                "# TYPE vllm:gpu_cache_usage_perc gauge\n"
+                f'vllm:gpu_cache_usage_perc{{model_name="{server.model}"}} {usage}\n'
+                "# TYPE vllm:cache_config_info gauge\n"
+                f'vllm:cache_config_info{{block_size="{server.block_size}",num_gpu_blocks="{server.num_gpu_blocks}"}} 1.0\n'
+                "# TYPE vllm:request_success_total counter\n"
+                f'vllm:request_success_total{{finished_reason="stop",model_name="{server.model}"}} {float(total)}\n'
+                "# TYPE vllm:generation_tokens_total counter\n"
+                f'vllm:generation_tokens_total{{model_name="{server.model}"}} {float(generation_tokens)}\n'
+                "# TYPE vllm:time_to_first_token_seconds histogram\n"
+                f'vllm:time_to_first_token_seconds_bucket{{le="0.1",model_name="{server.model}"}} {float(total)}\n'
+                f'vllm:time_to_first_token_seconds_bucket{{le="+Inf",model_name="{server.model}"}} {float(total)}\n'
+                f'vllm:time_to_first_token_seconds_sum{{model_name="{server.model}"}} {server.ttft * total}\n'
+                f'vllm:time_to_first_token_seconds_count{{model_name="{server.model}"}} {float(total)}\n'
+            )
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        if self.path != "/v1/chat/completions":
+            self._send_json({"error": "not found"}, status=404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        server = self.server
+        with server.lock:
+            server.num_requests_running += 1
+            server.num_requests_total += 1
+        try:
+            if request.get("stream"):
+                self._stream_completion(request)
+            else:
+                self._completion(request)
+        finally:
+            with server.lock:
+                server.num_requests_running -= 1
+
+    def _tokens(self, request):
+        num_tokens = self.server.completion_tokens(request.get("max_tokens") or 16)
+        return [f"token{i} " for i in range(num_tokens)]
+
+    def _pace(self, num_tokens):
+        if self.server.tokens_per_second > 0:
+            time.sleep(num_tokens / self.server.tokens_per_second)
+        with self.server.lock:
+            self.server.generation_tokens_total += num_tokens
+
+    def _completion(self, request):
+        tokens = self._tokens(request)
+        time.sleep(self.server.ttft)
+        self._pace(len(tokens))
+        message = {"role": "assistant", "content": "".join(tokens)}
+        finish_reason = "stop"
+        if request.get("tools"):
+            tool = request["tools"][0]["function"]["name"]
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{"id": "call_mock", "type": "function", "function": {"name": tool, "arguments": "{}"}}],
+            }
+            finish_reason = "tool_calls"
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        self._send_json({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", self.server.model),
+            "choices": [{"index": 0, "message": message, "logprobs": None, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)},
+        })
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    def _write_event(self, payload):
+        self._write_chunk(b"data: " + json.dumps(payload).encode() + b"\n\n")
+
+    def _stream_completion(self, request):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        model = request.get("model", self.server.model)
+        base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        time.sleep(self.server.ttft)
+        try:
+            self._write_event({**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "logprobs": None, "finish_reason": None}]})
+            for token in self._tokens(request):
+                self._pace(1)
+                self._write_event({**base, "choices": [{"index": 0, "delta": {"content": token}, "logprobs": None, "finish_reason": None}]})
+            self._write_event({**base, "choices": [{"index": 0, "delta": {}, "logprobs": None, "finish_reason": "stop"}]})
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client aborted the stream, e.g. after seeing a stop sequence
+            self.close_connection = True
+
+def start_mock_server(host="127.0.0.1", port=0, **options):
+    """
+    Starts a MockOpenAIServer on a background thread.
+
+    Returns:
+        tuple: (server, base URL of the OpenAI API, e.g. "http://127.0.0.1:8000/v1").
+    """
+    server = MockOpenAIServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible server standing in for vLLM.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default="mock-model", help="Served model name")
+    parser.add_argument("--ttft", type=float, default=0.0, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Decode speed, 0 for unthrottled")
+    parser.add_argument("--response-tokens", type=int, help="Tokens per response (default: max_tokens of the request)")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer((args.host, args.port), model=args.model, ttft=args.ttft,
+                              tokens_per_second=args.tokens_per_second, response_tokens=args.response_tokens)
+    print(f"Mock OpenAI server listening on http://{args.host}:{args.port}/v1 serving {args.model}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
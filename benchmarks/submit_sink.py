@@ -0,0 +1,108 @@
+"""
+Minimal stand-in for the sequencer's submit endpoints, used by the benchmarks in this
+directory to receive results from the real LLM miner code and time their arrival.
+
+Accepts POST /miner_submit (JSON) and POST /miner_submit_stream (chunked body) and records,
+per job_id, when the submission started, when its first body bytes and its end arrived,
+and how many bytes were received. Only the standard library is used.
+"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def read_chunked(rfile, on_chunk):
+    """
+    Reads a chunked transfer-encoded body from rfile, calling on_chunk(data) for every chunk.
+    """
+    while True:
+        size_line = rfile.readline()
+        if not size_line:
+            return
+        size = int(size_line.split(b";")[0].strip() or b"0", 16)
+        if size == 0:
+            # Trailer section, terminated by an empty line
+            while rfile.readline() not in (b"\r\n", b"\n", b""):
+                pass
+            return
+        data = rfile.read(size)
+        rfile.readline()
+        on_chunk(data)
+
+class SubmitSink(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, SubmitSinkHandler)
+        self.lock = threading.Lock()
+        self.submissions = {}
+
+    def record(self, job_id, **fields):
+        with self.lock:
+            self.submissions.setdefault(str(job_id), {}).update(fields)
+
+    def get(self, job_id):
+        with self.lock:
+            return dict(self.submissions.get(str(job_id), {}))
+
+class SubmitSinkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY a keep-alive client waits
+    # for its delayed ACK (~40 ms) on every response, as no production server makes it
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status=200, body=b'"ok"'):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        started_at = time.time()
+        sink = self.server
+        if self.path == "/miner_submit_stream":
+            job_id = self.headers.get("job_id")
+            state = {"bytes": 0, "chunks": 0, "text": []}
+
+            def on_chunk(data):
+                if state["chunks"] == 0:
+                    sink.record(job_id, first_byte_at=time.time())
+                state["chunks"] += 1
+                state["bytes"] += len(data)
+                state["text"].append(data)
+
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                read_chunked(self.rfile, on_chunk)
+            else:
+                on_chunk(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            sink.record(
+                job_id, stream=True, started_at=started_at, completed_at=time.time(),
+                bytes=state["bytes"], chunks=state["chunks"], text=b"".join(state["text"]).decode("utf-8", "replace"),
+            )
+            self._reply()
+        elif self.path == "/miner_submit":
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            completed_at = time.time()
+            result = json.loads(body or b"{}")
+            sink.record(
+                result.get("job_id"), stream=False, started_at=started_at, first_byte_at=completed_at,
+                completed_at=completed_at, bytes=len(body), chunks=1, result=result,
+            )
+            self._reply()
+        else:
+            self._reply(404, b'{"error": "not found"}')
+
+def start_submit_sink(host="127.0.0.1", port=0):
+    """
+    Starts a SubmitSink on a background thread.
+
+    Returns:
+        tuple: (sink, base URL to use as the miner's service.base_url)
+    """
+    sink = SubmitSink((host, port))
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    return sink, f"http://{host}:{sink.server_address[1]}"
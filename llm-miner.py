@@ -7,43 +7,52 @@ import random
 import logging
 import requests
 import threading
-import json
+import asyncio
 from auth.generator import WalletGenerator
-from multiprocessing import Process, set_start_method
-from openai.types.chat import ChatCompletion
+from multiprocessing import Queue
 
 from llm_mining_core.utils import (
-    load_config, load_miner_ids,
+    load_config, load_miner_ids, get_config_path,
     send_miner_request,
     configure_logging,
-    get_metric_value,
-    check_vllm_server_status,
-    send_model_info_signal
+    configure_trace_logging,
+    start_trace_writer,
+    JobTrace,
+    send_model_info_signal,
+    VLLMMetricsSnapshot,
+    VLLMMetricsSampler,
+    VLLMServerWatchdog,
 )
+from llm_mining_core.utils.job_utils import extract_job_params
+from llm_mining_core.utils.result_utils import parse_chat_completion, encode_submit_result
+from llm_mining_core.utils.stream_utils import StreamRelay, FrameCoalescer, StreamPipeline
+from llm_mining_core.engine import (
+    AsyncJobEngine, AdaptiveConcurrencyController, JobPrefetchQueue, PrefixAffinityRouter, RoutedInstance,
+    KVCacheAdmission,
+)
+from mining_common.metrics import (
+    QueueMetrics, get_metrics, set_metrics, start_metrics_drain, track_poll_hit_ratio, start_metrics_server
+)
+from mining_common.config_snapshot import ConfigSnapshot, report_child_startup
+from mining_common.hardware import get_hardware_inventory
+from mining_common.launcher import ChildLauncher
+from mining_common.logging_utils import poll_log
+from mining_common.result_spool import SpoolSubmitter, is_retryable
 
 from llm_mining_core.config.server import LLMServerConfig
 
-def decode_prompt_json(prompt_json):
-    try:
-        return json.loads(prompt_json)
-    except json.JSONDecodeError as e:
-        logging.error(f"Failed to decode prompt JSON: {e}")
-        return None
-
-def generate(base_config, server_config, miner_id, job_id, decoded_prompt, temperature, max_tokens, seed, stop, use_stream_flag, model_id, request_latency, decoded_tools=None, extra_body=None):
+def generate(base_config, server_config, miner_id, job_id, decoded_prompt, temperature, max_tokens, seed, stop, use_stream_flag, model_id, request_latency, decoded_tools=None, extra_body=None, api_base_url=None, trace=None):
     logging.info(f"Processing Request ID: {job_id}. Model ID: {model_id}. Miner ID: {miner_id}")
 
-    client = server_config.initialize_client()
+    client = server_config.initialize_client(api_base_url)
     if client is None:
         logging.error(f"Failed to initialize API client for model {model_id}.")
         return
 
-    if max_tokens > 4096:
-        max_tokens = 4096
-
     try:
         if use_stream_flag:
             logging.info("Streaming mode enabled")
+            requested_at = time.time()
             stream = client.chat.completions.create(
                 messages=decoded_prompt,
                 model=model_id,
@@ -54,76 +63,39 @@ def generate(base_config, server_config, miner_id, job_id, decoded_prompt, tempe
                 stream=True,
             )
 
-            first_chunk = next(stream)
-            initial_data = None
-            if first_chunk.choices[0].delta is not None:
-                initial_data = first_chunk.choices[0].delta.content
-                    
-            if not initial_data:
-                second_chunk = next(stream)
-                if second_chunk.choices[0].delta is not None:
-                    second_data = second_chunk.choices[0].delta.content
-                    if not second_data:
-                        logging.error("No initial data received from the stream. Exiting...")
-                        return
-                    initial_data = second_data
-
-            def generate_data(stream):
-                yield initial_data
-
-                buffer = ''  # Initialize a buffer to accumulate characters into words
-                try:
-                    for chunk in stream:
-                        if chunk.choices[0].delta.content is not None:
-                            data = chunk.choices[0].delta.content
-                            buffer += data  # Add the new data to the buffer
-
-                            # If the data contains a word boundary (e.g., space, punctuation followed by a space),
-                            # split the buffer into words and yield them except for the last partial word.
-                            if ' ' in buffer or '\n' in buffer:
-                                words = buffer.split(' ')
-                                for word in words[:-1]:  # Yield all but the last item, which might be incomplete
-                                    complete_word = word
-                                    yield complete_word + " "
-                                buffer = words[-1]  # Keep the last item as the start of the next word
-
-                            # Check for stop words in the buffer. If any, remove the stop word and any texts after the stop word.
-                            if any(word in buffer for word in stop):
-                                for word in stop:
-                                    if word in buffer:
-                                        stop_index = buffer.index(word)
-                                        buffer = buffer[:stop_index]
-                                        # If the buffer is not empty, yield it
-                                        if buffer:
-                                            yield buffer + " "
-                                        yield base_config.eos # Ensure EOS is sent when the stream ends
-                                        break
-
-                    if buffer:  # If there's anything left in the buffer, yield it as well
-                        yield buffer + " "
-                    yield base_config.eos  # Ensure EOS is sent when the stream ends
-                except StopIteration:
-                    if buffer:  # Ensure the last partial word is sent before ending
-                        yield buffer + " "
-                    yield base_config.eos
-            
-            # Make a POST request to the server after initial data is received
-            with requests.Session() as session:
-                try:
-                    headers = {
-                        'job_id': str(job_id),
-                        'miner_id': str(miner_id),
-                        'Content-Type': 'text/event-stream'    
-                    }
-                    response = session.post(
-                        f"{base_config.base_url}/miner_submit_stream",
-                        headers=headers,
-                        data=generate_data(stream),
-                        stream=True
-                    )
-                    response.raise_for_status()
-                except requests.RequestException as e:
-                    logging.error(f"Failed to submit stream: {e}")
+            # Read from vLLM and write to the sequencer through a bounded queue, and open the
+            # submit request while the first tokens are being generated
+            pipeline = StreamPipeline(
+                stream,
+                StreamRelay(stop, base_config.eos),
+                FrameCoalescer.from_config(base_config),
+                queue_size=base_config.stream_queue_size,
+            ).start()
+
+            # The stream session of the worker keeps its connection to the sequencer alive between jobs
+            try:
+                headers = {
+                    'job_id': str(job_id),
+                    'miner_id': str(miner_id),
+                    'Content-Type': 'text/event-stream'    
+                }
+                response = base_config.stream_session.post(
+                    f"{base_config.base_url}/miner_submit_stream",
+                    headers=headers,
+                    data=pipeline.frames(),
+                )
+                response.raise_for_status()
+            except requests.RequestException as e:
+                logging.error(f"Failed to submit stream: {e}")
+                if trace is not None:
+                    trace.fail("submit_failed")
+            finally:
+                pipeline.close()
+            pipeline.record(job_id)
+            if trace is not None:
+                trace.add_stream(requested_at, pipeline, time.time())
+                if pipeline.error is not None:
+                    trace.fail("vllm_error")
 
         else:
             logging.info("Non-streaming mode")
@@ -150,59 +122,192 @@ def generate(base_config, server_config, miner_id, job_id, decoded_prompt, tempe
                 params["tool_choice"] = "auto"
             
         
-            response = client.chat.completions.create(**params)
-
-            # Convert the response to a ChatCompletion object
-            chat_completion = ChatCompletion(**response.model_dump())
-            
-            # Extract the choices array
-            result_choices = chat_completion.choices
+            # Take the raw response body and decode it once, instead of building and dumping
+            # the client's pydantic models
+            raw_response = client.chat.completions.with_raw_response.create(**params)
+            result_choices, usage = parse_chat_completion(raw_response.http_response.content)
 
             end_time = time.time()
             inference_latency = end_time - start_time
             
 
-            total_tokens = response.usage.total_tokens
+            total_tokens = usage.get("total_tokens", 0)
             logging.info(f"Completed processing {total_tokens} tokens. Time: {inference_latency}s. Tokens/s: {total_tokens / inference_latency}")
+            if trace is not None:
+                trace.add("inference", inference_latency)
+                trace.set(stream=False, output_tokens=usage.get("completion_tokens"), total_tokens=total_tokens)
 
+            submit_start_time = time.time()
             url = base_config.base_url + "/miner_submit"
-            result = {
-                "miner_id": miner_id.lower(),
-                "job_id": job_id,
-                "result": {"Text": json.dumps([choice.model_dump() for choice in result_choices])},
-                "request_latency": request_latency,
-                "inference_latency": inference_latency
-            }
+            identity_address, signature = None, None
             if not base_config.skip_signature:
                 identity_address, signature = base_config.wallet_generator.generate_signature(miner_id)
-                result["signature"] = signature
-                result["identity_address"] = identity_address
-            res = base_config.session.post(url, json=result)
-
-            if(res.status_code == 200):
+            body = encode_submit_result(
+                miner_id, job_id, result_choices, request_latency, inference_latency, identity_address, signature
+            )
+            try:
+                res = base_config.session.post(url, data=body, headers={"Content-Type": "application/json"})
+                status_code, error = res.status_code, f"status code: {res.status_code}"
+            except requests.RequestException as e:
+                status_code, error = None, str(e)
+            if trace is not None:
+                trace.add("submit", time.time() - submit_start_time)
+
+            if(status_code == 200):
                 logging.info(f"Result submitted successfully for job_id: {job_id}")
             else:
-                logging.error(f"Failed to submit result for job_id: {job_id} with status code: {res.status_code}")
+                logging.error(f"Failed to submit result for job_id: {job_id} with {error}")
+                # Leave the retries to the spool's background submitter and move on to the next job
+                if is_retryable(status_code):
+                    job_started_at = trace.started_at if trace is not None else start_time
+                    base_config.result_spool.put(job_id, url, body, job_started_at + base_config.llm_timeout_seconds)
+                if trace is not None:
+                    trace.fail("submit_failed")
     except Exception as e:
         logging.error(f"Error during text generation request: {str(e)}")
+        if trace is not None:
+            trace.fail("error")
         return
     
-def worker(miner_id):
-    base_config, server_config = load_config()
-    configure_logging(base_config, miner_id)
+def process_job(base_config, server_config, miner_id, router, admission, job, request_latency, received_at=None):
+    """
+    Generates and submits the result of a job on the vLLM instance picked by the router, once
+    the job fits the instance's KV cache.
+
+    The timeout check and llm_job_duration_seconds measure from received_at, when the job
+    was received from the sequencer, so they include the time a prefetched job spent queued.
+
+    Returns:
+        float or None: The service time in seconds (without the time in the prefetch queue),
+            or None if the prompt failed to decode.
+    """
+    job_start_time = time.time()
+    if received_at is None:
+        received_at = job_start_time
+    trace = JobTrace(job.get('job_id'), job.get('model_id'), miner_id, request_latency, received_at)
+    # Extract job parameters
+    with trace.span("json_decode"):
+        params = extract_job_params(job, base_config)
+    if params is None:
+        logging.error(f"Failed to decode prompt for model {job['model_id']} of job {job.get('job_id')}.")
+        trace.fail("decode_failed")
+        trace.finish()
+        return None
+
+    instance = router.route(params['decoded_prompt'])
+    trace.set(instance=instance.index)
+    try:
+        # Hold the job back until its prompt and max_tokens fit the KV cache, or skip it
+        with trace.span("admission"):
+            prompt_tokens = admission.prepare(params, instance)
+            footprint = admission.acquire(instance, prompt_tokens, params['max_tokens']) if prompt_tokens is not None else None
+        if footprint is None:
+            trace.fail("skipped")
+            trace.finish()
+            return time.time() - job_start_time
+        trace.set(prompt_tokens=prompt_tokens)
+        try:
+            # Call the generate function
+            generate(
+                base_config, server_config, miner_id, params['job_id'], params['decoded_prompt'],
+                params['temperature'], params['max_tokens'], params['seed'], params['stop'],
+                params['use_stream_flag'], params['model_id'],
+                request_latency, params['decoded_tools'], params['extra_body'], instance.api_base_url, trace
+            )
+        finally:
+            admission.release(instance, footprint)
+    finally:
+        router.release(instance)
+    job_end_time = time.time()
+    total_processing_time = job_end_time - received_at
+    get_metrics().observe(
+        "llm_job_duration_seconds", total_processing_time, model=params['model_id'], instance=str(instance.index)
+    )
+    if total_processing_time > base_config.llm_timeout_seconds:
+        print(
+            "Warning: the previous request timed out. You will not earn points. Please check miner configuration or network connection."
+        )
+        trace.fail("timeout")
+    trace.finish()
+    return job_end_time - job_start_time
+
+def prefetch_jobs(base_config, miner_id, job_queue, router, busy):
+    """
+    Requests jobs into the worker's prefetch queue, including while the worker is busy with
+    a job, as long as the queue predicts a prefetched job can still finish in time.
+    """
+    while True:
+        try:
+            in_flight = 1 if busy.is_set() else 0
+            if not job_queue.should_prefetch(in_flight):
+                job_queue.wait(base_config.sleep_duration)
+                continue
+            # An idle worker polls like before, within the concurrency limit
+            if not in_flight and not router.has_capacity():
+                time.sleep(base_config.sleep_duration)
+                continue
+
+            job, request_latency = send_miner_request(
+                base_config, miner_id, base_config.served_model_name
+            )
+            if job is not None:
+                job_queue.push(job, request_latency)
+            else:
+                time.sleep(base_config.sleep_duration)
+        except Exception as e:
+            poll_log.log(logging.ERROR, "prefetch_error", f"Error occurred while prefetching jobs for miner {miner_id}: {e}")
+            time.sleep(base_config.sleep_duration)
+
+def worker(miner_id, config_snapshot, launched_at, router, admission, metrics_queue, trace_queue, log_queue):
+    base_config, server_config = load_config(snapshot=config_snapshot)
+    configure_logging(base_config, miner_id, log_queue)
+    configure_trace_logging(trace_queue)
+    set_metrics(QueueMetrics(metrics_queue))
+    if not base_config.skip_signature:
+        base_config.wallet_generator.warm_signatures([miner_id])
+    report_child_startup(launched_at, "llm_worker")
+
+    job_queue = None
+    if base_config.prefetch_enabled:
+        job_queue = JobPrefetchQueue.from_config(base_config)
+        busy = threading.Event()
+        threading.Thread(
+            target=prefetch_jobs,
+            args=(base_config, miner_id, job_queue, router, busy),
+            name="job-prefetch",
+            daemon=True,
+        ).start()
 
     while True:
-        if not check_vllm_server_status():
+        if not router.is_alive():
             logging.error(
                 f"vLLM server process for model {server_config.served_model_name} is not running. Exiting the llm miner program."
             )
             sys.exit(1)
+
+        if job_queue is not None:
+            # Dispatch prefetched jobs back to back; the prefetch thread does the polling
+            item = job_queue.pop(timeout=base_config.sleep_duration)
+            if item is None:
+                continue
+            busy.set()
+            try:
+                processing_time = process_job(base_config, server_config, miner_id, router, admission, *item)
+            except Exception as e:
+                logging.error(f"Error occurred for miner {miner_id}: {e}")
+                import traceback
+                traceback.print_exc()
+                continue
+            finally:
+                busy.clear()
+            if processing_time is not None:
+                # A job whose prompt failed to decode is skipped; the queued jobs are still served
+                job_queue.observe_service_time(processing_time)
+            continue
+
         try:
-            # Check if the number of running requests exceeds the maximum concurrent requests
-            num_requests = get_metric_value("num_requests_running", base_config)
-            if num_requests is None:
-                num_requests = 0  # Set to 0 if None
-            if num_requests >= base_config.concurrency_soft_limit:
+            # Check if the number of running requests exceeds the maximum concurrent requests on every instance.
+            if not router.has_capacity():
                 time.sleep(base_config.sleep_duration)
                 continue
 
@@ -211,46 +316,9 @@ def worker(miner_id):
                 base_config, miner_id, base_config.served_model_name
             )
             if job is not None:
-                job_start_time = time.time()
-                # Extract job parameters
-                model_id = job['model_id']
-                prompt = job['model_input']['LLM']['prompt']
-                temperature = job['model_input']['LLM']['temperature']
-                max_tokens = job['model_input']['LLM']['max_tokens']
-                seed = job['model_input']['LLM']['seed']
-                use_stream = job['model_input']['LLM']['use_stream']
-                if seed == -1:
-                    seed = None
-                stop = base_config.stop_words
-                # If function calling is enabled, pass tools to generate()
-                decoded_prompt = decode_prompt_json(prompt)
-                if decoded_prompt is None:
-                    logging.error(f"Failed to decode prompt for model {model_id}. Exiting.")
+                if process_job(base_config, server_config, miner_id, router, admission, job, request_latency) is None:
+                    logging.error("Exiting the worker after a job whose prompt failed to decode.")
                     return
-                
-                tools = None
-                decoded_tools = None
-                extra_body = None 
-
-                if job['model_input']['LLM'].get('tools', None):
-                    tools = job['model_input']['LLM']['tools']
-                    decoded_tools = decode_prompt_json(tools)
-
-                # Call the generate function
-                extra_body = job['model_input']['LLM'].get('extra_body', None)
-                if extra_body:
-                    extra_body = json.loads(extra_body)
-                generate(
-                    base_config, server_config, miner_id, job['job_id'], decoded_prompt,
-                    temperature, max_tokens, seed, stop, use_stream, model_id,
-                    request_latency, decoded_tools, extra_body
-                )
-                job_end_time = time.time()
-                total_processing_time = job_end_time - job_start_time
-                if total_processing_time > base_config.llm_timeout_seconds:
-                    print(
-                        "Warning: the previous request timed out. You will not earn points. Please check miner configuration or network connection."
-                    )
             else:
                 pass
 
@@ -261,12 +329,36 @@ def worker(miner_id):
 
         time.sleep(base_config.sleep_duration)
 
+def async_worker(miner_id, config_snapshot, launched_at, router, admission, metrics_queue, trace_queue, log_queue):
+    base_config, server_config = load_config(snapshot=config_snapshot)
+    configure_logging(base_config, miner_id, log_queue)
+    configure_trace_logging(trace_queue)
+    set_metrics(QueueMetrics(metrics_queue))
+    if not base_config.skip_signature:
+        base_config.wallet_generator.warm_signatures([miner_id])
+    report_child_startup(launched_at, "llm_worker")
+
+    engine = AsyncJobEngine(base_config, server_config, miner_id, router, admission)
+    asyncio.run(engine.run())
+    logging.error(
+        f"vLLM server process for model {server_config.served_model_name} is not running. Exiting the llm miner program."
+    )
+    sys.exit(1)
+
 def periodic_send_model_info_signal(base_config, miner_id, last_signal_time):
     while True:
         last_signal_time = send_model_info_signal(base_config, miner_id, last_signal_time)
         time.sleep(base_config.signal_interval) # Adjust the sleep interval based on your desired frequency
 
-def main_loop():
+def publish_vllm_queue_depth(snapshot, labels):
+    """Exports the requests running and waiting in a vLLM instance from its metrics snapshot."""
+    metrics = get_metrics()
+    for state in ("running", "waiting"):
+        value = snapshot["gauges"].get(f"num_requests_{state}")
+        if value is not None:
+            metrics.set("llm_vllm_requests", value, state=state, **labels)
+
+def main_loop(base_config, server_config, config_snapshot, server_pids=None):
     processes = []
     def signal_handler(signum, frame):
         for p in processes:
@@ -275,15 +367,17 @@ def main_loop():
 
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
-    set_start_method('spawn', force=True)
+    # Workers are forked from a forkserver with the miner's imports preloaded (or spawned)
+    launcher = ChildLauncher.from_config(base_config).configure()
 
-    base_config, server_config = load_config()
     miner_ids = load_miner_ids()
     
-    # Do health check every 10 seconds, until it returns true
-    # TODO: refactor: model_id should be a config.toml item or .env item
-    while not server_config.health_check():
-        time.sleep(10)
+    # Probe the lightweight /health and /v1/models endpoints with back-off until the model is loaded,
+    # then run a single warmup request that records the baseline throughput
+    if not server_config.wait_for_server_ready():
+        logging.error(f"LLM server for model {server_config.served_model_name} did not become ready. Exiting the llm miner program.")
+        sys.exit(1)
+    server_config.warmup()
 
     try:
         # Explicitly use only the first miner_id; ensure config.miner_ids[0] exists
@@ -291,7 +385,7 @@ def main_loop():
             logging.error("No miner_ids provided in .env file")
             sys.exit(1)
         
-        miner_id_index = int(sys.argv[6])
+        miner_id_index = int(base_config.argv[6])
         if miner_id_index >= len(miner_ids):
             logging.warn("Invalid miner_id_index. Using the first miner_id found")
             miner_id = miner_ids[0]
@@ -299,14 +393,60 @@ def main_loop():
             miner_id = miner_ids[miner_id_index]
         if miner_id is None or not miner_id.startswith("0x"):
             logging.warning(f"Warning: Configure your ETH address correctly in the .env file. Current value: {miner_id}")
-        configure_logging(base_config, miner_id)
-
-        for _ in range(base_config.num_child_process):
-            process = Process(target=worker, args=(miner_id,))
-            random_number = random.randint(0, base_config.sleep_duration)
-            time.sleep(random_number) # Sleep for a while to avoid all processes starting at the same time
-            process.start()
+        # This process writes and rotates the log file; workers send their records through log_queue
+        log_writer = configure_logging(base_config, miner_id)
+        log_queue = log_writer.listen(Queue())
+
+        # Workers report their metrics to the parent's registry through a queue
+        metrics_queue = Queue(maxsize=10000)
+        start_metrics_drain(metrics_queue, get_metrics())
+        track_poll_hit_ratio(get_metrics())
+        if base_config.metrics_enabled:
+            # Each miner on the host gets its own port, offset by its miner ID index
+            start_metrics_server(get_metrics(), base_config.metrics_port + miner_id_index, base_config.metrics_host)
+        # Workers send their per-job traces to a single writer of the rotating trace file
+        trace_queue = None
+        if base_config.trace_enabled:
+            trace_queue = Queue()
+            start_trace_writer(base_config, trace_queue)
+        # Results whose submission failed, spooled to disk by the workers, are retried from here,
+        # including those left over from a previous run
+        SpoolSubmitter.from_config(base_config, base_config.result_spool).start()
+
+        server_pids = server_pids or [None] * len(server_config.instances)
+        routed_instances = []
+        for instance, server_pid in zip(server_config.instances, server_pids):
+            labels = {"instance": str(instance.index)}
+            # The controller adjusts the concurrency limit of the instance from its vLLM metrics and job completion times
+            controller = AdaptiveConcurrencyController.from_config(base_config, labels=labels)
+            get_metrics().set("llm_concurrency_limit", controller.current_limit(), **labels)
+
+            # A single sampler per instance scrapes vLLM metrics for all workers
+            metrics_snapshot = VLLMMetricsSnapshot()
+            sampler = VLLMMetricsSampler(base_config, metrics_snapshot, url=f"{instance.url}/metrics")
+            sampler.add_listener(controller.update)
+            sampler.add_listener(lambda snapshot, labels=labels: publish_vllm_queue_depth(snapshot, labels))
+            sampler.start()
+            # Workers watch the PID and /health endpoint of the vLLM servers started by this miner
+            watchdog = VLLMServerWatchdog.from_config(base_config, server_pid, port=instance.port)
+            routed_instances.append(RoutedInstance(instance.index, instance.api_base_url, metrics_snapshot, watchdog, controller))
+
+        # The router picks the vLLM instance for every job
+        router = PrefixAffinityRouter.from_config(base_config, routed_instances)
+        get_metrics().add_listener("llm_job_duration_seconds", router.observe_job)
+        # Admission holds back jobs that would not fit the KV cache of their instance
+        admission = KVCacheAdmission.from_config(base_config, server_config)
+
+        if base_config.engine == "asyncio":
+            # A single process runs all job slots concurrently on one event loop
+            process = launcher.start("llm_worker", async_worker, (miner_id, config_snapshot, time.time(), router, admission, metrics_queue, trace_queue, log_queue))
             processes.append(process)
+        else:
+            for _ in range(base_config.num_child_process):
+                random_number = random.randint(0, base_config.sleep_duration)
+                time.sleep(random_number) # Sleep for a while to avoid all processes starting at the same time
+                process = launcher.start("llm_worker", worker, (miner_id, config_snapshot, time.time(), router, admission, metrics_queue, trace_queue, log_queue))
+                processes.append(process)
 
         logging.info("LLM miner started")
 
@@ -326,17 +466,18 @@ def main_loop():
             p.join()
 
 if __name__ == "__main__":
-    base_config, server_config = load_config()
-    llm_server_process = server_config.start_llm_server()
-    atexit.register(server_config.terminate_llm_server, llm_server_process)
+    # Parse config.toml and the command line and probe the GPUs once; the workers are built
+    # from this snapshot
+    config_snapshot = ConfigSnapshot.capture(get_config_path()).with_data(hardware=get_hardware_inventory())
+    base_config, server_config = load_config(snapshot=config_snapshot)
+    llm_server_processes = server_config.start_llm_server()
+    atexit.register(server_config.terminate_llm_server, llm_server_processes)
 
     def signal_handler(signum, frame):
-        server_config.terminate_llm_server(llm_server_process)
+        server_config.terminate_llm_server(llm_server_processes)
         sys.exit(0)
 
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
-    # Give the server some time to start
-    time.sleep(10)  # Consider using wait_for_server_ready here instead to ensure the server is ready
-    main_loop()
\ No newline at end of file
+    main_loop(base_config, server_config, config_snapshot, [process.pid for process in llm_server_processes])
\ No newline at end of file
@@ -2,18 +2,22 @@ import os
 import sys
 import time
 import toml
-import requests
-from urllib3.util import Retry
-from requests.adapters import HTTPAdapter
 from collections import defaultdict
 from auth.generator import WalletGenerator
+from mining_common.http_client import HTTPClientFactory
+from mining_common.result_spool import ResultSpool
 from dotenv import load_dotenv
 load_dotenv()
 
 class BaseConfig:
-    def __init__(self, config_file):
-        # Load configuration from a TOML file
-        self.config = toml.load(config_file)
+    def __init__(self, config_file, snapshot=None):
+        # Load configuration from a TOML file, or take it from the parent's ConfigSnapshot
+        if snapshot is not None:
+            self.config = snapshot.config
+            self.argv = snapshot.argv
+        else:
+            self.config = toml.load(config_file)
+            self.argv = tuple(sys.argv)
 
         # General configurations
         self.base_url = self.config['service']['base_url']
@@ -21,19 +25,97 @@ class BaseConfig:
         self.signal_url = self.config['service']['signal_url']
 
         self.llm_timeout_seconds = self.config['service']['llm_timeout_seconds']
-        self.port = sys.argv[7]
+        self.port = self.argv[7]
         self.log_filename = self.config['logging']['llm_log_filename']
+        # The log file is rotated at log_max_bytes; repeated poll messages are logged once per poll_log_interval
+        self.log_max_bytes = int(self.config['logging'].get('max_mb', 100) * 1024 * 1024)
+        self.log_backup_count = self.config['logging'].get('backup_count', 5)
+        self.poll_log_interval = self.config['logging'].get('poll_log_interval', 60)
+        # Per-job latency spans, written as JSON lines to a rotating trace file
+        self.trace_enabled = self.config['logging'].get('llm_trace_enabled', True)
+        self.trace_filename = self.config['logging'].get('llm_trace_filename', 'llm-miner-trace.jsonl')
+        self.trace_max_bytes = int(self.config['logging'].get('llm_trace_max_mb', 50) * 1024 * 1024)
+        self.trace_backup_count = self.config['logging'].get('llm_trace_backup_count', 3)
         self.version = self.config['versions'].get('llm_version', 'unknown')
         self.api_base_url = f"{self.llm_url}:{self.port}/v1"
-        self.served_model_name = sys.argv[3] # This is Heurist model name defined in https://github.com/heurist-network/heurist-models/blob/main/models.json
+        self.served_model_name = self.argv[3] # This is Heurist model name defined in https://github.com/heurist-network/heurist-models/blob/main/models.json
         self.signal_interval = self.config['system']['signal_interval']
         # Heartbeat and process management
         self.last_heartbeat = time.time() - 10000  # Set a default past timestamp
-        self.last_heartbeat_per_miner = defaultdict(lambda: 0)  # Tracks heartbeats per miner_id
+        self.last_heartbeat_per_miner = defaultdict(int)  # Tracks heartbeats per miner_id
         self.sleep_duration = self.config['system']['sleep_duration']
         self.num_child_process = self.config['system']['num_child_process']
-        self.gpu_to_use = sys.argv[8]
+        # "process" runs num_child_process polling workers, "asyncio" runs num_job_slots on one event loop
+        self.engine = self.config['system'].get('engine', 'process')
+        self.num_job_slots = self.config['system'].get('num_job_slots', 16)
+        self.gpu_to_use = self.argv[8]
         self.concurrency_soft_limit = self.config['processing_limits']['concurrency_soft_limit']
+        # Adaptive concurrency: the limit starts at concurrency_soft_limit and moves within [min, max]
+        self.adaptive_concurrency = self.config['processing_limits'].get('adaptive_concurrency', False)
+        self.min_concurrency = self.config['processing_limits'].get('min_concurrency', 1)
+        self.max_concurrency = self.config['processing_limits'].get('max_concurrency', 32)
+        self.ttft_slo_seconds = self.config['processing_limits'].get('ttft_slo_seconds', 5.0)
+        self.kv_cache_high_watermark = self.config['processing_limits'].get('kv_cache_high_watermark', 0.9)
+        # Interval in seconds between scrapes of the vLLM /metrics endpoint shared by all workers
+        self.metrics_sample_interval = self.config['system'].get('metrics_sample_interval', 1.0)
+        # Interval in seconds between /health probes of the vLLM server by each worker
+        self.health_probe_interval = self.config['system'].get('health_probe_interval', 10.0)
+
+        # Connection pool and timeouts of the OpenAI client talking to the local vLLM server
+        llm_client_config = self.config.get('llm_client', {})
+        self.llm_client_max_connections = llm_client_config.get('max_connections', 64)
+        self.llm_client_max_keepalive_connections = llm_client_config.get('max_keepalive_connections', 32)
+        self.llm_client_keepalive_expiry = llm_client_config.get('keepalive_expiry', 60.0)
+        self.llm_client_connect_timeout = llm_client_config.get('connect_timeout', 5.0)
+        self.llm_client_read_timeout = llm_client_config.get('read_timeout', self.llm_timeout_seconds)
+
+        # Data parallelism: one vLLM server per group of GPUs, with jobs routed between them
+        data_parallel_config = self.config.get('data_parallel', {})
+        self.num_instances = data_parallel_config.get('instances', 1)
+        self.prefix_affinity = data_parallel_config.get('prefix_affinity', True)
+        self.prefix_chars = data_parallel_config.get('prefix_chars', 2048)
+        self.router_max_imbalance = data_parallel_config.get('max_imbalance', 2)
+
+        # KV cache admission: hold back or skip jobs whose prompt plus max_tokens would not fit the KV cache
+        kv_admission_config = self.config.get('kv_admission', {})
+        self.kv_admission_enabled = kv_admission_config.get('enabled', True)
+        self.kv_overcommit = kv_admission_config.get('overcommit', 1.5)
+        self.kv_hold_timeout = kv_admission_config.get('hold_timeout', 10.0)
+
+        # Prefetching of the next job while the current ones are generating
+        prefetch_config = self.config.get('prefetch', {})
+        self.prefetch_enabled = prefetch_config.get('enabled', False)
+        self.prefetch_max_queued_jobs = prefetch_config.get('max_queued_jobs', 2)
+        self.prefetch_safety_margin = prefetch_config.get('safety_margin', 0.8)
+
+        # Frame coalescing of /miner_submit_stream: a frame is written every flush_interval_ms or flush_bytes
+        streaming_config = self.config.get('streaming', {})
+        self.stream_flush_interval = streaming_config.get('flush_interval_ms', 20) / 1000
+        self.stream_flush_bytes = streaming_config.get('flush_bytes', 512)
+        # Pieces buffered between the vLLM reader and the sequencer writer before the reader waits
+        self.stream_queue_size = streaming_config.get('queue_size', 256)
+
+        # Start method and forkserver preload of the worker processes
+        launcher_config = self.config.get('launcher', {})
+        self.launcher_start_method = launcher_config.get('start_method', 'forkserver')
+        self.launcher_preload = launcher_config.get('llm_preload', ['__main__'])
+        self.launcher_spawn_kinds = launcher_config.get('spawn_kinds', [])
+
+        # Prometheus endpoint of the parent process
+        metrics_config = self.config.get('metrics', {})
+        self.metrics_enabled = metrics_config.get('enabled', False)
+        self.metrics_host = metrics_config.get('host', '0.0.0.0')
+        self.metrics_port = metrics_config.get('llm_port', 9410)
+
+        # On-disk spool of results whose submission failed, retried in the background
+        spool_config = self.config.get('result_spool', {})
+        self.spool_enabled = spool_config.get('enabled', True)
+        self.spool_dir = spool_config.get('dir', '~/.cache/heurist/spool')
+        self.spool_interval = spool_config.get('interval', 1)
+        self.spool_batch_size = spool_config.get('batch_size', 16)
+        self.spool_max_concurrency = spool_config.get('max_concurrency', 4)
+        self.spool_request_timeout = spool_config.get('request_timeout', 10)
+        self.spool_max_backoff = spool_config.get('max_backoff', 30)
 
         self.eos = "[DONE]"
         # A set of stop words to use - this is not a complete set, and you may want to
@@ -45,23 +127,26 @@ class BaseConfig:
             "<|im_end|>",
         ]
 
-        # Create a session object and configure retry strategy
-        self.session = requests.Session()
-        retry_strategy = Retry(
-            total=0,  # Disable retries
-            connect=0,  # Disable connect retries
-            read=0,  # Disable read retries
-            redirect=0,  # Disable redirect retries
-            status=0,  # Disable status retries
-            status_forcelist=[],  # No status codes to force retry
-            allowed_methods=[]  # Disable retries on all methods
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        # HTTP clients of the sequencer, signal and vLLM metrics calls
+        http_config = self.config.get('http', {})
+        self.http_connect_timeout = http_config.get('connect_timeout', 5)
+        self.http_read_timeout = http_config.get('read_timeout', 30)
+        self.http_retries = http_config.get('retries', 2)
+        self.http_backoff = http_config.get('backoff', 0.2)
+        self.http_dns_ttl = http_config.get('dns_ttl', 300)
+        self.http2 = http_config.get('http2', False)
+
+        # A worker process polls and submits from its job loop and prefetch threads, the asyncio
+        # engine from its job slots; the stream session waits up to the job timeout for the reply
+        pool_size = self.num_job_slots if self.engine == 'asyncio' else 1 + self.prefetch_max_queued_jobs
+        self.http = HTTPClientFactory.from_config(self, pool_size)
+        self.session = self.http.session()
+        self.stream_session = self.http.session(read_timeout=self.llm_timeout_seconds, retries=0)
+        # Results whose submission failed are retried from disk by the parent's SpoolSubmitter
+        self.result_spool = ResultSpool.from_config(self, f"llm-{self.port}")
 
         # Get the skip_signature argument from the command-line arguments
-        self.skip_signature = sys.argv[9].lower() == 'true'
-        # Create an instance of WalletGenerator
+        self.skip_signature = self.argv[9].lower() == 'true'
+        # Create an instance of WalletGenerator, only needed to sign submissions
         abi_file = os.path.join(os.path.dirname(__file__), '..', '..', 'auth', 'abi.json')
-        self.wallet_generator = WalletGenerator(config_file, abi_file)
\ No newline at end of file
+        self.wallet_generator = WalletGenerator(config_file, abi_file) if not self.skip_signature else None
\ No newline at end of file
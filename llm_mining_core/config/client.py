@@ -0,0 +1,89 @@
+import os
+import logging
+import threading
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+class OpenAIClientManager:
+    """
+    Process-wide owner of the OpenAI clients that talk to the local vLLM server.
+
+    One sync and one async client are created per process and base URL, each with its own
+    keep-alive connection pool, so jobs reuse warm connections instead of paying client
+    construction and TCP setup every time.
+    """
+
+    def __init__(self, max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0,
+                 connect_timeout=5.0, read_timeout=180.0):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._clients = {}
+        self._async_clients = {}
+
+    @classmethod
+    def from_config(cls, base_config):
+        return cls(
+            max_connections=base_config.llm_client_max_connections,
+            max_keepalive_connections=base_config.llm_client_max_keepalive_connections,
+            keepalive_expiry=base_config.llm_client_keepalive_expiry,
+            connect_timeout=base_config.llm_client_connect_timeout,
+            read_timeout=base_config.llm_client_read_timeout,
+        )
+
+    def _limits(self):
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def _timeout(self):
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    def _check_pid(self):
+        # Connection pools must never be shared with a forked child
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._clients = {}
+            self._async_clients = {}
+
+    def get_client(self, base_url):
+        with self._lock:
+            self._check_pid()
+            client = self._clients.get(base_url)
+            if client is None:
+                http_client = httpx.Client(limits=self._limits(), timeout=self._timeout())
+                client = OpenAI(base_url=base_url, api_key="N/A", http_client=http_client)
+                self._clients[base_url] = client
+                logging.debug(f"Created pooled OpenAI client for {base_url}")
+            return client
+
+    def get_async_client(self, base_url):
+        # Async clients are bound to the event loop they are first used on; each process runs one loop
+        with self._lock:
+            self._check_pid()
+            client = self._async_clients.get(base_url)
+            if client is None:
+                http_client = httpx.AsyncClient(limits=self._limits(), timeout=self._timeout())
+                client = AsyncOpenAI(base_url=base_url, api_key="N/A", http_client=http_client)
+                self._async_clients[base_url] = client
+                logging.debug(f"Created pooled async OpenAI client for {base_url}")
+            return client
+
+_client_manager = None
+_client_manager_lock = threading.Lock()
+
+def get_client_manager(base_config):
+    """
+    Returns the process-wide OpenAIClientManager, creating it from base_config on first use.
+    """
+    global _client_manager
+    with _client_manager_lock:
+        if _client_manager is None:
+            _client_manager = OpenAIClientManager.from_config(base_config)
+        return _client_manager
@@ -1,33 +1,67 @@
 import os
-import sys
 import time
 import logging
+import requests
 import subprocess
-from openai import OpenAI
+from mining_common.metrics import get_metrics
+from .client import get_client_manager
+
+class VLLMInstance:
+    """
+    One vLLM server started by the miner: the GPUs it runs on (tensor parallel across them),
+    its port and, once started, its process.
+    """
+
+    def __init__(self, index, gpu_ids, llm_url, port):
+        self.index = index
+        self.gpu_ids = gpu_ids
+        self.port = port
+        self.url = f"{llm_url}:{port}"
+        self.api_base_url = f"{self.url}/v1"
+        self.process = None
+        self.baseline_tokens_per_second = None
 
 class LLMServerConfig:
     MAX_MODEL_LEN = 8192
 
     def __init__(self, base_config):
         self.base_config = base_config
-        self.num_gpus = len(self.base_config.gpu_to_use.split(','))
         os.environ["CUDA_VISIBLE_DEVICES"] = self.base_config.gpu_to_use
 
-        self.model_id = sys.argv[1]  # HF Model ID from the first argument
-        self.model_quantization = None if sys.argv[2] == 'None' else sys.argv[2]  # Model quantization from the second argument
-        self.served_model_name = sys.argv[3]  # Served model name from the third argument
-        self.gpu_memory_util  = sys.argv[4] # GPU memory utilization ratio for vllm
-        self.model_revision = None if len(sys.argv) <= 5 or sys.argv[5] == 'None' else sys.argv[5]  # Model revision from the fourth argument, if present
-        self.tool_call_parser = None if len(sys.argv) <= 10 or sys.argv[10] == 'None' else sys.argv[10]
-        self.process = None
-    
-    def initialize_client(self):
-        return OpenAI(base_url=self.base_config.api_base_url, api_key="N/A")
+        # Split the GPUs evenly between the vLLM instances
+        gpu_ids = self.base_config.gpu_to_use.split(',')
+        num_instances = self.base_config.num_instances
+        if num_instances < 1 or len(gpu_ids) % num_instances != 0:
+            raise ValueError(f"Cannot split GPUs {self.base_config.gpu_to_use} evenly between {num_instances} vLLM instances")
+        self.num_gpus = len(gpu_ids) // num_instances
+        self.instances = [
+            VLLMInstance(
+                i, ",".join(gpu_ids[i * self.num_gpus:(i + 1) * self.num_gpus]),
+                self.base_config.llm_url, int(self.base_config.port) + i,
+            )
+            for i in range(num_instances)
+        ]
 
-    def start_llm_server(self):
+        argv = self.base_config.argv
+        self.model_id = argv[1]  # HF Model ID from the first argument
+        self.model_quantization = None if argv[2] == 'None' else argv[2]  # Model quantization from the second argument
+        self.served_model_name = argv[3]  # Served model name from the third argument
+        self.gpu_memory_util  = argv[4] # GPU memory utilization ratio for vllm
+        self.model_revision = None if len(argv) <= 5 or argv[5] == 'None' else argv[5]  # Model revision from the fourth argument, if present
+        self.tool_call_parser = None if len(argv) <= 10 or argv[10] == 'None' else argv[10]
+        self.baseline_tokens_per_second = None
+    
+    def initialize_client(self, api_base_url=None):
         """
-        Start the LLM server with the provided model details.
+        Returns the pooled OpenAI client for a local vLLM server, the first one by default.
+        The client is created once per process and keeps its connections alive across jobs.
         """
+        return get_client_manager(self.base_config).get_client(api_base_url or self.base_config.api_base_url)
+
+    def initialize_async_client(self, api_base_url=None):
+        return get_client_manager(self.base_config).get_async_client(api_base_url or self.base_config.api_base_url)
+
+    def server_command(self, instance):
         cmd = [
             "python", "-m", "vllm.entrypoints.openai.api_server",
             "--model", self.model_id,
@@ -36,7 +70,7 @@ class LLMServerConfig:
             "--uvicorn-log-level", "warning",
             "--disable-log-requests",
             "--dtype", "half",
-            "--port", str(self.base_config.port),
+            "--port", str(instance.port),
             "--tensor-parallel-size",str(self.num_gpus),
             "--gpu-memory-utilization", self.gpu_memory_util,
         ]
@@ -47,50 +81,130 @@ class LLMServerConfig:
             cmd.extend(["--revision", self.model_revision])
         if self.model_quantization:
             cmd.extend(["--quantization", self.model_quantization])
+        if len(self.instances) > 1 and self.base_config.prefix_affinity:
+            # The router sends jobs with a shared prefix to the same instance for prefix cache hits
+            cmd.append("--enable-prefix-caching")
+        return cmd
 
-        self.process = subprocess.Popen(cmd)
-        return self.process
+    def start_llm_server(self):
+        """
+        Start the LLM server with the provided model details, one per vLLM instance.
+
+        Returns:
+            list: The server processes, in instance order.
+        """
+        for instance in self.instances:
+            env = {**os.environ, "CUDA_VISIBLE_DEVICES": instance.gpu_ids}
+            instance.process = subprocess.Popen(self.server_command(instance), env=env)
+            if len(self.instances) > 1:
+                logging.info(f"Started vLLM instance {instance.index} on GPUs {instance.gpu_ids}, port {instance.port}")
+        return [instance.process for instance in self.instances]
 
-    def terminate_llm_server(self):
-        if self.process:
+    def terminate_llm_server(self, processes=None):
+        processes = processes or [instance.process for instance in self.instances]
+        for process in processes:
+            if not process:
+                continue
             logging.info("Terminating LLM server process...")
-            self.process.terminate()
+            process.terminate()
             try:
-                self.process.wait(timeout=10)
+                process.wait(timeout=10)
             except subprocess.TimeoutExpired:
-                self.process.kill()
+                process.kill()
             logging.info("LLM server process terminated.")
 
-    def wait_for_server_ready(self, timeout=120, interval=10):
+    def health_check(self, session=None, timeout=2, instance=None):
+        """
+        Lightweight readiness probe of a vLLM instance (the first by default): the server
+        answers /health and lists the served model on /v1/models. Does not run any inference.
+        """
+        session = session or requests
+        instance = instance or self.instances[0]
+        try:
+            response = session.get(f"{instance.url}/health", timeout=timeout)
+            if response.status_code != 200:
+                return False
+            response = session.get(f"{instance.api_base_url}/models", timeout=timeout)
+            if response.status_code != 200:
+                return False
+            served_models = [model.get('id') for model in response.json().get('data', [])]
+            return self.served_model_name in served_models
+        except (requests.RequestException, ValueError):
+            return False
+
+    def wait_for_server_ready(self, timeout=None, initial_interval=0.5, max_interval=10):
+        """
+        Probes the servers with exponential back-off until all of them are ready.
+
+        Parameters:
+            timeout (float, optional): Give up after this many seconds. Waits indefinitely by default.
+            initial_interval (float): The first delay between probes, doubled after every failure.
+            max_interval (float): The longest delay between probes.
+
+        Returns:
+            bool: True once the servers are ready, False on timeout or if a server process exited.
+        """
         start_time = time.time()
-        while time.time() - start_time < timeout:
-            if self.health_check():
-                logging.info("Server is ready.")
-                return True
-            else:
-                logging.info("Server not ready yet, waiting...")
+        interval = initial_interval
+        attempts = 0
+        pending = list(self.instances)
+        with requests.Session() as session:
+            while True:
+                attempts += 1
+                pending = [instance for instance in pending if not self.health_check(session, instance=instance)]
+                if not pending:
+                    ready_time = time.time() - start_time
+                    logging.info(f"LLM server for model {self.served_model_name} is ready after {ready_time:.1f}s ({attempts} probes).")
+                    metrics = get_metrics()
+                    metrics.set("llm_server_ready_seconds", ready_time, model=self.served_model_name)
+                    metrics.observe("miner_model_load_seconds", ready_time, model=self.served_model_name)
+                    metrics.set("miner_model_loaded", 1, model=self.served_model_name)
+                    return True
+                for instance in pending:
+                    if instance.process is not None and instance.process.poll() is not None:
+                        logging.error(f"LLM server process exited with code {instance.process.returncode} before becoming ready.")
+                        return False
+                if timeout is not None and time.time() - start_time >= timeout:
+                    logging.error("Timeout waiting for server to be ready.")
+                    return False
+                if attempts == 1:
+                    print(f"Model {self.served_model_name} is not ready. Waiting for LLM Server to finish loading the model to start.")
                 time.sleep(interval)
-        logging.error("Timeout waiting for server to be ready.")
-        return False
+                interval = min(interval * 2, max_interval)
 
-    def health_check(self):
-        try:
-            client = self.initialize_client()
-            print("Initialized client for model:", self.served_model_name)
+    def warmup(self):
+        """
+        Runs a single test prompt on every vLLM instance to warm it up and measure its baseline
+        throughput, recorded as the llm_warmup_tokens_per_second metric.
 
+        Returns:
+            float or None: The measured tokens/s summed over the instances, or None if the test
+                prompt failed on all of them.
+        """
+        results = [self._warmup_instance(instance) for instance in self.instances]
+        results = [tokens_per_second for tokens_per_second in results if tokens_per_second is not None]
+        self.baseline_tokens_per_second = sum(results) if results else None
+        return self.baseline_tokens_per_second
+
+    def _warmup_instance(self, instance):
+        try:
+            client = self.initialize_client(instance.api_base_url)
             start_time = time.time()
             response = client.chat.completions.create(
                 messages=[{"role": "user", "content": "write a 200-word essay on the topic of the future of Ethereum"}],
                 model=self.served_model_name,
                 max_tokens=200,
             )
-            end_time = time.time()
-            inference_latency = end_time - start_time
-            total_tokens = response.usage.total_tokens
-            print(f"Test prompt with {self.served_model_name}. Completed processing {total_tokens} tokens. Time: {inference_latency}s. Tokens/s: {total_tokens / inference_latency}")
-            if total_tokens / inference_latency < 5:
-                print(f"Warning: Inference speed is too slow for model {self.served_model_name}.")
-            return True
+            inference_latency = time.time() - start_time
         except Exception as e:
-            print(f"Model {self.served_model_name} is not ready. Waiting for LLM Server to finish loading the model to start.")
-            return False
\ No newline at end of file
+            logging.error(f"Warmup request to model {self.served_model_name} on {instance.url} failed: {e}")
+            return None
+
+        total_tokens = response.usage.total_tokens
+        tokens_per_second = total_tokens / inference_latency
+        instance.baseline_tokens_per_second = tokens_per_second
+        get_metrics().set("llm_warmup_tokens_per_second", tokens_per_second, model=self.served_model_name, instance=str(instance.index))
+        logging.info(f"Warmup with {self.served_model_name} on {instance.url}: {total_tokens} tokens in {inference_latency:.2f}s ({tokens_per_second:.1f} tokens/s)")
+        if tokens_per_second < 5:
+            logging.warning(f"Inference speed is too slow for model {self.served_model_name}.")
+        return tokens_per_second
@@ -0,0 +1,7 @@
+from .async_engine import AsyncJobEngine
+from .concurrency import AdaptiveConcurrencyController
+from .prefetch import JobPrefetchQueue
+from .router import PrefixAffinityRouter, RoutedInstance
+from .admission import KVCacheAdmission
+
+__all__ = ['AsyncJobEngine', 'AdaptiveConcurrencyController', 'JobPrefetchQueue', 'PrefixAffinityRouter', 'RoutedInstance', 'KVCacheAdmission']
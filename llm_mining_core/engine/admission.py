@@ -0,0 +1,163 @@
+import time
+import ctypes
+import logging
+import multiprocessing
+from mining_common.metrics import get_metrics
+
+from ..utils.token_utils import PromptTokenCounter, estimate_prompt_tokens
+
+# Seconds between admission checks of a held job
+ADMISSION_POLL_INTERVAL = 0.1
+
+class KVCacheAdmission:
+    """
+    Admission control of jobs by their KV cache footprint, so a few long prompts cannot
+    drive vLLM into preempting the requests already running.
+
+    prepare() counts the prompt tokens locally and clamps max_tokens so that prompt and
+    completion fit max_model_len and the instance's KV cache; prompts that cannot fit at all
+    are skipped. A job's footprint is its prompt tokens plus max_tokens, the most it can
+    grow to. acquire() admits a job to a vLLM instance while the footprints of the jobs in
+    flight there stay within overcommit times the cache capacity (num_gpu_blocks *
+    block_size from vllm:cache_config_info), and while its prompt fits the cache space
+    vLLM currently reports free below kv_cache_high_watermark. Otherwise the job is held
+    until it fits, for up to hold_timeout seconds, and then skipped.
+
+    Without a known cache capacity, only the max_model_len clamp applies. When admission is
+    disabled there is no token_counter: the prompt tokens are only estimated from the prompt
+    length for that clamp, so no tokenizer is loaded and no prompt tokenized. The footprints
+    in flight are kept in shared memory, so the admission is created in the parent process
+    and passed to the workers.
+    """
+
+    def __init__(self, token_counter, num_instances, max_model_len, enabled=True, overcommit=1.5,
+                 high_watermark=0.9, hold_timeout=10.0, max_metrics_age=10.0):
+        self.token_counter = token_counter
+        self.max_model_len = max_model_len
+        self.enabled = enabled
+        self.overcommit = overcommit
+        self.high_watermark = high_watermark
+        self.hold_timeout = hold_timeout
+        self.max_metrics_age = max_metrics_age
+        self._reserved = multiprocessing.Array(ctypes.c_long, num_instances)
+
+    @classmethod
+    def from_config(cls, base_config, server_config):
+        enabled = base_config.kv_admission_enabled
+        return cls(
+            PromptTokenCounter(server_config.model_id, server_config.model_revision) if enabled else None,
+            len(server_config.instances),
+            server_config.MAX_MODEL_LEN,
+            enabled=enabled,
+            overcommit=base_config.kv_overcommit,
+            high_watermark=base_config.kv_cache_high_watermark,
+            hold_timeout=base_config.kv_hold_timeout,
+            max_metrics_age=base_config.metrics_sample_interval * 10,
+        )
+
+    def capacity(self, instance):
+        """
+        Returns (capacity in tokens, fraction in use) of the instance's KV cache from its
+        metrics snapshot, or (None, None) if the server has not reported them.
+        """
+        if instance.metrics_snapshot is None or instance.metrics_snapshot.age() > self.max_metrics_age:
+            return None, None
+        snapshot = instance.metrics_snapshot.read()
+        if snapshot is None:
+            return None, None
+        cache_config = snapshot["labels"].get("cache_config_info", {})
+        try:
+            capacity = int(float(cache_config["num_gpu_blocks"])) * int(float(cache_config["block_size"]))
+        except (KeyError, ValueError):
+            return None, None
+        gauges = snapshot["gauges"]
+        usage = gauges.get("gpu_cache_usage_perc", gauges.get("kv_cache_usage_perc", 0.0))
+        return capacity, usage
+
+    def prepare(self, params, instance=None):
+        """
+        Counts (or, with admission disabled, estimates) the prompt tokens of a job and clamps
+        its max_tokens in params to what fits max_model_len and the KV cache of the instance.
+
+        Returns:
+            int or None: The prompt tokens, or None if the job has to be skipped because its
+                prompt does not fit.
+        """
+        metrics = get_metrics()
+        if self.token_counter is not None:
+            prompt_tokens = self.token_counter.count(params['decoded_prompt'], params.get('decoded_tools'))
+        else:
+            prompt_tokens = estimate_prompt_tokens(params['decoded_prompt'], params.get('decoded_tools'))
+        metrics.observe("llm_prompt_tokens", prompt_tokens)
+
+        limit = self.max_model_len
+        capacity = self.capacity(instance)[0] if instance is not None and self.enabled else None
+        if capacity is not None:
+            limit = min(limit, capacity)
+        if prompt_tokens >= limit:
+            logging.warning(f"Skipping job {params['job_id']}: its prompt of {prompt_tokens} tokens does not fit {limit} tokens.")
+            metrics.inc("llm_admission_jobs_total", outcome="skipped", reason="prompt_too_long")
+            return None
+        if prompt_tokens + params['max_tokens'] > limit:
+            logging.info(f"Clamping max_tokens of job {params['job_id']} from {params['max_tokens']} to {limit - prompt_tokens}")
+            params['max_tokens'] = limit - prompt_tokens
+            metrics.inc("llm_admission_jobs_total", outcome="clamped", reason="max_tokens")
+        return prompt_tokens
+
+    def try_acquire(self, instance, prompt_tokens, max_tokens):
+        """
+        Reserves the job's footprint on the instance if it fits now.
+
+        Returns:
+            int or None: The reserved footprint in tokens, to pass to release(), or None.
+        """
+        footprint = prompt_tokens + max_tokens
+        capacity, usage = self.capacity(instance) if self.enabled else (None, None)
+        with self._reserved.get_lock():
+            reserved = self._reserved[instance.index]
+            fits = (
+                capacity is None
+                or reserved == 0  # Never hold a job back from an idle instance
+                or (reserved + footprint <= self.overcommit * capacity
+                    and usage * capacity + prompt_tokens <= self.high_watermark * capacity)
+            )
+            if not fits:
+                return None
+            self._reserved[instance.index] = reserved + footprint
+        return footprint
+
+    def acquire(self, instance, prompt_tokens, max_tokens):
+        """
+        Reserves the job's footprint on the instance, holding the job for up to hold_timeout
+        seconds until it fits.
+
+        Returns:
+            int or None: The reserved footprint in tokens, to pass to release(), or None if
+                the job has to be skipped.
+        """
+        start_time = time.time()
+        while True:
+            footprint = self.try_acquire(instance, prompt_tokens, max_tokens)
+            if footprint is not None:
+                self.admitted(start_time)
+                return footprint
+            if time.time() - start_time >= self.hold_timeout:
+                self.rejected(instance, prompt_tokens + max_tokens)
+                return None
+            time.sleep(ADMISSION_POLL_INTERVAL)
+
+    def admitted(self, start_time):
+        held = time.time() - start_time
+        metrics = get_metrics()
+        metrics.inc("llm_admission_jobs_total", outcome="held" if held >= ADMISSION_POLL_INTERVAL else "admitted", reason="kv_cache")
+        metrics.observe("llm_admission_hold_seconds", held)
+
+    def rejected(self, instance, footprint):
+        logging.warning(
+            f"Skipping job of {footprint} tokens: it did not fit the KV cache of vLLM instance {instance.index} within {self.hold_timeout}s."
+        )
+        get_metrics().inc("llm_admission_jobs_total", outcome="skipped", reason="kv_cache")
+
+    def release(self, instance, footprint):
+        with self._reserved.get_lock():
+            self._reserved[instance.index] -= footprint
@@ -0,0 +1,342 @@
+import time
+import random
+import asyncio
+import logging
+import httpx
+from mining_common.metrics import get_metrics
+from mining_common.logging_utils import poll_log
+from mining_common.result_spool import is_retryable
+
+from .prefetch import JobPrefetchQueue
+from .admission import ADMISSION_POLL_INTERVAL
+from ..utils.job_utils import extract_job_params
+from ..utils.trace_utils import JobTrace
+from ..utils.result_utils import parse_chat_completion, encode_submit_result
+from ..utils.stream_utils import StreamRelay, FrameCoalescer, AsyncStreamPipeline
+from ..utils.requests_utils import (
+    build_miner_request_data,
+    parse_miner_response,
+)
+
+# Seconds between checks whether the prefetch queue wants another job
+PREFETCH_CHECK_INTERVAL = 0.05
+
+class AsyncJobEngine:
+    """
+    Runs num_job_slots concurrent job slots for one miner on a single asyncio event loop.
+
+    Every slot polls /miner_request, generates through the async OpenAI client and submits
+    the result with an async HTTP client, so a slow stream only occupies its own slot
+    instead of a whole worker process.
+
+    With prefetching enabled a single task polls the sequencer into a JobPrefetchQueue and
+    the slots take their jobs from it instead of polling themselves.
+
+    The router picks the vLLM instance for every job and holds the concurrency limits, and
+    the admission holds jobs back until they fit the instance's KV cache.
+    """
+
+    def __init__(self, base_config, server_config, miner_id, router, admission):
+        self.base_config = base_config
+        self.server_config = server_config
+        self.miner_id = miner_id
+        self.http = None
+        self.router = router
+        self.admission = admission
+        self.in_flight = 0
+        self.job_queue = None
+        self._job_ready = None
+        if base_config.prefetch_enabled:
+            self.job_queue = JobPrefetchQueue.from_config(base_config, parallelism=base_config.num_job_slots)
+
+    async def run(self):
+        """
+        Starts the job slots and returns once the vLLM server process is no longer running.
+        """
+        # Streamed submissions wait up to the job timeout for the sequencer's reply
+        async with self.base_config.http.async_httpx_client(read_timeout=self.base_config.llm_timeout_seconds) as http:
+            self.http = http
+            slots = [asyncio.create_task(self._slot(i)) for i in range(self.base_config.num_job_slots)]
+            if self.job_queue is not None:
+                self._job_ready = asyncio.Event()
+                slots.append(asyncio.create_task(self._prefetch()))
+            watchdog = asyncio.create_task(self._watch_server())
+            logging.info(f"Async job engine started with {len(slots)} job slots")
+            await watchdog
+            for slot in slots:
+                slot.cancel()
+            await asyncio.gather(*slots, return_exceptions=True)
+
+    async def _watch_server(self):
+        while await asyncio.to_thread(self.router.is_alive):
+            await asyncio.sleep(self.base_config.sleep_duration)
+
+    async def _slot(self, slot_id):
+        # Stagger the slots so they do not all poll the sequencer at the same time
+        await asyncio.sleep(random.uniform(0, self.base_config.sleep_duration))
+        while True:
+            try:
+                # The router counts routed jobs too, since the metrics lag behind freshly admitted jobs
+                if not self.router.has_capacity():
+                    await asyncio.sleep(self.base_config.sleep_duration)
+                    continue
+
+                if self.job_queue is not None:
+                    item = self.job_queue.pop(timeout=0)
+                    if item is None:
+                        self._job_ready.clear()
+                        try:
+                            await asyncio.wait_for(self._job_ready.wait(), self.base_config.sleep_duration)
+                        except asyncio.TimeoutError:
+                            pass
+                        continue
+                    # Take the next queued job right away
+                    await self._process_job(*item)
+                    continue
+
+                job, request_latency = await self.send_miner_request()
+                if job is not None:
+                    await self._process_job(job, request_latency)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error occurred in job slot {slot_id} for miner {self.miner_id}: {e}", exc_info=True)
+
+            await asyncio.sleep(self.base_config.sleep_duration)
+
+    async def _prefetch(self):
+        while True:
+            try:
+                # The prediction spreads the queue over the slots the concurrency limit lets run
+                self.job_queue.parallelism = max(1, min(self.base_config.num_job_slots, self.router.total_limit()))
+                if not self.job_queue.should_prefetch(self.in_flight):
+                    await asyncio.sleep(PREFETCH_CHECK_INTERVAL)
+                    continue
+
+                job, request_latency = await self.send_miner_request()
+                if job is not None:
+                    self.job_queue.push(job, request_latency)
+                    self._job_ready.set()
+                else:
+                    await asyncio.sleep(self.base_config.sleep_duration)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error occurred while prefetching jobs for miner {self.miner_id}: {e}", exc_info=True)
+                await asyncio.sleep(self.base_config.sleep_duration)
+
+    async def send_miner_request(self):
+        """
+        Async counterpart of requests_utils.send_miner_request.
+
+        Returns:
+            tuple: (job dict, request latency) if a job was received, otherwise (None, None).
+        """
+        request_data = await asyncio.to_thread(
+            build_miner_request_data, self.base_config, self.miner_id, self.base_config.served_model_name
+        )
+        start_time = time.time()
+        try:
+            response = await self.http.post(f"{self.base_config.base_url}/miner_request", json=request_data)
+        except httpx.HTTPError as e:
+            poll_log.log(logging.ERROR, "request_error", f"Error sending request: {e}")
+            get_metrics().inc("miner_polls_total", model=self.base_config.served_model_name, result="error")
+            return None, None
+        response_text = response.text if response.status_code < 400 else None
+        return parse_miner_response(response_text, response.json, start_time, self.base_config.served_model_name)
+
+    async def _process_job(self, job, request_latency, received_at=None):
+        # The timeout check and job duration include the time a prefetched job spent queued;
+        # the prefetch queue learns from the service time alone
+        job_start_time = time.time()
+        if received_at is None:
+            received_at = job_start_time
+        trace = JobTrace(job.get('job_id'), job.get('model_id'), self.miner_id, request_latency, received_at)
+        with trace.span("json_decode"):
+            params = extract_job_params(job, self.base_config)
+        if params is None:
+            logging.error(f"Failed to decode prompt for model {job['model_id']}. Skipping job {job['job_id']}.")
+            trace.fail("decode_failed")
+            trace.finish()
+            return
+
+        instance = self.router.route(params['decoded_prompt'])
+        trace.set(instance=instance.index)
+        self.in_flight += 1
+        try:
+            with trace.span("admission"):
+                footprint = await self._admit(instance, params)
+            if footprint is None:
+                trace.fail("skipped")
+                trace.finish()
+                return
+            try:
+                await self.generate(request_latency=request_latency, api_base_url=instance.api_base_url, trace=trace, **params)
+            finally:
+                self.admission.release(instance, footprint)
+        finally:
+            self.in_flight -= 1
+            self.router.release(instance)
+
+        job_end_time = time.time()
+        total_processing_time = job_end_time - received_at
+        if self.job_queue is not None:
+            self.job_queue.observe_service_time(job_end_time - job_start_time)
+        get_metrics().observe(
+            "llm_job_duration_seconds", total_processing_time, model=params['model_id'], instance=str(instance.index)
+        )
+        if total_processing_time > self.base_config.llm_timeout_seconds:
+            print(
+                "Warning: the previous request timed out. You will not earn points. Please check miner configuration or network connection."
+            )
+            trace.fail("timeout")
+        trace.finish()
+
+    async def _admit(self, instance, params):
+        """
+        Async counterpart of KVCacheAdmission.acquire(): holds the job without blocking the
+        other slots until it fits the KV cache of the instance.
+
+        Returns:
+            int or None: The reserved footprint, or None if the job was skipped.
+        """
+        # Tokenizing a long prompt takes a while, so it runs off the event loop; without
+        # admission the prompt is only estimated from its length
+        if self.admission.token_counter is not None:
+            prompt_tokens = await asyncio.to_thread(self.admission.prepare, params, instance)
+        else:
+            prompt_tokens = self.admission.prepare(params, instance)
+        if prompt_tokens is None:
+            return None
+        start_time = time.time()
+        while True:
+            footprint = self.admission.try_acquire(instance, prompt_tokens, params['max_tokens'])
+            if footprint is not None:
+                self.admission.admitted(start_time)
+                return footprint
+            if time.time() - start_time >= self.admission.hold_timeout:
+                self.admission.rejected(instance, prompt_tokens + params['max_tokens'])
+                return None
+            await asyncio.sleep(ADMISSION_POLL_INTERVAL)
+
+    async def generate(self, job_id, decoded_prompt, temperature, max_tokens, seed, stop, use_stream_flag, model_id, request_latency, decoded_tools=None, extra_body=None, api_base_url=None, trace=None):
+        """
+        Async counterpart of generate() in llm-miner.py.
+        """
+        base_config = self.base_config
+        miner_id = self.miner_id
+        client = self.server_config.initialize_async_client(api_base_url)
+        logging.info(f"Processing Request ID: {job_id}. Model ID: {model_id}. Miner ID: {miner_id}")
+
+        try:
+            if use_stream_flag:
+                logging.info("Streaming mode enabled")
+                requested_at = time.time()
+                stream = await client.chat.completions.create(
+                    messages=decoded_prompt,
+                    model=model_id,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stop=stop,
+                    seed=seed,
+                    stream=True,
+                )
+
+                # Read from vLLM and write to the sequencer through a bounded queue, and open the
+                # submit request while the first tokens are being generated
+                pipeline = AsyncStreamPipeline(
+                    stream,
+                    StreamRelay(stop, base_config.eos),
+                    FrameCoalescer.from_config(base_config),
+                    queue_size=base_config.stream_queue_size,
+                ).start()
+
+                headers = {
+                    'job_id': str(job_id),
+                    'miner_id': str(miner_id),
+                    'Content-Type': 'text/event-stream'
+                }
+                try:
+                    response = await self.http.post(
+                        f"{base_config.base_url}/miner_submit_stream",
+                        headers=headers,
+                        content=pipeline.frames(),
+                    )
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    logging.error(f"Failed to submit stream: {e}")
+                    if trace is not None:
+                        trace.fail("submit_failed")
+                finally:
+                    pipeline.close()
+                pipeline.record(job_id)
+                if trace is not None:
+                    trace.add_stream(requested_at, pipeline, time.time())
+                    if pipeline.error is not None:
+                        trace.fail("vllm_error")
+
+            else:
+                logging.info("Non-streaming mode")
+                start_time = time.time()
+
+                params = {
+                    "messages": decoded_prompt,
+                    "model": model_id,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "stop": stop,
+                    "seed": seed,
+                }
+                if extra_body:
+                    params["extra_body"] = extra_body
+                if decoded_tools:
+                    params["tools"] = decoded_tools
+                    params["tool_choice"] = "auto"
+
+                raw_response = await client.chat.completions.with_raw_response.create(**params)
+                result_choices, usage = parse_chat_completion(raw_response.http_response.content)
+
+                end_time = time.time()
+                inference_latency = end_time - start_time
+
+                total_tokens = usage.get("total_tokens", 0)
+                logging.info(f"Completed processing {total_tokens} tokens. Time: {inference_latency}s. Tokens/s: {total_tokens / inference_latency}")
+                if trace is not None:
+                    trace.add("inference", inference_latency)
+                    trace.set(stream=False, output_tokens=usage.get("completion_tokens"), total_tokens=total_tokens)
+
+                submit_start_time = time.time()
+                identity_address, signature = None, None
+                if not base_config.skip_signature:
+                    identity_address, signature = await asyncio.to_thread(
+                        base_config.wallet_generator.generate_signature, miner_id
+                    )
+                body = encode_submit_result(
+                    miner_id, job_id, result_choices, request_latency, inference_latency, identity_address, signature
+                )
+                url = base_config.base_url + "/miner_submit"
+                try:
+                    res = await self.http.post(url, content=body, headers={"Content-Type": "application/json"})
+                    status_code, error = res.status_code, f"status code: {res.status_code}"
+                except httpx.HTTPError as e:
+                    status_code, error = None, str(e)
+                if trace is not None:
+                    trace.add("submit", time.time() - submit_start_time)
+
+                if status_code == 200:
+                    logging.info(f"Result submitted successfully for job_id: {job_id}")
+                else:
+                    logging.error(f"Failed to submit result for job_id: {job_id} with {error}")
+                    # Leave the retries to the spool's background submitter and free the slot
+                    if is_retryable(status_code):
+                        job_started_at = trace.started_at if trace is not None else start_time
+                        await asyncio.to_thread(
+                            base_config.result_spool.put, job_id, url, body, job_started_at + base_config.llm_timeout_seconds
+                        )
+                    if trace is not None:
+                        trace.fail("submit_failed")
+        except Exception as e:
+            logging.error(f"Error during text generation request: {str(e)}")
+            if trace is not None:
+                trace.fail("error")
+            return
@@ -0,0 +1,135 @@
+import time
+import ctypes
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from mining_common.metrics import get_metrics
+
+class AdaptiveConcurrencyController:
+    """
+    AIMD controller for the number of requests the LLM miner keeps running on vLLM.
+
+    Runs in the parent process: it is fed every vLLM metrics snapshot and the completion
+    time of every job, and publishes its limit through shared memory so all workers can
+    read it with current_limit(). The limit grows by increase_step while it is saturated
+    and jobs finish comfortably inside the deadline, and is cut by decrease_factor as soon
+    as jobs approach the deadline, requests queue up in vLLM, the KV cache runs full or
+    time-to-first-token exceeds its objective.
+
+    With enabled=False the limit stays at initial_limit (concurrency_soft_limit).
+    """
+
+    def __init__(self, initial_limit, min_limit=1, max_limit=32, deadline=180, enabled=True,
+                 increase_step=1, decrease_factor=0.7, target_ratio=0.5, backoff_ratio=0.8,
+                 max_waiting_requests=0, kv_cache_high_watermark=0.9, ttft_slo=5.0,
+                 adjust_interval=5.0, window=20, labels=None):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.deadline = deadline
+        self.enabled = enabled
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.target_ratio = target_ratio
+        self.backoff_ratio = backoff_ratio
+        self.max_waiting_requests = max_waiting_requests
+        self.kv_cache_high_watermark = kv_cache_high_watermark
+        self.ttft_slo = ttft_slo
+        self.adjust_interval = adjust_interval
+        # Metric labels, e.g. the vLLM instance this controller limits
+        self.labels = labels or {}
+        self._limit = multiprocessing.Value(ctypes.c_double, float(initial_limit), lock=False)
+        self._durations = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._last_adjustment = 0
+        self._last_ttft = None
+
+    @classmethod
+    def from_config(cls, base_config, labels=None):
+        return cls(
+            base_config.concurrency_soft_limit,
+            min_limit=base_config.min_concurrency,
+            max_limit=base_config.max_concurrency,
+            deadline=base_config.llm_timeout_seconds,
+            enabled=base_config.adaptive_concurrency,
+            ttft_slo=base_config.ttft_slo_seconds,
+            kv_cache_high_watermark=base_config.kv_cache_high_watermark,
+            labels=labels,
+        )
+
+    def __getstate__(self):
+        # Workers only need the shared limit
+        state = self.__dict__.copy()
+        state['_durations'] = None
+        state['_lock'] = None
+        return state
+
+    def current_limit(self):
+        return int(self._limit.value)
+
+    def observe_job(self, duration, labels=None):
+        """Records the end-to-end processing time of a completed job (a metrics listener)."""
+        with self._lock:
+            self._durations.append(duration)
+
+    def _recent_ttft(self, snapshot):
+        # Mean time-to-first-token over the requests finished since the previous snapshot
+        histogram = snapshot["histograms"].get("time_to_first_token_seconds")
+        if not histogram:
+            return None
+        previous, self._last_ttft = self._last_ttft, (histogram["sum"], histogram["count"])
+        if previous is None or histogram["count"] <= previous[1]:
+            return None
+        return (histogram["sum"] - previous[0]) / (histogram["count"] - previous[1])
+
+    def decide(self, snapshot):
+        """
+        Returns (decision, reason), where decision is "increase", "decrease" or "hold".
+        """
+        gauges = snapshot["gauges"]
+        running = gauges.get("num_requests_running", 0)
+        waiting = gauges.get("num_requests_waiting", 0)
+        kv_cache_usage = gauges.get("gpu_cache_usage_perc", gauges.get("kv_cache_usage_perc", 0))
+        ttft = self._recent_ttft(snapshot)
+        with self._lock:
+            durations = sorted(self._durations)
+        p90_duration = durations[int(len(durations) * 0.9)] if durations else None
+
+        if p90_duration is not None and p90_duration > self.backoff_ratio * self.deadline:
+            return "decrease", "deadline"
+        if kv_cache_usage > self.kv_cache_high_watermark:
+            return "decrease", "kv_cache"
+        if waiting > self.max_waiting_requests:
+            return "decrease", "waiting"
+        if ttft is not None and ttft > self.ttft_slo:
+            return "decrease", "ttft"
+        if running < self.current_limit() - 1:
+            return "hold", "unsaturated"
+        if p90_duration is not None and p90_duration < self.target_ratio * self.deadline:
+            return "increase", "headroom"
+        return "hold", "steady"
+
+    def update(self, snapshot):
+        """
+        Adjusts the limit from a parsed vLLM metrics snapshot, at most once per adjust_interval.
+        """
+        if not self.enabled or time.time() - self._last_adjustment < self.adjust_interval:
+            return
+        self._last_adjustment = time.time()
+
+        decision, reason = self.decide(snapshot)
+        limit = self._limit.value
+        if decision == "increase":
+            new_limit = min(self.max_limit, limit + self.increase_step)
+        elif decision == "decrease":
+            new_limit = max(self.min_limit, limit * self.decrease_factor)
+        else:
+            new_limit = limit
+        self._limit.value = new_limit
+
+        metrics = get_metrics()
+        metrics.set("llm_concurrency_limit", int(new_limit), **self.labels)
+        metrics.inc("llm_concurrency_decisions_total", decision=decision, reason=reason, **self.labels)
+        if int(new_limit) != int(limit):
+            labels = "".join(f", {key}={value}" for key, value in self.labels.items())
+            logging.info(f"Concurrency limit {decision}d from {int(limit)} to {int(new_limit)} ({reason}{labels})")
@@ -0,0 +1,123 @@
+import os
+import time
+import heapq
+import logging
+import itertools
+import threading
+from mining_common.metrics import get_metrics
+
+class JobPrefetchQueue:
+    """
+    Local queue of jobs fetched from the sequencer ahead of time, so the next job is already
+    at hand when the current one finishes instead of costing a poll round trip and a sleep.
+
+    Jobs are dispatched earliest-deadline-first, where a job's deadline is the time it was
+    received plus llm_timeout_seconds. Jobs whose deadline has passed by the time they are
+    dispatched are dropped. An EWMA of the service time predicts when a newly fetched job
+    would complete; should_prefetch() refuses to fetch more once that prediction exceeds
+    safety_margin of the deadline, so prefetching never turns a job that could be served in
+    time into a timeout.
+
+    The queue is thread-safe. parallelism is the number of jobs the consumer runs at once:
+    1 for a worker process, num_job_slots for the asyncio engine. Its depth is reported per
+    worker process in the llm_prefetch_queue_depth gauge.
+    """
+
+    def __init__(self, deadline, max_queued_jobs=2, parallelism=1, safety_margin=0.8, alpha=0.2):
+        self.deadline = deadline
+        self.max_queued_jobs = max_queued_jobs
+        self.parallelism = parallelism
+        self.safety_margin = safety_margin
+        self.alpha = alpha
+        self.service_time = None
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._worker = str(os.getpid())
+
+    @classmethod
+    def from_config(cls, base_config, parallelism=1):
+        return cls(
+            base_config.llm_timeout_seconds,
+            max_queued_jobs=base_config.prefetch_max_queued_jobs,
+            parallelism=parallelism,
+            safety_margin=base_config.prefetch_safety_margin,
+        )
+
+    def __len__(self):
+        with self._condition:
+            return len(self._heap)
+
+    def observe_service_time(self, seconds):
+        """Updates the service time estimate with the processing time of a finished job."""
+        with self._condition:
+            if self.service_time is None:
+                self.service_time = seconds
+            else:
+                self.service_time = self.alpha * seconds + (1 - self.alpha) * self.service_time
+            self._condition.notify_all()
+
+    def predicted_completion(self, in_flight):
+        """
+        Seconds until a job fetched now would complete, given the jobs already queued and
+        in_flight jobs running, or None while there is no service time estimate yet.
+        """
+        if self.service_time is None:
+            return None
+        with self._condition:
+            ahead = len(self._heap) + in_flight
+        return self.service_time * (1 + ahead / self.parallelism)
+
+    def should_prefetch(self, in_flight):
+        """
+        Returns True if another job should be requested while in_flight jobs are running.
+        """
+        with self._condition:
+            queued = len(self._heap)
+        if queued >= self.max_queued_jobs:
+            return False
+        if queued == 0 and in_flight < self.parallelism:
+            # Someone is idle: this is a regular poll, not a prefetch
+            return True
+        predicted = self.predicted_completion(in_flight)
+        return predicted is not None and predicted <= self.safety_margin * self.deadline
+
+    def push(self, job, request_latency, received_at=None):
+        received_at = received_at if received_at is not None else time.time()
+        with self._condition:
+            heapq.heappush(self._heap, (received_at + self.deadline, next(self._counter), received_at, job, request_latency))
+            depth = len(self._heap)
+            self._condition.notify_all()
+        get_metrics().set("llm_prefetch_queue_depth", depth, worker=self._worker)
+
+    def pop(self, timeout=None):
+        """
+        Returns (job, request_latency, received_at) of the queued job with the earliest
+        deadline, waiting up to timeout seconds for one (timeout=0 does not wait), or None.
+        received_at is the time.time() the job was received from the sequencer.
+        """
+        metrics = get_metrics()
+        end_time = time.time() + timeout if timeout is not None else None
+        with self._condition:
+            while True:
+                while self._heap:
+                    deadline, _, received_at, job, request_latency = heapq.heappop(self._heap)
+                    now = time.time()
+                    if now >= deadline:
+                        logging.warning(f"Dropping prefetched job {job.get('job_id')}: its deadline passed in the queue.")
+                        metrics.inc("llm_prefetch_jobs_total", outcome="expired")
+                        continue
+                    metrics.inc("llm_prefetch_jobs_total", outcome="dispatched")
+                    metrics.observe("llm_prefetch_wait_seconds", now - received_at)
+                    metrics.set("llm_prefetch_queue_depth", len(self._heap), worker=self._worker)
+                    self._condition.notify_all()
+                    return job, request_latency, received_at
+                remaining = end_time - time.time() if end_time is not None else None
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def wait(self, timeout):
+        """Waits until a job is pushed, popped or finished, or for timeout seconds."""
+        with self._condition:
+            self._condition.wait(timeout)
@@ -0,0 +1,146 @@
+import json
+import ctypes
+import random
+import hashlib
+import logging
+import multiprocessing
+from mining_common.metrics import get_metrics
+
+class RoutedInstance:
+    """
+    One vLLM server as seen by the router: where to send requests, the metrics snapshot
+    published by its sampler, its watchdog and its concurrency controller.
+    """
+
+    def __init__(self, index, api_base_url, metrics_snapshot, watchdog, controller):
+        self.index = index
+        self.api_base_url = api_base_url
+        self.metrics_snapshot = metrics_snapshot
+        self.watchdog = watchdog
+        self.controller = controller
+
+class PrefixAffinityRouter:
+    """
+    Routes the jobs of one LLM miner between several vLLM servers (data-parallel GPU groups).
+
+    Jobs whose prompts start with the same system messages are sent to the same server, so
+    vLLM's prefix cache already holds their shared prefix. The server for a prefix is picked
+    by rendezvous hashing, which keeps the assignment stable without any shared table. When
+    that server has more than max_imbalance requests queued beyond the least loaded one, the
+    job goes to the next server in the prefix's ranking instead. Jobs without a usable prefix
+    go to the server with the shortest queue.
+
+    The queue depth of a server is its running plus waiting requests from the shared metrics
+    snapshot, or the jobs routed to it and not yet released if that is higher, since the
+    metrics lag behind freshly routed jobs. Routed jobs are counted in shared memory, so the
+    router can be created in the parent process and passed to the workers.
+    """
+
+    def __init__(self, instances, prefix_affinity=True, prefix_chars=2048, max_imbalance=2, max_metrics_age=10.0):
+        self.instances = instances
+        self.prefix_affinity = prefix_affinity
+        self.prefix_chars = prefix_chars
+        self.max_imbalance = max_imbalance
+        self.max_metrics_age = max_metrics_age
+        self._in_flight = multiprocessing.Array(ctypes.c_int, len(instances))
+
+    @classmethod
+    def from_config(cls, base_config, instances):
+        return cls(
+            instances,
+            prefix_affinity=base_config.prefix_affinity,
+            prefix_chars=base_config.prefix_chars,
+            max_imbalance=base_config.router_max_imbalance,
+            max_metrics_age=base_config.metrics_sample_interval * 10,
+        )
+
+    def __len__(self):
+        return len(self.instances)
+
+    def _gauge(self, instance, name):
+        return instance.metrics_snapshot.get_gauge(name, max_age=self.max_metrics_age)
+
+    def running(self, instance):
+        """Requests running on the server, counting jobs routed to it that vLLM has not reported yet."""
+        running = self._gauge(instance, "num_requests_running") or 0
+        return max(running, self._in_flight[instance.index])
+
+    def depth(self, instance):
+        """Running plus waiting requests on the server."""
+        queued = (self._gauge(instance, "num_requests_running") or 0) + (self._gauge(instance, "num_requests_waiting") or 0)
+        return max(queued, self._in_flight[instance.index])
+
+    def has_capacity(self):
+        """Returns True if any server runs fewer requests than its concurrency limit."""
+        return any(self.running(instance) < instance.controller.current_limit() for instance in self.instances)
+
+    def total_limit(self):
+        return sum(instance.controller.current_limit() for instance in self.instances)
+
+    def is_alive(self):
+        """Returns False as soon as any of the vLLM servers is no longer running."""
+        return all(instance.watchdog.is_alive() for instance in self.instances)
+
+    def prefix_key(self, messages):
+        """
+        Returns the leading system messages of a chat prompt (or its first message if it has
+        none), cut to prefix_chars, as bytes, or None if the prompt has no usable prefix.
+        """
+        if not isinstance(messages, list) or not messages:
+            return None
+        leading = []
+        for message in messages:
+            if not isinstance(message, dict) or message.get("role") != "system":
+                break
+            leading.append(message)
+        if not leading:
+            leading = messages[:1]
+        prefix = json.dumps(leading, sort_keys=True)[:self.prefix_chars]
+        return prefix.encode() if prefix else None
+
+    def _ranking(self, key):
+        # Rendezvous hashing: every server scores the prefix and the highest score wins
+        def score(instance):
+            return hashlib.blake2b(key + instance.index.to_bytes(4, "little"), digest_size=8).digest()
+        return sorted(self.instances, key=score, reverse=True)
+
+    def route(self, messages):
+        """
+        Picks the server for a job with the given chat prompt and counts the job against it
+        until release() is called.
+
+        Returns:
+            RoutedInstance: The server to send the job to.
+        """
+        if len(self.instances) == 1:
+            instance, reason = self.instances[0], "single"
+        else:
+            depths = {instance.index: self.depth(instance) for instance in self.instances}
+            least_loaded = min(depths.values())
+            key = self.prefix_key(messages) if self.prefix_affinity else None
+            if key is not None:
+                ranking = self._ranking(key)
+                instance = next(
+                    candidate for candidate in ranking
+                    if depths[candidate.index] <= least_loaded + self.max_imbalance
+                )
+                reason = "affinity" if instance is ranking[0] else "overflow"
+            else:
+                instance = min(self.instances, key=lambda candidate: (depths[candidate.index], random.random()))
+                reason = "balanced"
+
+        with self._in_flight.get_lock():
+            self._in_flight[instance.index] += 1
+        get_metrics().inc("llm_router_jobs_total", instance=str(instance.index), reason=reason)
+        logging.debug(f"Routed job to vLLM instance {instance.index} ({reason})")
+        return instance
+
+    def release(self, instance):
+        """Marks a job routed to instance as finished."""
+        with self._in_flight.get_lock():
+            self._in_flight[instance.index] -= 1
+
+    def observe_job(self, duration, labels=None):
+        """Feeds a job duration to the controller of the server that ran it (a metrics listener)."""
+        index = int((labels or {}).get("instance", 0))
+        self.instances[index].controller.observe_job(duration, labels)
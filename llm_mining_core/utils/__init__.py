@@ -1,16 +1,22 @@
-from .config_utils import load_config, load_miner_ids
+from .config_utils import load_config, load_miner_ids, get_config_path
 from .cuda_utils import get_hardware_description
 from .requests_utils import send_miner_request
 from .requests_utils import get_metric_value
 from .requests_utils import check_vllm_server_status
 from .requests_utils import send_model_info_signal
 from .logging_utils import configure_logging
+from .trace_utils import JobTrace, configure_trace_logging, start_trace_writer
+from .metrics_utils import VLLMMetricsSnapshot, VLLMMetricsSampler
+from .watchdog_utils import VLLMServerWatchdog
 
 __all__ = [
-    'load_config', 'load_miner_ids',
+    'load_config', 'load_miner_ids', 'get_config_path',
     'get_hardware_description',
     'check_vllm_server_status', 'send_miner_request',
     'configure_logging',
+    'JobTrace', 'configure_trace_logging', 'start_trace_writer',
     'get_metric_value',
     'send_model_info_signal',
+    'VLLMMetricsSnapshot', 'VLLMMetricsSampler',
+    'VLLMServerWatchdog',
 ]
\ No newline at end of file
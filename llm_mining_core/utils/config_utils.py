@@ -1,10 +1,15 @@
 import os
 import re
 from pathlib import Path
-import subprocess
+from mining_common.hardware import get_hardware_inventory, set_hardware_inventory
 from llm_mining_core.config import BaseConfig, LLMServerConfig
 
-def load_config(filename='config.toml'):
+def get_config_path(filename='config.toml'):
+    """Returns the absolute path of a configuration file in the repository root."""
+    base_dir = Path(__file__).resolve().parents[2]
+    return os.path.join(base_dir, filename)
+
+def load_config(filename='config.toml', snapshot=None):
     """
     Loads the configuration settings from the specified TOML file.
 
@@ -15,15 +20,19 @@ def load_config(filename='config.toml'):
     Parameters:
         filename (str, optional): The name of the TOML configuration file.
             Defaults to 'config.toml'.
+        snapshot (ConfigSnapshot, optional): The parent's config snapshot. When given, the
+            configuration and command line are taken from it instead of being parsed again.
 
     Returns:
         tuple: A tuple containing two objects:
             - base_config (BaseConfig): An instance of the BaseConfig class.
             - server_config (LLMServerConfig): An instance of the LLMServerConfig class.
     """
-    base_dir = Path(__file__).resolve().parents[2]
-    config_path = os.path.join(base_dir, filename)
-    base_config = BaseConfig(config_path)
+    config_path = snapshot.config_file if snapshot is not None else get_config_path(filename)
+    if snapshot is not None and 'hardware' in snapshot.data:
+        # Reuse the parent's hardware inventory instead of probing the GPUs again
+        set_hardware_inventory(snapshot.data['hardware'])
+    base_config = BaseConfig(config_path, snapshot=snapshot)
     server_config = LLMServerConfig(base_config)
     return base_config, server_config
 
@@ -59,16 +68,13 @@ def load_miner_ids():
                 composite_miner_ids.append(miner_id)
             else:
                 # Miner ID is a valid EVM address without a suffix or with an empty suffix
-                # Get the GPU UUID using nvidia-smi
-                try:
-                    output = subprocess.check_output(["nvidia-smi", "-L"]).decode("utf-8")
-                    gpu_info = output.split("\n")[i].strip()
-                    gpu_uuid_segment = gpu_info.split("GPU-")[1].split("-")[0]
-                    short_uuid = gpu_uuid_segment[:6]
-                    composite_miner_id = f"{evm_address}-{short_uuid}"
+                # Append the GPU UUID from the hardware inventory
+                gpu = get_hardware_inventory().gpu(i)
+                if gpu is not None and "GPU-" in gpu.uuid:
+                    composite_miner_id = f"{evm_address}-{gpu.short_uuid}"
                     composite_miner_ids.append(composite_miner_id)
-                except (subprocess.CalledProcessError, IndexError):
-                    # nvidia-smi command failed or UUID not found
+                else:
+                    # No GPU probed or UUID not found
                     print(f"WARNING: Failed to retrieve GPU UUID for GPU {i}. Using original miner ID.")
                     composite_miner_ids.append(miner_id)
         else:
@@ -0,0 +1,56 @@
+import json
+import logging
+
+# Most tokens generated for a job, whatever max_tokens the sequencer asks for
+MAX_TOKENS_LIMIT = 4096
+
+def decode_prompt_json(prompt_json):
+    try:
+        return json.loads(prompt_json)
+    except json.JSONDecodeError as e:
+        logging.error(f"Failed to decode prompt JSON: {e}")
+        return None
+
+def extract_job_params(job, base_config):
+    """
+    Extracts the generation parameters from a job returned by /miner_request.
+
+    Parameters:
+        job (dict): The job details returned by the sequencer.
+        base_config (BaseConfig): The configuration instance providing the stop words.
+
+    Returns:
+        dict or None: Keyword arguments for generate() (without the configs, miner ID and
+            request latency), with max_tokens capped at MAX_TOKENS_LIMIT, or None if the
+            prompt could not be decoded.
+    """
+    llm_input = job['model_input']['LLM']
+    seed = llm_input['seed']
+    if seed == -1:
+        seed = None
+
+    decoded_prompt = decode_prompt_json(llm_input['prompt'])
+    if decoded_prompt is None:
+        return None
+
+    # If function calling is enabled, pass tools to generate()
+    decoded_tools = None
+    if llm_input.get('tools', None):
+        decoded_tools = decode_prompt_json(llm_input['tools'])
+
+    extra_body = llm_input.get('extra_body', None)
+    if extra_body:
+        extra_body = json.loads(extra_body)
+
+    return {
+        "job_id": job['job_id'],
+        "decoded_prompt": decoded_prompt,
+        "temperature": llm_input['temperature'],
+        "max_tokens": min(llm_input['max_tokens'], MAX_TOKENS_LIMIT),
+        "seed": seed,
+        "stop": base_config.stop_words,
+        "use_stream_flag": llm_input['use_stream'],
+        "model_id": job['model_id'],
+        "decoded_tools": decoded_tools,
+        "extra_body": extra_body,
+    }
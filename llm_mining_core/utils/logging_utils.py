@@ -1,37 +1,45 @@
 import logging
+from mining_common.logging_utils import start_file_logging, configure_queue_logging, poll_log
 
-def configure_logging(config, miner_id=None):
+def get_log_filename(config, miner_id=None):
+    """Returns the log file of a miner: the base log filename with the miner ID appended."""
+    base_log_filename = config.log_filename.split('.')[0]
+    if miner_id is not None:
+        return f"{base_log_filename}_{miner_id}.log"
+    return f"{base_log_filename}.log"
+
+def configure_logging(config, miner_id=None, log_queue=None):
     """
     Configures the logging settings for the miner process.
 
     This function sets up the logging configuration based on the provided config object
     and the miner ID. It constructs the log filename using the base log filename from
-    the config and appends the miner ID if provided. The log file is opened in append
-    mode, and the log messages are formatted with timestamp, name, level, and message.
-    The log level is set to INFO.
+    the config and appends the miner ID if provided. The parent process owns the log file:
+    a listener thread writes it, rotating it at log_max_bytes, while logging calls only
+    enqueue their records. Worker processes pass the parent's log_queue instead and send
+    their records there. The log messages are formatted with timestamp, name, level, and
+    message. The log level is set to INFO.
 
     Parameters:
         config (BaseConfig): The configuration object containing the base log filename.
         miner_id (str, optional): The ID of the miner process. If provided, it will be
             appended to the log filename. Defaults to None.
+        log_queue (multiprocessing.Queue, optional): The queue of the parent's log writer.
+            Defaults to None, which makes this process the writer of the log file.
 
     Returns:
-        None
+        LogWriter or None: The writer of the log file in the parent process, None in workers.
     """
-    # Construct the log filename using both cuda_device_id and miner_id
-    base_log_filename = config.log_filename.split('.')[0]
-    if miner_id is not None:
-        process_log_filename = f"{base_log_filename}_{miner_id}.log"
-    else:
-        process_log_filename = f"{base_log_filename}.log"
+    poll_log.interval = config.poll_log_interval
+    if log_queue is not None:
+        configure_queue_logging(log_queue, logging.INFO)
+        return None
 
+    process_log_filename = get_log_filename(config, miner_id)
     print(f"Configuring log level to: {logging.getLevelName(logging.INFO)}. Log file name: {process_log_filename}")
     # Verifying log level
 
     # Setup logging with the configured filename and log level
-    logging.basicConfig(
-        filename=process_log_filename,
-        filemode='a',
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=logging.INFO
-    )
\ No newline at end of file
+    return start_file_logging(
+        process_log_filename, logging.INFO, max_bytes=config.log_max_bytes, backup_count=config.log_backup_count
+    )
@@ -0,0 +1,215 @@
+import json
+import time
+import ctypes
+import logging
+import threading
+import requests
+import multiprocessing
+
+VLLM_METRIC_PREFIX = "vllm:"
+HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+def _parse_labels(label_text):
+    labels = {}
+    for part in label_text.split('",'):
+        if '=' not in part:
+            continue
+        key, value = part.split('=', 1)
+        labels[key.strip()] = value.strip().strip('"')
+    return labels
+
+def parse_prometheus_metrics(response_text, prefix=VLLM_METRIC_PREFIX):
+    """
+    Parses the vLLM gauges, counters and histograms out of a Prometheus text payload.
+
+    Samples of the same metric with different label sets (e.g. one per model_name) are
+    summed. The prefix is stripped from the metric names.
+
+    Parameters:
+        response_text (str): The body of the /metrics endpoint.
+        prefix (str, optional): Only metrics starting with this prefix are kept.
+
+    Returns:
+        dict: {
+            "gauges": {name: value} for gauges and counters,
+            "histograms": {name: {"buckets": {le: count}, "sum": float, "count": float}},
+            "labels": {name: labels of the first sample}, e.g. for vllm:cache_config_info
+        }
+    """
+    histogram_names = set()
+    gauges = {}
+    histograms = {}
+    labels = {}
+
+    for line in response_text.split('\n'):
+        if line.startswith('# TYPE '):
+            parts = line.split()
+            if len(parts) >= 4 and parts[3] == 'histogram' and parts[2].startswith(prefix):
+                histogram_names.add(parts[2][len(prefix):])
+            continue
+        if not line.startswith(prefix):
+            continue
+
+        sample, _, value_text = line.rpartition(' ')
+        try:
+            value = float(value_text)
+        except ValueError:
+            continue
+
+        sample_labels = {}
+        if '{' in sample:
+            sample, _, label_text = sample.partition('{')
+            sample_labels = _parse_labels(label_text.rstrip('}'))
+        name = sample[len(prefix):]
+
+        base_name, suffix = name, None
+        for histogram_suffix in HISTOGRAM_SUFFIXES:
+            if name.endswith(histogram_suffix) and name[:-len(histogram_suffix)] in histogram_names:
+                base_name, suffix = name[:-len(histogram_suffix)], histogram_suffix
+                break
+
+        if suffix is None:
+            gauges[name] = gauges.get(name, 0.0) + value
+            labels.setdefault(name, sample_labels)
+            continue
+
+        histogram = histograms.setdefault(base_name, {"buckets": {}, "sum": 0.0, "count": 0.0})
+        if suffix == "_bucket":
+            le = sample_labels.get('le', '+Inf')
+            histogram["buckets"][le] = histogram["buckets"].get(le, 0.0) + value
+        elif suffix == "_sum":
+            histogram["sum"] += value
+        else:
+            histogram["count"] += value
+
+    return {"gauges": gauges, "histograms": histograms, "labels": labels}
+
+class VLLMMetricsSnapshot:
+    """
+    The latest parsed vLLM metrics, held in shared memory so that every worker process reads
+    the same snapshot instead of scraping the /metrics endpoint itself.
+
+    Create it in the parent process and pass it to the children as a Process argument.
+    """
+
+    def __init__(self, size=256 * 1024):
+        self._buffer = multiprocessing.Array(ctypes.c_char, size)
+        self._length = multiprocessing.Value(ctypes.c_int, 0, lock=False)
+        self._version = multiprocessing.Value(ctypes.c_long, 0, lock=False)
+        self._timestamp = multiprocessing.Value(ctypes.c_double, 0.0, lock=False)
+        self._cached_version = -1
+        self._cached = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_cached_version'] = -1
+        state['_cached'] = None
+        return state
+
+    def publish(self, metrics):
+        """
+        Publishes metrics to the workers. If they do not fit the shared buffer, the histograms
+        and then the labels are dropped; if even the gauges do not fit, the previous snapshot
+        is kept, since a truncated one could not be decoded.
+        """
+        data = json.dumps(metrics).encode()
+        dropped = []
+        for field in ("histograms", "labels"):
+            if len(data) <= len(self._buffer):
+                break
+            dropped.append(field)
+            metrics = {**metrics, field: {}}
+            data = json.dumps(metrics).encode()
+        if len(data) > len(self._buffer):
+            logging.warning(f"vLLM metrics snapshot of {len(data)} bytes without {' and '.join(dropped)} exceeds the shared buffer of {len(self._buffer)} bytes. Keeping the previous snapshot.")
+            return
+        if dropped:
+            logging.warning(f"vLLM metrics snapshot exceeds the shared buffer of {len(self._buffer)} bytes. Dropped {' and '.join(dropped)}.")
+        with self._buffer.get_lock():
+            self._buffer[:len(data)] = data
+            self._length.value = len(data)
+            self._timestamp.value = time.time()
+            self._version.value += 1
+
+    def read(self):
+        """
+        Returns the latest snapshot as a dict (see parse_prometheus_metrics), or None if the
+        sampler has not published one yet. Decoding only happens when the snapshot changed.
+        """
+        with self._buffer.get_lock():
+            version = self._version.value
+            if version == self._cached_version:
+                return self._cached
+            data = self._buffer[:self._length.value]
+        self._cached = json.loads(data) if data else None
+        self._cached_version = version
+        return self._cached
+
+    def age(self):
+        """Seconds since the last successful scrape."""
+        return time.time() - self._timestamp.value
+
+    def get_gauge(self, metric_name, default=None, max_age=None):
+        """
+        Returns the value of a vLLM gauge or counter, e.g. "num_requests_running".
+
+        Parameters:
+            metric_name (str): The metric name without the "vllm:" prefix.
+            default: The value returned when the metric is missing or the snapshot is stale.
+            max_age (float, optional): Treat snapshots older than this many seconds as missing.
+        """
+        if max_age is not None and self.age() > max_age:
+            return default
+        snapshot = self.read()
+        if snapshot is None:
+            return default
+        return snapshot["gauges"].get(metric_name, default)
+
+class VLLMMetricsSampler:
+    """
+    Scrapes the vLLM /metrics endpoint on a fixed interval from a background thread and
+    publishes the parsed result to a VLLMMetricsSnapshot.
+    """
+
+    def __init__(self, base_config, snapshot, interval=None, url=None):
+        self.url = url or f"{base_config.llm_url}:{base_config.port}/metrics"
+        self.snapshot = snapshot
+        self.interval = interval if interval is not None else base_config.metrics_sample_interval
+        self.session = requests.Session()
+        self._listeners = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add_listener(self, callback):
+        """Calls callback(metrics) with every parsed snapshot, e.g. to drive a controller."""
+        self._listeners.append(callback)
+
+    def sample(self):
+        try:
+            response = self.session.get(self.url, timeout=max(self.interval, 1.0))
+            response.raise_for_status()
+            metrics = parse_prometheus_metrics(response.text)
+        except Exception as e:
+            logging.debug(f"Failed to sample vLLM metrics from {self.url}: {e}")
+            return False
+
+        self.snapshot.publish(metrics)
+        for callback in self._listeners:
+            try:
+                callback(metrics)
+            except Exception as e:
+                logging.error(f"vLLM metrics listener failed: {e}")
+        return True
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="vllm-metrics-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
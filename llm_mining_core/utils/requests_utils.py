@@ -4,6 +4,8 @@ import logging
 import requests
 from urllib3.util import Retry
 from requests.adapters import HTTPAdapter
+from mining_common.metrics import get_metrics
+from mining_common.logging_utils import poll_log
 from .cuda_utils import get_hardware_description
 
 DEFAULT_MINER_ID = "default_miner_id"
@@ -36,6 +38,23 @@ def send_miner_request(config, miner_id, model_id):
         dict or None: The job details as a dictionary if available, otherwise None.
     """
     url = f"{config.base_url}/miner_request"
+    request_data = build_miner_request_data(config, miner_id, model_id)
+    current_time = time.time()
+
+    try:
+        response = config.session.post(url, json=request_data)
+        response_text = response.text if response else None
+        return parse_miner_response(response_text, response.json, current_time, model_id)
+    except requests.exceptions.RequestException as e:
+        poll_log.log(logging.ERROR, "request_error", f"Error sending request: {e}")
+        get_metrics().inc("miner_polls_total", model=model_id, result="error")
+        return None, None
+
+def build_miner_request_data(config, miner_id, model_id):
+    """
+    Builds the /miner_request payload, attaching the hardware description and version
+    once per minute per miner_id as a heartbeat.
+    """
     if miner_id is None:
         miner_id = DEFAULT_MINER_ID
 
@@ -51,33 +70,53 @@ def send_miner_request(config, miner_id, model_id):
         request_data['hardware'] = get_hardware_description()
         request_data['version'] = config.version
         config.last_heartbeat_per_miner[miner_id] = current_time
+    return request_data
 
-    try:
-        response = config.session.post(url, json=request_data)
-        # Assuming response.text contains the full text response from the server
-        warning_indicator = "Warning:"
-        if response and warning_indicator in response.text:
-            # Extract the warning message and use strip() to remove any trailing quotation marks
-            warning_message = response.text.split(warning_indicator)[1].strip('"')
-            print(f"WARNING: {warning_message}")
-            return None, None
+def parse_miner_response(response_text, load_json, start_time, model_id=None):
+    """
+    Interprets a /miner_request response and counts the poll in miner_polls_total by result
+    (job, empty, warning or error) and a received job in miner_jobs_fetched_total.
+
+    Parameters:
+        response_text (str or None): The raw response body, or None for an error status.
+        load_json (callable): Decodes the response body as JSON.
+        start_time (float): The timestamp at which the request was sent.
+        model_id (str, optional): The model the job was requested for.
 
-        try:
-            data = response.json()
-            end_time = time.time()
-            request_latency = end_time - current_time
-            if isinstance(data, dict):
-                return data, request_latency
+    Returns:
+        tuple: (job dict, request latency) if a job was received, otherwise (None, None).
+    """
+    metrics = get_metrics()
+    # Assuming response_text contains the full text response from the server
+    warning_indicator = "Warning:"
+    if response_text and warning_indicator in response_text:
+        # Extract the warning message and use strip() to remove any trailing quotation marks
+        warning_message = response_text.split(warning_indicator)[1].strip('"')
+        poll_log.log(logging.WARNING, "sequencer_warning", f"WARNING: {warning_message}", echo=True)
+        metrics.inc("miner_polls_total", model=model_id, result="warning")
+        return None, None
+
+    try:
+        data = load_json()
+        end_time = time.time()
+        request_latency = end_time - start_time
+        if isinstance(data, dict):
+            if 'job_id' in data:
+                metrics.inc("miner_polls_total", model=model_id, result="job")
+                metrics.inc("miner_jobs_fetched_total", model=data.get('model_id', model_id))
             else:
-                return None, None
-        except Exception as e:
-            # fail silently
-            # print(f"Error parsing response: {e}")
+                metrics.inc("miner_polls_total", model=model_id, result="empty" if response_text is not None else "error")
+            return data, request_latency
+        else:
+            metrics.inc("miner_polls_total", model=model_id, result="empty")
             return None, None
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error sending request: {e}")
+    except Exception as e:
+        # fail silently
+        # print(f"Error parsing response: {e}")
+        metrics.inc("miner_polls_total", model=model_id, result="empty" if response_text is not None else "error")
         return None, None
-    
+
+
 def get_metric_value(metric_name, base_config):
     """
     Fetches the value of a specific metric from the llm endpoint.
@@ -92,19 +131,25 @@ def get_metric_value(metric_name, base_config):
     try:
         url = f"{base_config.llm_url}:{base_config.port}/metrics"
         #Call the metrics endpoint to get the metric value
-        response = requests.get(url)
-        response_text = response.text
-        lines = response_text.split('\n')
-        for line in lines:
-            if line.startswith(f"vllm:{metric_name}"):
-                parts = line.split(' ')
-                if len(parts) >= 2:
-                    value = float(parts[1])
-                    return value
+        response = base_config.session.get(url)
+        return parse_metric_value(response.text, metric_name)
     except Exception as e:
         # fail silently
         logging.error(f"Error occurred while finding metric value: {str(e)}")
         return None
+
+def parse_metric_value(response_text, metric_name):
+    """
+    Returns the first value of the vllm:<metric_name> sample in a Prometheus text payload,
+    or None if the metric is not present.
+    """
+    lines = response_text.split('\n')
+    for line in lines:
+        if line.startswith(f"vllm:{metric_name}"):
+            parts = line.split(' ')
+            if len(parts) >= 2:
+                value = float(parts[1])
+                return value
     return None
 
 def send_model_info_signal(config, miner_id, last_signal_time):
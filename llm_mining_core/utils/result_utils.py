@@ -0,0 +1,54 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def loads(content):
+    """Decodes JSON bytes or text, with orjson if it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def dumps(obj):
+    """Encodes obj as compact UTF-8 JSON bytes, with orjson if it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+def parse_chat_completion(content):
+    """
+    Decodes the raw body of a non-streaming vLLM chat completion once, without building the
+    OpenAI client's pydantic models.
+
+    Parameters:
+        content (bytes): The HTTP response body from with_raw_response.
+
+    Returns:
+        tuple: (choices list as sent by vLLM, usage dict).
+    """
+    completion = loads(content)
+    return completion["choices"], completion.get("usage") or {}
+
+def encode_submit_result(miner_id, job_id, choices, request_latency, inference_latency, identity_address=None, signature=None):
+    """
+    Builds the JSON body of a /miner_submit request for a non-streaming job.
+
+    The Text result is the JSON array of the vLLM choices, encoded straight from the decoded
+    response instead of going through ChatCompletion.model_dump().
+
+    Returns:
+        bytes: The request body, to post with a Content-Type of application/json.
+    """
+    result = {
+        "miner_id": miner_id.lower(),
+        "job_id": job_id,
+        "result": {"Text": dumps(choices).decode()},
+        "request_latency": request_latency,
+        "inference_latency": inference_latency
+    }
+    if signature is not None:
+        result["signature"] = signature
+        result["identity_address"] = identity_address
+    return dumps(result)
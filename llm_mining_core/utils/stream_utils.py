@@ -0,0 +1,457 @@
+import time
+import queue
+import asyncio
+import logging
+import threading
+from mining_common.metrics import get_metrics
+
+class StopSequenceMatcher:
+    """
+    Incremental matcher for stop sequences in streamed text.
+
+    Each call to feed() only scans the new chunk plus the few characters held back from the
+    previous one (at most the length of the longest stop sequence minus one), so matching a
+    whole stream is linear in its length and stop sequences split across chunk boundaries
+    are still found.
+    """
+
+    def __init__(self, stop_sequences):
+        self.stop_sequences = [stop for stop in (stop_sequences or []) if stop]
+        self.max_holdback = max((len(stop) for stop in self.stop_sequences), default=1) - 1
+        self.stopped = False
+        self._pending = ''
+        # Proper prefixes of the stop sequences, and the characters they can start with
+        self._prefixes = {stop[:i] for stop in self.stop_sequences for i in range(1, len(stop))}
+        self._first_chars = frozenset(stop[0] for stop in self.stop_sequences)
+
+    def _holdback_length(self, window):
+        # Longest suffix of the window that could still grow into a stop sequence
+        tail = window[-self.max_holdback:] if self.max_holdback else ''
+        start = len(tail)
+        for char in self._first_chars:
+            index = tail.find(char)
+            while index != -1:
+                if index < start and tail[index:] in self._prefixes:
+                    start = index
+                    break
+                index = tail.find(char, index + 1)
+        return len(tail) - start
+
+    def feed(self, text):
+        """
+        Returns the part of the stream that is now known not to belong to a stop sequence.
+        Once a stop sequence is found, stopped is set and the stop sequence and everything
+        after it are discarded.
+        """
+        if self.stopped:
+            return ''
+        window = self._pending + text if self._pending else text
+        # Fast path: no character of the window can start a stop sequence
+        if self._first_chars.isdisjoint(window):
+            self._pending = ''
+            return window
+
+        stop_index = -1
+        for stop in self.stop_sequences:
+            index = window.find(stop)
+            if index != -1 and (stop_index == -1 or index < stop_index):
+                stop_index = index
+        if stop_index != -1:
+            self.stopped = True
+            self._pending = ''
+            return window[:stop_index]
+
+        holdback = self._holdback_length(window)
+        self._pending = window[len(window) - holdback:] if holdback else ''
+        return window[:len(window) - holdback]
+
+    def flush(self):
+        """Releases the held-back text at the end of the stream."""
+        pending, self._pending = self._pending, ''
+        return pending
+
+class StreamRelay:
+    """
+    Turns vLLM stream deltas into the pieces relayed to /miner_submit_stream: whole words
+    followed by a space, then the EOS marker.
+
+    Stop sequences are matched with a StopSequenceMatcher, and the word buffer only ever
+    holds the current partial word, capped at max_word_length characters, so per-chunk work
+    does not grow with the length of the output.
+    """
+
+    def __init__(self, stop_sequences, eos, max_word_length=256):
+        self.matcher = StopSequenceMatcher(stop_sequences)
+        self.eos = eos
+        self.max_word_length = max_word_length
+        self.finished = False
+        self._word = ''
+
+    @property
+    def stopped(self):
+        """True once a stop sequence was seen; the upstream stream should then be closed."""
+        return self.matcher.stopped
+
+    def _split_words(self, text):
+        if ' ' not in text:
+            self._word += text
+            if len(self._word) > self.max_word_length:
+                word, self._word = self._word, ''
+                return [word]
+            return []
+        text = self._word + text
+        last_space = text.rfind(' ')
+        self._word = text[last_space + 1:]
+        words = text[:last_space + 1]
+        if words.find(' ') == last_space:
+            # A single word, as in most deltas
+            return [words]
+        return [word + " " for word in words[:-1].split(' ')]
+
+    def feed(self, text, immediate=False):
+        """
+        Returns the pieces to relay for a new delta. With immediate=True the text is relayed
+        as is instead of being split into words, e.g. for the first token of the stream.
+        """
+        if self.finished or not text:
+            return []
+        matcher = self.matcher
+        if immediate or matcher._pending or not matcher._first_chars.isdisjoint(text):
+            return self._feed_matched(text, immediate)
+        # Fast path for the usual delta: nothing can start a stop sequence, so it is only
+        # split into words (as in _split_words, inlined since it runs for every token)
+        if ' ' not in text:
+            return self._split_words(text)
+        text = self._word + text
+        last_space = text.rfind(' ')
+        self._word = text[last_space + 1:]
+        words = text[:last_space + 1]
+        if words.find(' ') == last_space:
+            return [words]
+        return [word + " " for word in words[:-1].split(' ')]
+
+    def _feed_matched(self, text, immediate):
+        matcher = self.matcher
+        safe_text = matcher.feed(text)
+        if immediate:
+            pieces = [safe_text] if safe_text else []
+        else:
+            pieces = self._split_words(safe_text)
+        if matcher.stopped:
+            pieces.extend(self.finish())
+        return pieces
+
+    def finish(self):
+        """Returns the remaining partial word and the EOS marker, once."""
+        if self.finished:
+            return []
+        self.finished = True
+        pieces = self._split_words(self.matcher.flush())
+        if self._word:
+            pieces.append(self._word + " ")
+            self._word = ''
+        pieces.append(self.eos)
+        return pieces
+
+class FrameCoalescer:
+    """
+    Coalesces relayed pieces into the frames written to /miner_submit_stream, so a long
+    response is sent as a few chunked-transfer writes instead of one per word.
+
+    The first piece is flushed immediately so time-to-first-token is unchanged. After that
+    a frame is flushed once flush_interval seconds passed since its first piece or once it
+    holds flush_bytes bytes, and the caller flushes the rest at EOS. A flush_interval and
+    flush_bytes of 0 send every piece as its own frame.
+
+    The coalescer also counts the frames and bytes of the job: every frame is one chunked
+    write, and wire_bytes includes the chunk framing.
+    """
+
+    def __init__(self, flush_interval=0.02, flush_bytes=512, clock=time.monotonic):
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.clock = clock
+        self.frames = 0
+        self.payload_bytes = 0
+        self.wire_bytes = 5  # The terminating zero-length chunk
+        self._parts = []
+        self._size = 0
+        self._frame_started = None
+
+    @classmethod
+    def from_config(cls, base_config):
+        return cls(base_config.stream_flush_interval, base_config.stream_flush_bytes)
+
+    def push(self, piece):
+        """
+        Adds a piece and returns a frame (bytes) if one is due, otherwise None.
+        """
+        data = piece.encode('utf-8')
+        if not data:
+            return None
+        self._parts.append(data)
+        self._size += len(data)
+        if self.frames == 0 or self._size >= self.flush_bytes:
+            return self.flush()
+        if self._frame_started is None:
+            self._frame_started = self.clock()
+        if self.clock() - self._frame_started >= self.flush_interval:
+            return self.flush()
+        return None
+
+    def time_until_due(self):
+        """Seconds until the pending frame must be flushed, or None if nothing is pending."""
+        if self._frame_started is None:
+            return None
+        return max(0.0, self.flush_interval - (self.clock() - self._frame_started))
+
+    def flush(self):
+        """Returns the pending frame (bytes), or None if nothing is pending."""
+        if not self._parts:
+            return None
+        frame = b''.join(self._parts)
+        self._parts = []
+        self._size = 0
+        self._frame_started = None
+        self.frames += 1
+        self.payload_bytes += len(frame)
+        self.wire_bytes += len(f"{len(frame):x}") + len(frame) + 4
+        return frame
+
+    def record(self, job_id):
+        """Logs the frame and byte counts of the job and adds them to the miner metrics."""
+        logging.info(f"Streamed job_id {job_id} in {self.frames} frames, {self.payload_bytes} bytes "
+                     f"({self.wire_bytes} bytes on the wire)")
+        metrics = get_metrics()
+        metrics.inc("llm_stream_frames_total", self.frames)
+        metrics.inc("llm_stream_payload_bytes_total", self.payload_bytes)
+        metrics.inc("llm_stream_wire_bytes_total", self.wire_bytes)
+
+_END_OF_STREAM = object()
+
+def _delta_content(chunk):
+    if chunk.choices and chunk.choices[0].delta is not None:
+        return chunk.choices[0].delta.content
+    return None
+
+class StreamPipeline:
+    """
+    Relays a vLLM stream to /miner_submit_stream through a bounded queue, so reading from
+    vLLM and writing to the sequencer do not stall each other.
+
+    A reader thread pulls the vLLM chunks, runs them through the StreamRelay and puts the
+    pieces on the queue; frames() is the request body, which drains the queue into
+    coalesced frames. The submit request can be opened before the first token arrives:
+    frames() blocks until there is something to send. The first non-empty delta is relayed
+    as is, like before.
+
+    When the queue is full the reader waits (back-pressure from a slow sequencer), and the
+    writer waits whenever the queue is empty. Both stall times and the peak queue depth are
+    reported by record(). The times of the first token, of the end of the vLLM stream and
+    of the last frame written are kept for the job's trace.
+    """
+
+    def __init__(self, stream, relay, coalescer, queue_size=256):
+        self.stream = stream
+        self.relay = relay
+        self.coalescer = coalescer
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.reader_stall = 0.0
+        self.writer_stall = 0.0
+        self.peak_depth = 0
+        self.error = None
+        self.deltas = 0
+        self.first_token_at = None
+        self.read_done_at = None
+        self.last_frame_at = None
+        self._closed = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._read, name="vllm-stream-reader", daemon=True)
+        self._thread.start()
+        return self
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            started = time.monotonic()
+            while not self._closed.is_set():
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            self.reader_stall += time.monotonic() - started
+        self.peak_depth = max(self.peak_depth, self.queue.qsize())
+
+    def _read(self):
+        immediate = True
+        try:
+            for chunk in self.stream:
+                if self._closed.is_set():
+                    break
+                content = _delta_content(chunk)
+                if content:
+                    self._count_delta()
+                    for piece in self.relay.feed(content, immediate=immediate):
+                        self._put(piece)
+                    immediate = False
+                if self.relay.finished:
+                    break
+            for piece in self.relay.finish():  # Ensure EOS is sent when the stream ends
+                self._put(piece)
+        except Exception as e:
+            logging.error(f"Failed to read from the vLLM stream: {e}")
+            self.error = e
+        finally:
+            self.read_done_at = time.time()
+            # Stop vLLM from generating past a stop word; the end marker is queued even if
+            # closing fails, or frames() would wait for the job timeout
+            try:
+                self.stream.close()
+            except Exception as e:
+                logging.error(f"Failed to close the vLLM stream: {e}")
+            finally:
+                self._put(_END_OF_STREAM)
+
+    def _count_delta(self):
+        self.deltas += 1
+        if self.first_token_at is None:
+            self.first_token_at = time.time()
+
+    def frames(self):
+        """Yields the coalesced frames; used as the body of the submit request."""
+        try:
+            while True:
+                timeout = self.coalescer.time_until_due()
+                started = time.monotonic()
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    frame = self.coalescer.flush()
+                    if frame:
+                        yield frame
+                    continue
+                finally:
+                    if timeout is None:
+                        self.writer_stall += time.monotonic() - started
+                if item is _END_OF_STREAM:
+                    break
+                frame = self.coalescer.push(item)
+                if frame:
+                    yield frame
+            frame = self.coalescer.flush()
+            if frame:
+                yield frame
+            self.last_frame_at = time.time()
+        finally:
+            self.close()
+
+    def close(self):
+        """Stops the reader, e.g. when the submit request failed before draining the queue."""
+        self._closed.set()
+
+    def record(self, job_id):
+        """
+        Logs the decode speed and logs and records the stall times and peak queue depth along
+        with the frame counts.
+        """
+        self.coalescer.record(job_id)
+        if self.first_token_at is not None and self.read_done_at is not None:
+            # vLLM streams one delta per generated token
+            decode_time = self.read_done_at - self.first_token_at
+            tokens_per_second = self.deltas / decode_time if decode_time > 0 else 0.0
+            logging.info(f"Completed streaming {self.deltas} tokens. Time: {decode_time:.3f}s. Tokens/s: {tokens_per_second:.1f}")
+        logging.info(f"Stream of job_id {job_id}: reader stalled {self.reader_stall:.3f}s, "
+                     f"writer stalled {self.writer_stall:.3f}s, peak queue depth {self.peak_depth}")
+        metrics = get_metrics()
+        metrics.observe("llm_stream_stall_seconds", self.reader_stall, side="reader")
+        metrics.observe("llm_stream_stall_seconds", self.writer_stall, side="writer")
+        metrics.set("llm_stream_queue_peak_depth", self.peak_depth)
+
+class AsyncStreamPipeline(StreamPipeline):
+    """
+    Asyncio counterpart of StreamPipeline: the reader is a task on the event loop and the
+    queue an asyncio.Queue.
+    """
+
+    def __init__(self, stream, relay, coalescer, queue_size=256):
+        super().__init__(stream, relay, coalescer, queue_size)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._read())
+        return self
+
+    async def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            started = time.monotonic()
+            await self.queue.put(item)
+            self.reader_stall += time.monotonic() - started
+        self.peak_depth = max(self.peak_depth, self.queue.qsize())
+
+    async def _read(self):
+        immediate = True
+        try:
+            async for chunk in self.stream:
+                content = _delta_content(chunk)
+                if content:
+                    self._count_delta()
+                    for piece in self.relay.feed(content, immediate=immediate):
+                        await self._put(piece)
+                    immediate = False
+                if self.relay.finished:
+                    break
+            for piece in self.relay.finish():  # Ensure EOS is sent when the stream ends
+                await self._put(piece)
+        except Exception as e:
+            logging.error(f"Failed to read from the vLLM stream: {e}")
+            self.error = e
+        finally:
+            self.read_done_at = time.time()
+            # Stop vLLM from generating past a stop word; the end marker is queued even if
+            # closing fails, or frames() would wait for the job timeout
+            try:
+                await self.stream.close()
+            except Exception as e:
+                logging.error(f"Failed to close the vLLM stream: {e}")
+            finally:
+                if not self._closed.is_set():
+                    await self._put(_END_OF_STREAM)
+
+    async def frames(self):
+        try:
+            while True:
+                timeout = self.coalescer.time_until_due()
+                started = time.monotonic()
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    frame = self.coalescer.flush()
+                    if frame:
+                        yield frame
+                    continue
+                finally:
+                    if timeout is None:
+                        self.writer_stall += time.monotonic() - started
+                if item is _END_OF_STREAM:
+                    break
+                frame = self.coalescer.push(item)
+                if frame:
+                    yield frame
+            frame = self.coalescer.flush()
+            if frame:
+                yield frame
+            self.last_frame_at = time.time()
+        finally:
+            self.close()
+
+    def close(self):
+        self._closed.set()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
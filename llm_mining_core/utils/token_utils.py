@@ -0,0 +1,79 @@
+import json
+import logging
+import threading
+
+# Rough number of characters per token when the model's tokenizer is not available
+CHARS_PER_TOKEN = 4
+
+class PromptTokenCounter:
+    """
+    Counts the prompt tokens of chat jobs locally with the served model's tokenizer, loaded
+    once per process on first use. Falls back to an estimate of CHARS_PER_TOKEN characters
+    per token when transformers is not installed or the tokenizer cannot be loaded.
+    """
+
+    def __init__(self, model_id, revision=None):
+        self.model_id = model_id
+        self.revision = revision
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Every process loads its own tokenizer
+        state = self.__dict__.copy()
+        state['_tokenizer'] = None
+        state['_loaded'] = False
+        state['_lock'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _get_tokenizer(self):
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                try:
+                    from transformers import AutoTokenizer
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.model_id, revision=self.revision)
+                    logging.info(f"Loaded tokenizer of {self.model_id} for prompt token counts")
+                except Exception as e:
+                    logging.warning(f"Failed to load tokenizer of {self.model_id}, estimating prompt tokens from their length: {e}")
+            return self._tokenizer
+
+    def count(self, messages, tools=None):
+        """
+        Returns the number of prompt tokens of a chat job, including the chat template and the
+        tool definitions.
+        """
+        tools_text = json.dumps(tools) if tools else ""
+        tokenizer = self._get_tokenizer()
+        if tokenizer is not None:
+            try:
+                tokens = len(tokenizer.apply_chat_template(messages, tokenize=True, add_generation_prompt=True))
+                if tools_text:
+                    tokens += len(tokenizer.encode(tools_text, add_special_tokens=False))
+                return tokens
+            except Exception as e:
+                logging.debug(f"Chat template of {self.model_id} failed, counting the message contents: {e}")
+                try:
+                    return len(tokenizer.encode(_messages_text(messages) + tools_text, add_special_tokens=False))
+                except Exception:
+                    pass
+        return estimate_prompt_tokens(messages, tools)
+
+def estimate_prompt_tokens(messages, tools=None):
+    """Estimates the prompt tokens of a chat job from its length, without a tokenizer."""
+    tools_text = json.dumps(tools) if tools else ""
+    return (len(_messages_text(messages)) + len(tools_text)) // CHARS_PER_TOKEN + 1
+
+def _messages_text(messages):
+    if not isinstance(messages, list):
+        return str(messages)
+    parts = []
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else message
+        parts.append(content if isinstance(content, str) else json.dumps(content))
+    return "\n".join(parts)
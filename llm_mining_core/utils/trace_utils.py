@@ -0,0 +1,128 @@
+import json
+import time
+import logging
+import contextlib
+import logging.handlers
+from mining_common.metrics import get_metrics
+
+TRACE_LOGGER_NAME = "llm_miner.trace"
+
+class JobTrace:
+    """
+    Per-job latency spans of the LLM miner, written as one JSON line per job to the trace
+    file and added to the llm_job_phase_seconds histogram by phase.
+
+    The phases are: fetch (the /miner_request round trip), prefetch_wait (time in the prefetch
+    queue, for prefetched jobs), json_decode (parsing the job),
+    admission (waiting for KV cache space), then for streaming jobs ttft (request to first
+    token), decode (first to last token), relay (last token to last frame written) and submit
+    (last frame to the sequencer's response), and for non-streaming jobs inference and submit.
+    """
+
+    def __init__(self, job_id, model_id, miner_id, request_latency=None, received_at=None):
+        self.job_id = job_id
+        self.model_id = model_id
+        self.miner_id = miner_id
+        # A prefetched job started when it was received, not when it left the queue
+        now = time.time()
+        self.started_at = received_at if received_at is not None else now
+        self.spans = {}
+        self.attributes = {}
+        self.outcome = "ok"
+        if request_latency is not None:
+            self.spans["fetch"] = request_latency
+        if received_at is not None:
+            self.spans["prefetch_wait"] = now - received_at
+
+    def add(self, phase, seconds):
+        if seconds is not None and seconds >= 0:
+            self.spans[phase] = self.spans.get(phase, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def span(self, phase):
+        """Times the enclosed block as phase."""
+        start_time = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(phase, time.perf_counter() - start_time)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, outcome):
+        self.outcome = outcome
+
+    def add_stream(self, requested_at, pipeline, completed_at):
+        """
+        Derives the streaming phases from the timestamps of a StreamPipeline.
+
+        Parameters:
+            requested_at (float): time.time() right before the vLLM request was sent.
+            pipeline (StreamPipeline): The finished pipeline of the job.
+            completed_at (float): time.time() once the sequencer answered the submit request.
+        """
+        first_token_at = pipeline.first_token_at
+        read_done_at = pipeline.read_done_at or completed_at
+        last_frame_at = pipeline.last_frame_at or read_done_at
+        if first_token_at is not None:
+            self.add("ttft", first_token_at - requested_at)
+            self.add("decode", read_done_at - first_token_at)
+        self.add("relay", last_frame_at - read_done_at)
+        self.add("submit", completed_at - last_frame_at)
+        self.set(
+            stream=True, output_tokens=pipeline.deltas, frames=pipeline.coalescer.frames,
+            reader_stall=round(pipeline.reader_stall, 6), writer_stall=round(pipeline.writer_stall, 6),
+        )
+
+    def finish(self):
+        """
+        Writes the trace, records the phase durations in the histograms and counts the job
+        as completed, or as failed by its outcome.
+        """
+        total = time.time() - self.started_at + self.spans.get("fetch", 0.0)
+        record = {
+            "job_id": self.job_id,
+            "model_id": self.model_id,
+            "miner_id": self.miner_id,
+            "started_at": self.started_at,
+            "outcome": self.outcome,
+            "total": round(total, 6),
+            "spans": {phase: round(seconds, 6) for phase, seconds in self.spans.items()},
+            **self.attributes,
+        }
+        logging.getLogger(TRACE_LOGGER_NAME).info(json.dumps(record))
+        metrics = get_metrics()
+        for phase, seconds in self.spans.items():
+            metrics.observe("llm_job_phase_seconds", seconds, phase=phase)
+        if self.outcome == "ok":
+            metrics.inc("miner_jobs_completed_total", model=self.model_id)
+        else:
+            metrics.inc("miner_jobs_failed_total", model=self.model_id, reason=self.outcome)
+        return record
+
+def configure_trace_logging(trace_queue):
+    """
+    Sends the job traces of this process to the parent's trace writer through trace_queue,
+    or drops them if trace_queue is None (tracing disabled).
+    """
+    logger = logging.getLogger(TRACE_LOGGER_NAME)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [logging.handlers.QueueHandler(trace_queue) if trace_queue is not None else logging.NullHandler()]
+
+def start_trace_writer(config, trace_queue):
+    """
+    Starts a listener in the parent process that writes the job traces received on
+    trace_queue to the rotating JSONL trace file.
+
+    Returns:
+        QueueListener: The running listener; call stop() to flush it on shutdown.
+    """
+    handler = logging.handlers.RotatingFileHandler(
+        config.trace_filename, maxBytes=config.trace_max_bytes, backupCount=config.trace_backup_count
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(trace_queue, handler)
+    listener.start()
+    return listener
@@ -0,0 +1,89 @@
+import time
+import logging
+import psutil
+import requests
+from .requests_utils import check_vllm_server_status
+
+class VLLMServerWatchdog:
+    """
+    Cheap liveness signal for the vLLM server started by this miner.
+
+    Instead of scanning every process on the host, is_alive() looks up the PID returned by
+    LLMServerConfig.start_llm_server (guarding against PID reuse with the process creation
+    time) and probes the server's own /health endpoint at most once per probe_interval.
+    If no PID is known, it falls back to check_vllm_server_status().
+    """
+
+    def __init__(self, pid, health_url, probe_interval=10.0, probe_timeout=2.0, max_probe_failures=3):
+        self.pid = pid
+        self.health_url = health_url
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.max_probe_failures = max_probe_failures
+        self.create_time = None
+        if pid is not None:
+            try:
+                self.create_time = psutil.Process(pid).create_time()
+            except psutil.Error:
+                pass
+        self._last_probe = 0
+        self._probe_failures = 0
+        self._session = None
+
+    @classmethod
+    def from_config(cls, base_config, pid, port=None):
+        return cls(
+            pid,
+            f"{base_config.llm_url}:{port or base_config.port}/health",
+            probe_interval=base_config.health_probe_interval,
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_session'] = None
+        return state
+
+    def process_alive(self):
+        try:
+            process = psutil.Process(self.pid)
+            if self.create_time is not None and process.create_time() != self.create_time:
+                return False  # The PID was reused by another process
+            return process.status() != psutil.STATUS_ZOMBIE
+        except psutil.NoSuchProcess:
+            return False
+        except psutil.Error:
+            return True
+
+    def probe(self):
+        """
+        Probes the /health endpoint once and returns whether it answered with 200.
+        """
+        if self._session is None:
+            self._session = requests.Session()
+        try:
+            response = self._session.get(self.health_url, timeout=self.probe_timeout)
+            healthy = response.status_code == 200
+        except requests.exceptions.RequestException:
+            healthy = False
+
+        if healthy:
+            self._probe_failures = 0
+        else:
+            self._probe_failures += 1
+            logging.warning(f"vLLM health probe {self.health_url} failed ({self._probe_failures}/{self.max_probe_failures})")
+        return healthy
+
+    def is_alive(self):
+        """
+        Returns:
+            bool: False if the vLLM server process exited or failed max_probe_failures
+                consecutive health probes.
+        """
+        if self.pid is None:
+            return check_vllm_server_status()
+        if not self.process_alive():
+            return False
+        if time.time() - self._last_probe >= self.probe_interval:
+            self._last_probe = time.time()
+            self.probe()
+        return self._probe_failures < self.max_probe_failures
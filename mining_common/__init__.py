@@ -0,0 +1,23 @@
+from .metrics import (
+    MetricsRegistry, QueueMetrics, start_metrics_drain, get_metrics, set_metrics,
+    track_poll_hit_ratio, start_metrics_server,
+)
+from .config_snapshot import ConfigSnapshot, report_child_startup
+from .logging_utils import (
+    LogWriter, RateLimitedLog, get_log_writer, configure_queue_logging, start_file_logging, poll_log,
+)
+from .launcher import ChildLauncher, process_memory
+from .hardware import GPUInfo, HardwareInventory, get_hardware_inventory, set_hardware_inventory
+from .http_client import TimeoutSession, DNSCache, HTTPClientFactory, install_dns_cache
+from .result_spool import ResultSpool, SpoolSubmitter, is_retryable
+
+__all__ = [
+    'MetricsRegistry', 'QueueMetrics', 'start_metrics_drain', 'get_metrics', 'set_metrics',
+    'track_poll_hit_ratio', 'start_metrics_server',
+    'ConfigSnapshot', 'report_child_startup',
+    'LogWriter', 'RateLimitedLog', 'get_log_writer', 'configure_queue_logging', 'start_file_logging', 'poll_log',
+    'ChildLauncher', 'process_memory',
+    'GPUInfo', 'HardwareInventory', 'get_hardware_inventory', 'set_hardware_inventory',
+    'TimeoutSession', 'DNSCache', 'HTTPClientFactory', 'install_dns_cache',
+    'ResultSpool', 'SpoolSubmitter', 'is_retryable',
+]
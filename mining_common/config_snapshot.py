@@ -0,0 +1,54 @@
+import sys
+import time
+import toml
+import logging
+import dataclasses
+import multiprocessing
+from .metrics import get_metrics
+from .launcher import process_memory
+
+@dataclasses.dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    The startup inputs of a miner, captured once in the parent process and passed to the
+    spawned children as a Process argument: the parsed config.toml, the command line and
+    whatever the parent already looked up (e.g. miner IDs or model manifests) in data.
+
+    Children build their config objects from the snapshot instead of re-parsing the TOML
+    file and the command line and repeating the lookups. The snapshot is picklable and
+    frozen; treat the config and data dicts as read-only and use with_data() to add to it.
+    """
+    config_file: str
+    config: dict
+    argv: tuple
+    data: dict = dataclasses.field(default_factory=dict)
+    created_at: float = dataclasses.field(default_factory=time.time)
+
+    @classmethod
+    def capture(cls, config_file, argv=None):
+        return cls(config_file, toml.load(config_file), tuple(argv if argv is not None else sys.argv))
+
+    def with_data(self, **data):
+        """Returns a copy of the snapshot with the given entries added to data."""
+        return dataclasses.replace(self, data={**self.data, **data})
+
+def report_child_startup(launched_at, name):
+    """
+    Logs and records the seconds from launching a child process until it is ready to work,
+    and its memory at that point.
+
+    Parameters:
+        launched_at (float): time.time() in the parent right before Process.start().
+        name (str): The kind of child, e.g. "llm_worker" or "sd_device".
+    """
+    startup_time = time.time() - launched_at
+    rss, pss = process_memory()
+    memory = f"RSS {rss / 2**20:.0f} MiB" + (f", PSS {pss / 2**20:.0f} MiB" if pss is not None else "")
+    logging.info(f"{name} process ready {startup_time:.2f}s after launch ({memory})")
+    metrics = get_metrics()
+    metrics.observe("miner_child_startup_seconds", startup_time, process=name)
+    child = multiprocessing.current_process().name
+    metrics.set("miner_child_memory_bytes", rss, process=name, child=child, kind="rss")
+    if pss is not None:
+        metrics.set("miner_child_memory_bytes", pss, process=name, child=child, kind="pss")
+    return startup_time
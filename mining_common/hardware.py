@@ -0,0 +1,121 @@
+import os
+import logging
+import subprocess
+import dataclasses
+
+NO_GPU_DESCRIPTION = "No CUDA devices found. Ensure you have a compatible NVIDIA GPU with the correct drivers installed."
+
+@dataclasses.dataclass(frozen=True)
+class GPUInfo:
+    index: int
+    name: str
+    uuid: str
+    memory_total_mb: int = None
+
+    @property
+    def short_uuid(self):
+        """The first 6 hex digits of the GPU UUID, as appended to composite miner IDs."""
+        return self.uuid.split("GPU-")[1].split("-")[0][:6]
+
+@dataclasses.dataclass(frozen=True)
+class HardwareInventory:
+    """
+    The GPUs of the host, probed once through NVML (pynvml) or a single nvidia-smi call.
+
+    GPUs are listed in physical (nvidia-smi) order; visible() applies CUDA_VISIBLE_DEVICES
+    the way CUDA numbers the devices of a process. The inventory is picklable, so the parent
+    probes it once and passes it to its children in the ConfigSnapshot.
+    """
+    gpus: tuple = ()
+    source: str = "none"
+
+    @classmethod
+    def probe(cls):
+        for source, probe in (("nvml", _probe_nvml), ("nvidia-smi", _probe_nvidia_smi)):
+            try:
+                gpus = probe()
+            except Exception as e:
+                logging.debug(f"Probing GPUs through {source} failed: {e}")
+                continue
+            logging.info(f"Found {len(gpus)} GPU(s) through {source}.")
+            return cls(tuple(gpus), source)
+        logging.warning("Failed to probe GPUs through NVML or nvidia-smi.")
+        return cls()
+
+    def gpu(self, index):
+        """Returns the GPUInfo of the physical GPU index, or None."""
+        return self.gpus[index] if 0 <= index < len(self.gpus) else None
+
+    def visible(self):
+        """Returns the GPUs visible to this process, in CUDA device order."""
+        visible_devices = os.environ.get("CUDA_VISIBLE_DEVICES")
+        if visible_devices is None:
+            return list(self.gpus)
+        visible = []
+        for device in filter(None, (device.strip() for device in visible_devices.split(","))):
+            if device.isdigit():
+                gpu = self.gpu(int(device))
+            else:
+                gpu = next((gpu for gpu in self.gpus if gpu.uuid.startswith(device)), None)
+            if gpu is None:
+                # CUDA ignores the devices from the first invalid entry on
+                break
+            visible.append(gpu)
+        return visible
+
+    def description(self, device_id=0):
+        """
+        Returns the name of CUDA device device_id of this process as the hardware description
+        sent to the sequencer, or a message that no GPU was found.
+        """
+        visible = self.visible()
+        if 0 <= device_id < len(visible):
+            return visible[device_id].name
+        return NO_GPU_DESCRIPTION
+
+def _probe_nvml():
+    import pynvml
+    pynvml.nvmlInit()
+    try:
+        gpus = []
+        for index in range(pynvml.nvmlDeviceGetCount()):
+            handle = pynvml.nvmlDeviceGetHandleByIndex(index)
+            name = pynvml.nvmlDeviceGetName(handle)
+            uuid = pynvml.nvmlDeviceGetUUID(handle)
+            memory = pynvml.nvmlDeviceGetMemoryInfo(handle)
+            gpus.append(GPUInfo(
+                index,
+                name.decode() if isinstance(name, bytes) else name,
+                uuid.decode() if isinstance(uuid, bytes) else uuid,
+                memory.total // (1024 * 1024),
+            ))
+        return gpus
+    finally:
+        pynvml.nvmlShutdown()
+
+def _probe_nvidia_smi():
+    output = subprocess.check_output(
+        ["nvidia-smi", "--query-gpu=index,name,uuid,memory.total", "--format=csv,noheader,nounits"],
+        timeout=30,
+    ).decode("utf-8")
+    gpus = []
+    for line in output.strip().splitlines():
+        index, name, uuid, memory_total = (field.strip() for field in line.split(","))
+        gpus.append(GPUInfo(int(index), name, uuid, int(memory_total) if memory_total.isdigit() else None))
+    return gpus
+
+_inventory = None
+
+def get_hardware_inventory():
+    """
+    Returns the hardware inventory of the host, probing it on first use unless the parent's
+    inventory was installed with set_hardware_inventory().
+    """
+    global _inventory
+    if _inventory is None:
+        _inventory = HardwareInventory.probe()
+    return _inventory
+
+def set_hardware_inventory(inventory):
+    global _inventory
+    _inventory = inventory
@@ -0,0 +1,164 @@
+import time
+import socket
+import logging
+import threading
+import importlib.util
+import requests
+from urllib3.util import Retry
+from requests.adapters import HTTPAdapter
+
+# Status codes on which idempotent requests (GET, HEAD) are retried
+RETRY_STATUS_FORCELIST = (502, 503, 504)
+
+class TimeoutSession(requests.Session):
+    """A requests.Session that applies its (connect, read) timeout to every request without one."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+class DNSCache:
+    """
+    Caches socket.getaddrinfo results for ttl seconds, so the miners' frequent polls and
+    submissions do not resolve the sequencer's hostname for every new connection. Failed
+    lookups are not cached.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._getaddrinfo = socket.getaddrinfo
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        result = self._getaddrinfo(host, port, family, type, proto, flags)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, result)
+        return result
+
+_dns_cache = None
+
+def install_dns_cache(ttl):
+    """
+    Routes the lookups of this process (requests, httpx and botocore alike) through a
+    DNSCache with the given ttl; once per process, later calls only update the ttl.
+    """
+    global _dns_cache
+    if ttl <= 0:
+        return None
+    if _dns_cache is None:
+        _dns_cache = DNSCache(ttl)
+        socket.getaddrinfo = _dns_cache.getaddrinfo
+    _dns_cache.ttl = ttl
+    return _dns_cache
+
+class HTTPClientFactory:
+    """
+    Builds the HTTP clients of a miner with one set of settings: keep-alive pools of
+    pool_size connections, explicit connect and read timeouts, connection retries with
+    backoff and cached DNS lookups. The requests sessions are used for the sequencer, signal
+    and manifest calls, the httpx clients by the async engine (with HTTP/2 for https
+    endpoints if http2 is set and the h2 package is installed), and the botocore config for
+    the S3 uploads.
+
+    Requests are only re-sent where that is safe: connection errors are retried for every
+    method, read errors and 502/503/504 responses only for GET and HEAD.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=5.0, read_timeout=30.0, retries=2, backoff=0.2, dns_ttl=300.0, http2=False):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.dns_ttl = dns_ttl
+        if http2 and importlib.util.find_spec("h2") is None:
+            logging.warning("HTTP/2 is enabled but the h2 package is not installed, using HTTP/1.1.")
+            http2 = False
+        self.http2 = http2
+        install_dns_cache(dns_ttl)
+
+    @classmethod
+    def from_config(cls, config, pool_size):
+        """The factory of a miner, with pools of pool_size connections for its concurrency."""
+        return cls(
+            pool_size=pool_size,
+            connect_timeout=config.http_connect_timeout,
+            read_timeout=config.http_read_timeout,
+            retries=config.http_retries,
+            backoff=config.http_backoff,
+            dns_ttl=config.http_dns_ttl,
+            http2=config.http2,
+        )
+
+    def timeout(self, read_timeout=None):
+        """Returns the (connect, read) timeout of requests, with read_timeout if given."""
+        return (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+
+    def session(self, read_timeout=None, retries=None):
+        """
+        Returns a new requests session with a keep-alive pool of pool_size connections per
+        host.
+
+        Parameters:
+            read_timeout (float, optional): Read timeout instead of the factory's.
+            retries (int, optional): Number of retries instead of the factory's.
+
+        Returns:
+            TimeoutSession: The session.
+        """
+        retries = self.retries if retries is None else retries
+        retry_strategy = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=self.backoff,
+            status_forcelist=RETRY_STATUS_FORCELIST,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=retry_strategy)
+        session = TimeoutSession(self.timeout(read_timeout))
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _httpx_options(self, read_timeout=None):
+        import httpx
+        return {
+            "timeout": httpx.Timeout(self.timeout(read_timeout)[1], connect=self.connect_timeout),
+            "limits": httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            "http2": self.http2,
+        }
+
+    def httpx_client(self, read_timeout=None):
+        """Returns a new httpx.Client with the factory's pool, timeouts and HTTP version."""
+        import httpx
+        return httpx.Client(**self._httpx_options(read_timeout))
+
+    def async_httpx_client(self, read_timeout=None):
+        """Returns a new httpx.AsyncClient with the factory's pool, timeouts and HTTP version."""
+        import httpx
+        return httpx.AsyncClient(**self._httpx_options(read_timeout))
+
+    def s3_config(self):
+        """Returns the botocore Config of the S3 clients, to merge with endpoint options."""
+        from botocore.config import Config
+        return Config(
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            max_pool_connections=self.pool_size,
+            retries={"max_attempts": self.retries + 1, "mode": "standard"},
+            tcp_keepalive=True,
+        )
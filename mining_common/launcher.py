@@ -0,0 +1,71 @@
+import logging
+import resource
+import itertools
+import multiprocessing
+
+class ChildLauncher:
+    """
+    Starts the child processes of a miner.
+
+    With the forkserver start method, a server process imports the preload modules once and
+    every child is forked from it, so the children start with those modules already loaded
+    and share their memory instead of re-importing them like spawned interpreters do. Only
+    modules that are safe to fork belong in preload: pure-Python modules that neither
+    initialize CUDA nor start threads on import. '__main__' preloads the imports of the
+    miner script itself.
+
+    Children of the kinds in spawn_kinds, and all children on platforms without forkserver,
+    are started with spawn instead.
+    """
+
+    def __init__(self, start_method="forkserver", preload=(), spawn_kinds=()):
+        if start_method == "forkserver" and "forkserver" not in multiprocessing.get_all_start_methods():
+            logging.warning("The forkserver start method is not available on this platform, using spawn.")
+            start_method = "spawn"
+        self.start_method = start_method
+        self.preload = list(preload)
+        self.spawn_kinds = set(spawn_kinds)
+        self._counter = itertools.count()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.launcher_start_method, config.launcher_preload, config.launcher_spawn_kinds)
+
+    def configure(self):
+        """
+        Makes the start method the default of this process, so queues and shared memory are
+        created for it. Call before creating any multiprocessing objects.
+        """
+        multiprocessing.set_start_method(self.start_method, force=True)
+        if self.start_method == "forkserver":
+            multiprocessing.set_forkserver_preload(self.preload)
+        logging.info(f"Starting child processes with {self.start_method}" + (f", preloading {', '.join(self.preload)}" if self.preload else ""))
+        return self
+
+    def start(self, kind, target, args=()):
+        """
+        Starts target(*args) in a child process named after its kind.
+
+        Returns:
+            Process: The started process.
+        """
+        start_method = "spawn" if kind in self.spawn_kinds else self.start_method
+        process = multiprocessing.get_context(start_method).Process(
+            target=target, args=args, name=f"{kind}-{next(self._counter)}"
+        )
+        process.start()
+        logging.debug(f"Started {process.name} (pid {process.pid}) with {start_method}")
+        return process
+
+def process_memory():
+    """
+    Returns (RSS, PSS) of the current process in bytes. PSS splits the pages shared with
+    other processes, e.g. modules preloaded by the forkserver, between them; it is None where
+    /proc/self/smaps_rollup is not available, and RSS is then the peak RSS.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["Rss"].split()[0]) * 1024, int(fields["Pss"].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, None
@@ -0,0 +1,113 @@
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Seconds between two logs of the same repeated poll message
+POLL_LOG_INTERVAL = 60.0
+
+class LogWriter:
+    """
+    A size-rotated log file written by listener threads, so logging calls only put their
+    record on a queue and never wait for the disk.
+
+    One process owns each log file: it listens on a queue.Queue for its own records and on a
+    multiprocessing Queue per group of child processes, and is the only one to rotate it.
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=0):
+        self.filename = filename
+        self.handler = logging.handlers.RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count)
+        self.handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        self._listeners = []
+
+    def listen(self, log_queue):
+        """Writes the records put on log_queue from a listener thread, and returns the queue."""
+        listener = logging.handlers.QueueListener(log_queue, self.handler)
+        listener.start()
+        self._listeners.append(listener)
+        return log_queue
+
+    def stop(self):
+        """Writes the queued records and closes the file."""
+        for listener in self._listeners:
+            listener.stop()
+        self._listeners = []
+        self.handler.close()
+
+_writers = {}
+
+def get_log_writer(filename, max_bytes=0, backup_count=0):
+    """Returns the writer of filename in this process, creating it on first use."""
+    writer = _writers.get(filename)
+    if writer is None:
+        if not _writers:
+            atexit.register(_stop_log_writers)
+        writer = _writers[filename] = LogWriter(filename, max_bytes, backup_count)
+    return writer
+
+def _stop_log_writers():
+    for writer in _writers.values():
+        writer.stop()
+
+def configure_queue_logging(log_queue, level=logging.INFO):
+    """
+    Sends the log records of this process to log_queue, replacing the handlers of the root
+    logger.
+    """
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+def start_file_logging(filename, level=logging.INFO, max_bytes=0, backup_count=0):
+    """
+    Logs this process to the rotating file filename through a listener thread.
+
+    Returns:
+        LogWriter: The writer of the file, to listen for child processes on.
+    """
+    writer = get_log_writer(filename, max_bytes, backup_count)
+    configure_queue_logging(writer.listen(queue.Queue()), level)
+    return writer
+
+class RateLimitedLog:
+    """
+    Logs repeated messages of hot loops, such as empty polls, at most once per interval
+    seconds per key, noting how many were left out in between.
+    """
+
+    def __init__(self, interval=POLL_LOG_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def log(self, level, key, message, echo=False):
+        """
+        Logs message unless a message with the same key was logged within interval seconds.
+        With echo, the message is also printed, as the miners do for warnings to the console.
+
+        Returns:
+            bool: True if the message was logged.
+        """
+        now = time.monotonic()
+        with self._lock:
+            last_logged, suppressed = self._state.get(key, (None, 0))
+            if last_logged is not None and now - last_logged < self.interval:
+                self._state[key] = (last_logged, suppressed + 1)
+                return False
+            self._state[key] = (now, 0)
+        if suppressed:
+            message = f"{message} ({suppressed} more in the last {now - last_logged:.0f}s)"
+        logging.log(level, message)
+        if echo:
+            print(message)
+        return True
+
+# Rate limiter of the poll loops of this process
+poll_log = RateLimitedLog()
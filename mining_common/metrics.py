@@ -0,0 +1,234 @@
+import queue
+import logging
+import threading
+import collections
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Polls per model over which miner_poll_hit_ratio is computed
+POLL_HIT_WINDOW = 100
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _escape_label_value(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in key) + "}"
+
+def _format_value(value):
+    return "+Inf" if value == float("inf") else str(value)
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process store of counters, gauges and histograms, keyed by metric name
+    and label set.
+
+    Child processes do not write to the registry directly: they use a QueueMetrics sink whose
+    events the parent applies with start_metrics_drain(), so the parent holds the aggregate
+    of all processes.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._listeners = {}
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+        self._notify(name, value, labels)
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+        self._notify(name, value, labels)
+
+    def observe(self, name, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+        self._notify(name, value, labels)
+
+    def get(self, name, **labels):
+        """
+        Returns the current value of a counter or gauge, or a copy of a histogram, or None.
+        """
+        key = _label_key(labels)
+        with self._lock:
+            for store in (self._counters, self._gauges):
+                if name in store and key in store[name]:
+                    return store[name][key]
+            histogram = self._histograms.get(name, {}).get(key)
+            return {**histogram, "buckets": list(histogram["buckets"])} if histogram else None
+
+    def add_listener(self, name, callback):
+        """
+        Calls callback(value, labels) whenever the metric is updated, e.g. to feed observed
+        job durations into a controller running in the parent process.
+        """
+        self._listeners.setdefault(name, []).append(callback)
+
+    def _notify(self, name, value, labels):
+        for callback in self._listeners.get(name, ()):
+            try:
+                callback(value, labels)
+            except Exception as e:
+                logging.error(f"Metrics listener for {name} failed: {e}")
+
+    def apply(self, event):
+        kind, name, value, labels = event
+        getattr(self, kind)(name, value, **labels)
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            histograms = {
+                name: {key: {**histogram, "buckets": list(histogram["buckets"])} for key, histogram in series.items()}
+                for name, series in self._histograms.items()
+            }
+
+        lines = []
+        for kind, store in (("counter", counters), ("gauge", gauges)):
+            for name, series in sorted(store.items()):
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for name, series in sorted(histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in sorted(series.items()):
+                # The bucket counts are already cumulative
+                for bound, count in zip(self.buckets + (float("inf"),), histogram["buckets"] + [histogram["count"]]):
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', _format_value(float(bound))),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram['sum'])}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+class QueueMetrics:
+    """
+    Metrics sink for child processes. Updates are forwarded to the parent's registry through
+    a multiprocessing queue and dropped rather than blocking when the queue is full.
+    """
+
+    def __init__(self, metrics_queue):
+        self.metrics_queue = metrics_queue
+
+    def _put(self, kind, name, value, labels):
+        try:
+            self.metrics_queue.put_nowait((kind, name, value, labels))
+        except queue.Full:
+            pass
+
+    def inc(self, name, value=1, **labels):
+        self._put("inc", name, value, labels)
+
+    def set(self, name, value, **labels):
+        self._put("set", name, value, labels)
+
+    def observe(self, name, value, **labels):
+        self._put("observe", name, value, labels)
+
+def start_metrics_drain(metrics_queue, registry):
+    """
+    Applies the events sent by QueueMetrics sinks in child processes to the registry from a
+    background thread of the parent process.
+    """
+    def drain():
+        while True:
+            try:
+                registry.apply(metrics_queue.get())
+            except (EOFError, OSError):
+                return
+            except Exception as e:
+                logging.error(f"Failed to apply metrics event: {e}")
+
+    thread = threading.Thread(target=drain, name="metrics-drain", daemon=True)
+    thread.start()
+    return thread
+
+def track_poll_hit_ratio(registry, window=POLL_HIT_WINDOW):
+    """
+    Keeps the miner_poll_hit_ratio gauge of each model at the fraction of its last window
+    polls (miner_polls_total) that returned a job.
+    """
+    recent = {}
+    lock = threading.Lock()
+
+    def update(value, labels):
+        model = labels.get("model")
+        with lock:
+            polls = recent.setdefault(model, collections.deque(maxlen=window))
+            polls.append(labels.get("result") == "job")
+            ratio = sum(polls) / len(polls)
+        registry.set("miner_poll_hit_ratio", ratio, model=model)
+
+    registry.add_listener("miner_polls_total", update)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are too frequent for the miner log
+        pass
+
+def start_metrics_server(registry, port, host="0.0.0.0"):
+    """
+    Serves the registry at http://host:port/metrics for Prometheus from a background thread
+    of the parent process, which holds the metrics of all child processes.
+
+    Returns:
+        ThreadingHTTPServer or None: The running server, or None if the port is not available.
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logging.error(f"Failed to start the metrics endpoint on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logging.info(f"Serving metrics at http://{host}:{port}/metrics")
+    return server
+
+_metrics = MetricsRegistry()
+
+def get_metrics():
+    """
+    Returns the metrics sink of the current process: the registry in the parent, or the
+    QueueMetrics sink installed with set_metrics() in a child.
+    """
+    return _metrics
+
+def set_metrics(sink):
+    global _metrics
+    _metrics = sink
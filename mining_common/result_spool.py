@@ -0,0 +1,227 @@
+import os
+import re
+import json
+import time
+import random
+import logging
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from .metrics import get_metrics
+from .http_client import HTTPClientFactory
+
+# Status codes after which a submission is retried; other errors are final
+RETRY_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+def is_retryable(status_code):
+    """Whether a submission that failed with status_code (None: no response) may be retried."""
+    return status_code is None or status_code in RETRY_STATUS_CODES
+
+class ResultSpool:
+    """
+    On-disk spool of completed results whose submission to the sequencer failed, one JSON
+    file per job in directory, so the work survives sequencer hiccups and miner restarts.
+
+    Any process of a miner can put() results; a single SpoolSubmitter in the parent process
+    retries them. Every result carries the deadline after which the sequencer no longer
+    needs it.
+    """
+
+    def __init__(self, directory, enabled=True):
+        self.directory = os.path.expanduser(directory)
+        self.enabled = enabled
+
+    @classmethod
+    def from_config(cls, config, name):
+        """The spool of one miner: name separates the miners sharing a host."""
+        return cls(os.path.join(config.spool_dir, name), enabled=config.spool_enabled)
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_.-]", "_", str(job_id)) + ".json")
+
+    def _write(self, path, entry):
+        # Write to a temporary file first, so a crash never leaves a partial entry behind
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, path)
+
+    def put(self, job_id, url, body, deadline, headers=None):
+        """
+        Spools a result for the background submitter.
+
+        Parameters:
+            job_id (str): The job the result belongs to.
+            url (str): The endpoint to post the result to.
+            body (str or bytes): The JSON request body.
+            deadline (float): time.time() after which the result is dropped.
+            headers (dict, optional): Extra request headers.
+
+        Returns:
+            bool: True if the result was spooled.
+        """
+        if not self.enabled:
+            return False
+        if time.time() >= deadline:
+            logging.warning(f"Not spooling the result of job {job_id}: its deadline has passed.")
+            get_metrics().inc("miner_spool_results_total", outcome="expired")
+            return False
+        entry = {
+            "job_id": job_id,
+            "url": url,
+            "body": body.decode() if isinstance(body, bytes) else body,
+            "headers": headers or {},
+            "deadline": deadline,
+            "attempts": 0,
+            "next_attempt_at": 0.0,
+            "spooled_at": time.time(),
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(self._path(job_id), entry)
+        except OSError as e:
+            logging.error(f"Failed to spool the result of job {job_id}: {e}")
+            return False
+        logging.info(f"Spooled the result of job {job_id} for retry until its deadline.")
+        get_metrics().inc("miner_spool_results_total", outcome="spooled")
+        return True
+
+    def entries(self):
+        """Returns (path, entry) of all spooled results, earliest deadline first."""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as f:
+                    entries.append((path, json.load(f)))
+            except (OSError, ValueError) as e:
+                logging.error(f"Dropping unreadable spooled result {path}: {e}")
+                self.remove(path)
+        return sorted(entries, key=lambda item: item[1]["deadline"])
+
+    def update(self, path, entry):
+        self._write(path, entry)
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+class SpoolSubmitter:
+    """
+    Background retry of the results in a ResultSpool, so the job loops only spool a failed
+    submission and move on to the next job.
+
+    Every interval seconds, up to batch_size results that are due are posted, earliest
+    deadline first, over one keep-alive session by at most max_concurrency threads. A failed
+    attempt is retried after an exponential back-off with jitter (capped at max_backoff) as
+    long as that is before the result's deadline; results past their deadline and results
+    the sequencer rejects with a non-retryable status are dropped.
+    """
+
+    def __init__(self, spool, interval=1.0, batch_size=16, max_concurrency=4, request_timeout=10.0, max_backoff=30.0, http=None):
+        self.spool = spool
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.max_backoff = max_backoff
+        # The submitter retries on its own schedule, so its session does not retry by itself
+        self.session = HTTPClientFactory(
+            pool_size=max_concurrency, read_timeout=request_timeout, retries=0,
+            connect_timeout=http.connect_timeout if http is not None else 5.0,
+            dns_ttl=http.dns_ttl if http is not None else 0,
+        ).session()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="spool-submit")
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, config, spool):
+        return cls(
+            spool,
+            interval=config.spool_interval,
+            batch_size=config.spool_batch_size,
+            max_concurrency=config.spool_max_concurrency,
+            request_timeout=config.spool_request_timeout,
+            max_backoff=config.spool_max_backoff,
+            http=config.http,
+        )
+
+    def submit(self, path, entry):
+        """
+        Posts one spooled result and removes, reschedules or drops it.
+
+        Returns:
+            str: The outcome: submitted, retry, expired or rejected.
+        """
+        entry["attempts"] += 1
+        try:
+            response = self.session.post(
+                entry["url"],
+                data=entry["body"].encode(),
+                headers={"Content-Type": "application/json", **entry["headers"]},
+            )
+            status_code = response.status_code
+            error = f"status code {status_code}"
+        except requests.RequestException as e:
+            status_code = None
+            error = str(e)
+
+        if status_code is not None and status_code < 400:
+            outcome = "submitted"
+            logging.info(f"Submitted spooled result of job {entry['job_id']} after {entry['attempts']} attempt(s).")
+        elif not is_retryable(status_code):
+            outcome = "rejected"
+            logging.error(f"Dropping spooled result of job {entry['job_id']}: the sequencer rejected it with {error}.")
+        else:
+            backoff = min(self.max_backoff, self.interval * 2 ** entry["attempts"]) * random.uniform(0.5, 1.0)
+            entry["next_attempt_at"] = time.time() + backoff
+            if entry["next_attempt_at"] < entry["deadline"]:
+                outcome = "retry"
+                logging.warning(f"Retrying spooled result of job {entry['job_id']} in {backoff:.1f}s: {error}")
+                self.spool.update(path, entry)
+            else:
+                outcome = "expired"
+                logging.error(f"Dropping spooled result of job {entry['job_id']}: its deadline passed ({error}).")
+        if outcome != "retry":
+            self.spool.remove(path)
+            get_metrics().inc("miner_spool_results_total", outcome=outcome)
+        return outcome
+
+    def run_once(self):
+        """Submits the batch of results that are due; returns the outcomes."""
+        now = time.time()
+        entries = self.spool.entries()
+        get_metrics().set("miner_spool_depth", len(entries))
+        due = []
+        for path, entry in entries:
+            if entry["deadline"] <= now:
+                logging.error(f"Dropping spooled result of job {entry['job_id']}: its deadline passed.")
+                self.spool.remove(path)
+                get_metrics().inc("miner_spool_results_total", outcome="expired")
+            elif entry["next_attempt_at"] <= now and len(due) < self.batch_size:
+                due.append((path, entry))
+        return list(self._executor.map(lambda item: self.submit(*item), due))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Spool submitter failed: {e}")
+
+    def start(self):
+        if self.spool.enabled:
+            self._thread = threading.Thread(target=self._run, name="spool-submitter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False)
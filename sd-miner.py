@@ -6,33 +6,42 @@ import torch
 import logging
 import signal
 import threading
-import subprocess
 import json
 import asyncio
 from pathlib import Path
 from itertools import cycle
 from dotenv import load_dotenv
-from multiprocessing import Process, set_start_method
-from auth.generator import WalletGenerator
+from multiprocessing import Queue
 from sd_mining_core.stats import SDMinerStats
+from mining_common.config_snapshot import ConfigSnapshot, report_child_startup
+from mining_common.hardware import get_hardware_inventory
+from mining_common.launcher import ChildLauncher
+from mining_common.logging_utils import poll_log
+from mining_common.result_spool import SpoolSubmitter
+from mining_common.metrics import (
+    QueueMetrics, get_metrics, set_metrics, start_metrics_drain, track_poll_hit_ratio, start_metrics_server
+)
 
 from sd_mining_core.base import BaseConfig, ModelUpdater
 from sd_mining_core.utils import (
     check_cuda, get_hardware_description,
-    fetch_and_download_config_files, get_local_model_ids,
+    fetch_config_manifests, fetch_and_download_config_files, get_local_model_ids,
     post_request, log_response, submit_job_result,
-    initialize_logging_and_args,
+    initialize_logging_and_args, open_log_queue,
     load_default_model, reload_model,
 )
 
 class MinerConfig(BaseConfig):
-    def __init__(self, config_file, cuda_device_id=0):
-        super().__init__(config_file, cuda_device_id)
-        if not self.skip_signature:
-            self.wallet_generator = WalletGenerator(config_file, abi_file = os.path.join(os.path.dirname(__file__), 'auth', 'abi.json'))
+    def __init__(self, config_file, cuda_device_id=0, snapshot=None):
+        super().__init__(config_file, cuda_device_id, snapshot)
         load_dotenv()  # Load the environment variables
         
-        miner_ids = self._load_and_validate_miner_ids()
+        # The parent validates the miner IDs once and hands them to the children in the snapshot
+        if snapshot is not None and 'miner_ids' in snapshot.data:
+            miner_ids = snapshot.data['miner_ids']
+        else:
+            miner_ids = self._load_and_validate_miner_ids()
+        self.miner_ids = miner_ids
         self.miner_id = self._assign_miner_id(miner_ids, cuda_device_id)
         self.stats_manager = SDMinerStats()
 
@@ -57,16 +66,13 @@ class MinerConfig(BaseConfig):
                     composite_miner_ids.append(miner_id)
                 else:
                     # Miner ID is a valid EVM address without a suffix or with an empty suffix
-                    # Get the GPU UUID using nvidia-smi
-                    try:
-                        output = subprocess.check_output(["nvidia-smi", "-L"]).decode("utf-8")
-                        gpu_info = output.split("\n")[i].strip()
-                        gpu_uuid_segment = gpu_info.split("GPU-")[1].split("-")[0]
-                        short_uuid = gpu_uuid_segment[:6]
-                        composite_miner_id = f"{evm_address}-{short_uuid}"
+                    # Append the GPU UUID from the hardware inventory
+                    gpu = get_hardware_inventory().gpu(i)
+                    if gpu is not None and "GPU-" in gpu.uuid:
+                        composite_miner_id = f"{evm_address}-{gpu.short_uuid}"
                         composite_miner_ids.append(composite_miner_id)
-                    except (subprocess.CalledProcessError, IndexError):
-                        # nvidia-smi command failed or UUID not found
+                    else:
+                        # No GPU probed or UUID not found
                         print(f"WARNING: Failed to retrieve GPU UUID for GPU {i}. Using original miner ID.")
                         composite_miner_ids.append(miner_id)
             else:
@@ -84,10 +90,13 @@ class MinerConfig(BaseConfig):
         else:
             raise ValueError("miner_id not found in .env.")
 
-def load_config(filename='config.toml', cuda_device_id=0):
+def get_config_path(filename='config.toml'):
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    config_path = os.path.join(base_dir, filename)
-    return MinerConfig(config_path, cuda_device_id)
+    return os.path.join(base_dir, filename)
+
+def load_config(filename='config.toml', cuda_device_id=0, snapshot=None):
+    config_path = snapshot.config_file if snapshot is not None else get_config_path(filename)
+    return MinerConfig(config_path, cuda_device_id, snapshot)
 
 def send_miner_request(config, model_id, min_deadline):
     request_data = {
@@ -111,10 +120,22 @@ def send_miner_request(config, model_id, min_deadline):
     if response and warning_indicator in response.text:
         # Extract the warning message and use strip() to remove any trailing quotation marks
         warning_message = response.text.split(warning_indicator)[1].strip('"')
-        print(f"WARNING: {warning_message}")
+        poll_log.log(logging.WARNING, "sequencer_warning", f"WARNING: {warning_message}", echo=True)
 
     response_data = log_response(response, config.miner_id)
 
+    # Count the poll by result, and the job by its model
+    metrics = get_metrics()
+    if not response:
+        metrics.inc("miner_polls_total", model=model_id, result="error")
+    elif warning_indicator in response.text:
+        metrics.inc("miner_polls_total", model=model_id, result="warning")
+    elif response_data and 'job_id' in response_data:
+        metrics.inc("miner_polls_total", model=model_id, result="job")
+        metrics.inc("miner_jobs_fetched_total", model=response_data.get('model_id', model_id))
+    else:
+        metrics.inc("miner_polls_total", model=model_id, result="empty")
+
     try:
         # Check if the response contains a valid job and print the friendly message
         if response_data and 'job_id' in response_data and 'model_id' in response_data:
@@ -182,31 +203,45 @@ def process_jobs(config):
     model_id_to_send = current_lora_id if current_lora_id is not None else current_model_id
     job, request_latency = send_miner_request(config, model_id_to_send, config.min_deadline)
     if not job:
-        logging.info("No job received.")
+        poll_log.log(logging.INFO, "no_job", "No job received.")
         return False
 
     job_start_time = time.time()
     logging.info(f"Processing Request ID: {job['job_id']}. Model ID: {job['model_id']}.")
     
-    success = True
+    metrics = get_metrics()
+    device = str(config.cuda_device_id)
+    metrics.set("sd_jobs_in_progress", 1, device=device)
+    failure_reason = "submit_failed"
     try:
-        submit_job_result(config, config.miner_id, job, job['temp_credentials'], job_start_time, request_latency)
+        success = submit_job_result(config, config.miner_id, job, job['temp_credentials'], job_start_time, request_latency)
     except Exception as e:
         logging.error(f"Error processing job: {e}")
         success = False
+        failure_reason = "error"
+    finally:
+        metrics.set("sd_jobs_in_progress", 0, device=device)
+    if success:
+        metrics.inc("miner_jobs_completed_total", model=job['model_id'])
+    else:
+        metrics.inc("miner_jobs_failed_total", model=job['model_id'], reason=failure_reason)
     asyncio.run(update_job_stats(config, job['model_id'], success))
     
     return True
 
-def main(cuda_device_id):
+def main(cuda_device_id, config_snapshot, launched_at, metrics_queue, log_queue):
     try:
         torch.cuda.set_device(cuda_device_id)
-        config = load_config(cuda_device_id=cuda_device_id)
-        config = initialize_logging_and_args(config, cuda_device_id, miner_id=config.miner_id)
+        config = load_config(cuda_device_id=cuda_device_id, snapshot=config_snapshot)
+        config = initialize_logging_and_args(config, cuda_device_id, miner_id=config.miner_id, log_queue=log_queue)
+        set_metrics(QueueMetrics(metrics_queue))
+        if not config.skip_signature:
+            config.wallet_generator.warm_signatures([config.miner_id])
         
-        # The parent process should have already downloaded the model files
-        # Now we just need to load them into memory
-        fetch_and_download_config_files(config)
+        # The parent process should have already downloaded the model files and passes the
+        # manifests along; now we just need to load them into memory
+        fetch_and_download_config_files(config, config_snapshot.data.get('manifests'))
+        report_child_startup(launched_at, "sd_device")
 
         # Load the default model before entering the loop
         load_default_model(config)
@@ -237,17 +272,39 @@ if __name__ == "__main__":
 
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
-    set_start_method('spawn', force=True)
     
-    config = load_config()
+    # Parse config.toml and the command line and probe the GPUs once; the per-GPU processes are
+    # built from this snapshot
+    config_snapshot = ConfigSnapshot.capture(get_config_path()).with_data(hardware=get_hardware_inventory())
+    config = load_config(snapshot=config_snapshot)
     config = initialize_logging_and_args(config, miner_id=config.miner_id)
+    # The per-GPU processes are forked from a forkserver with the fork-safe modules preloaded
+    # (or spawned); it runs in its own process, so initializing CUDA here does not leak into them
+    launcher = ChildLauncher.from_config(config).configure()
 
     if config.num_cuda_devices > torch.cuda.device_count():
         print("Number of CUDA devices specified in config is greater than available. Exiting...")
         sys.exit(1)
     check_cuda()
 
-    fetch_and_download_config_files(config)
+    try:
+        manifests = fetch_config_manifests(config)
+    except Exception as e:
+        # The children fetch the manifests themselves if this fails
+        logging.error(f"Failed to fetch model manifests: {e}")
+        manifests = None
+    fetch_and_download_config_files(config, manifests)
+    config_snapshot = config_snapshot.with_data(miner_ids=config.miner_ids, manifests=manifests)
+
+    # The per-GPU processes report their metrics to this process's registry through a queue
+    metrics_queue = Queue(maxsize=10000)
+    start_metrics_drain(metrics_queue, get_metrics())
+    track_poll_hit_ratio(get_metrics())
+    if config.metrics_enabled:
+        start_metrics_server(get_metrics(), config.metrics_port, config.metrics_host)
+    # Results whose submission failed, spooled to disk by the per-GPU processes, are retried
+    # from here, including those left over from a previous run
+    SpoolSubmitter.from_config(config, config.result_spool).start()
 
     # Initialize and start model updater before processing tasks
     model_updater = ModelUpdater(config=config.__dict__)  # Assuming config.__dict__ provides necessary settings
@@ -265,16 +322,17 @@ if __name__ == "__main__":
             print(f"Creating processes for {config.num_cuda_devices} CUDA devices")
             for i in range(config.num_cuda_devices):
                 print(f"Creating process for CUDA device {i}")
-                p = Process(target=main, args=(i,))
-                p.start()
+                log_queue = open_log_queue(config, i, config._assign_miner_id(config.miner_ids, i))
+                p = launcher.start("sd_device", main, (i, config_snapshot, time.time(), metrics_queue, log_queue))
                 processes.append(p)
 
             for p in processes:
                 p.join()
         else:
             print(f"Creating process for specified CUDA device {config.specified_device_id}")
-            p = Process(target=main, args=(config.specified_device_id,))
-            p.start()
+            device_id = config.specified_device_id
+            log_queue = open_log_queue(config, device_id, config._assign_miner_id(config.miner_ids, device_id))
+            p = launcher.start("sd_device", main, (device_id, config_snapshot, time.time(), metrics_queue, log_queue))
             processes.append(p)
             p.join()
     except Exception as e:
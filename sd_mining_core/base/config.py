@@ -2,27 +2,41 @@ import os
 import sys
 import toml
 import time
-import requests
 import argparse
 from auth.generator import WalletGenerator
+from mining_common.hardware import set_hardware_inventory
+from mining_common.http_client import HTTPClientFactory
+from mining_common.result_spool import ResultSpool
 
 class BaseConfig:
-    def __init__(self, config_file, cuda_device_id=0):
-        try:
-            self.config = toml.load(config_file)
-        except Exception as e:
-            raise FileNotFoundError(f"Failed to load configuration file: {config_file}. Error: {e}")
+    def __init__(self, config_file, cuda_device_id=0, snapshot=None):
+        # Take the configuration and command line from the parent's ConfigSnapshot if given
+        if snapshot is not None:
+            self.config = snapshot.config
+        else:
+            try:
+                self.config = toml.load(config_file)
+            except Exception as e:
+                raise FileNotFoundError(f"Failed to load configuration file: {config_file}. Error: {e}")
+
+        # Reuse the parent's hardware inventory instead of probing the GPUs again
+        if snapshot is not None and 'hardware' in snapshot.data:
+            set_hardware_inventory(snapshot.data['hardware'])
 
         # Parse all arguments
-        args = self.parse_args()
+        args = self.parse_args(snapshot.argv[1:] if snapshot is not None else None)
 
         self.cuda_device_id = cuda_device_id
         self.num_cuda_devices = int(self.config['system'].get('num_cuda_devices', 1))
         self.log_filename = self.config['logging'].get('sd_log_filename', 'sd_miner.log')
+        self.log_max_bytes = int(self.config['logging'].get('max_mb', 100) * 1024 * 1024)
+        self.log_backup_count = int(self.config['logging'].get('backup_count', 5))
+        self.poll_log_interval = self.config['logging'].get('poll_log_interval', 60)
         self.base_url = self.config['service']['base_url']
         self.signal_url = self.config['service']['signal_url']
         self.sd_timeout_seconds = self.config['service']['sd_timeout_seconds']
         self.s3_bucket = self.config['storage']['s3_bucket']
+        self.s3_endpoint_url = self.config['storage'].get('s3_endpoint_url') or None
         self.base_dir = os.path.expanduser(self.config['storage'].get('base_dir', '.'))
         self.keys_dir = os.path.expanduser(self.config['storage'].get('keys_dir', '.'))
         self.model_config_url = self.config['model_config']['model_config_url']
@@ -37,6 +51,26 @@ class BaseConfig:
         self.sleep_duration = int(self.config['system'].get('sleep_duration', 2))
         self.reload_interval = int(self.config['system'].get('reload_interval', 600))
 
+        launcher_config = self.config.get('launcher', {})
+        self.launcher_start_method = launcher_config.get('start_method', 'forkserver')
+        self.launcher_preload = launcher_config.get('sd_preload', [])
+        self.launcher_spawn_kinds = launcher_config.get('spawn_kinds', [])
+
+        metrics_config = self.config.get('metrics', {})
+        self.metrics_enabled = metrics_config.get('enabled', False)
+        self.metrics_host = metrics_config.get('host', '0.0.0.0')
+        self.metrics_port = int(metrics_config.get('sd_port', 9400))
+
+        spool_config = self.config.get('result_spool', {})
+        self.spool_enabled = spool_config.get('enabled', True)
+        self.spool_dir = spool_config.get('dir', '~/.cache/heurist/spool')
+        self.spool_interval = spool_config.get('interval', 1)
+        self.spool_batch_size = spool_config.get('batch_size', 16)
+        self.spool_max_concurrency = spool_config.get('max_concurrency', 4)
+        self.spool_request_timeout = spool_config.get('request_timeout', 10)
+        self.spool_max_backoff = spool_config.get('max_backoff', 30)
+        self.result_spool = ResultSpool.from_config(self, 'sd')
+
         self.last_heartbeat = time.time() - 10000
         self.loaded_models = {}
         self.loaded_loras = {}
@@ -53,13 +87,23 @@ class BaseConfig:
         self.specified_device_id = args["cuda_device_id"]
 
         self.version = self.config['versions'].get('sd_version', 'unknown')
-        self.session = requests.Session()
+        http_config = self.config.get('http', {})
+        self.http_connect_timeout = http_config.get('connect_timeout', 5)
+        self.http_read_timeout = http_config.get('read_timeout', 30)
+        self.http_retries = http_config.get('retries', 2)
+        self.http_backoff = http_config.get('backoff', 0.2)
+        self.http_dns_ttl = http_config.get('dns_ttl', 300)
+        self.http2 = http_config.get('http2', False)
+
+        # One job at a time per GPU process; the parent also fetches the manifests
+        self.http = HTTPClientFactory.from_config(self, pool_size=4)
+        self.session = self.http.session()
 
-        # Create an instance of WalletGenerator
+        # Create an instance of WalletGenerator, only needed to sign submissions
         abi_file = os.path.join(os.path.dirname(__file__), '..', '..', 'auth', 'abi.json')
-        self.wallet_generator = WalletGenerator(config_file, abi_file)
+        self.wallet_generator = WalletGenerator(config_file, abi_file) if not self.skip_signature else None
 
-    def parse_args(self):
+    def parse_args(self, argv=None):
         parser = argparse.ArgumentParser(description="Run the miner with configurable settings.")
         parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"], type=str.upper, help="Set the logging level (default: INFO)")
         parser.add_argument("--auto-confirm", default="no", choices=["y", "yes", "no"], type=str.lower, help="Automatically proceed with the download without confirmation ('y', 'yes' to confirm, 'no' otherwise)")
@@ -68,7 +112,7 @@ class BaseConfig:
         parser.add_argument("--skip-checksum", action="store_true", help="Skip checksum validation")
         parser.add_argument("--model-id", type=str, help="Specify the model ID to host (default: None)")
         parser.add_argument("--cuda-device-id", type=int, help="Specify the CUDA device ID to run SD miner (default: None)")
-        args = parser.parse_args()
+        args = parser.parse_args(argv)
 
         # Convert auto-confirm argument to a boolean flag
         auto_confirm = True if args.auto_confirm in ["y", "yes"] else False
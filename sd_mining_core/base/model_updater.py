@@ -16,7 +16,7 @@ class ModelUpdater:
         self.vae_config_url = self.config['vae_config_url']
         self.lora_config_url = self.config['lora_config_url']
         self.update_interval_seconds = update_interval_seconds
-        self.session = requests.Session()  # Use a session for connection pooling
+        self.session = self.config['http'].session()  # Use a session for connection pooling
 
     def calculate_model_checksum(self, file_path):
         sha256_hash = hashlib.sha256()
@@ -1,9 +1,10 @@
 import torch
 import logging
 import sys
+from mining_common.hardware import get_hardware_inventory
 
 def get_hardware_description(config):
-    return torch.cuda.get_device_name(config.cuda_device_id)
+    return get_hardware_inventory().description(config.cuda_device_id)
 
 def check_cuda():
     if not torch.cuda.is_available():
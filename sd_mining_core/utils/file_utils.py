@@ -71,12 +71,27 @@ def check_flux_dev_files(base_dir, flux_dev_file_downloads):
             return False
     return True
 
-def fetch_and_download_config_files(config):
+def fetch_config_manifests(config):
+    """
+    Fetches the model, VAE and LoRA manifests.
+
+    Returns:
+        dict: {"models": [...], "vaes": [...], "loras": [...]}
+    """
+    return {
+        "models": config.session.get(config.model_config_url).json(),
+        "vaes": config.session.get(config.vae_config_url).json(),
+        "loras": config.session.get(config.lora_config_url).json(),
+    }
+
+def fetch_and_download_config_files(config, manifests=None):
     try:
-        # Fetch configurations
-        models = requests.get(config.model_config_url, timeout=30).json()
-        vaes = requests.get(config.vae_config_url, timeout=30).json()
-        loras = requests.get(config.lora_config_url, timeout=30).json()
+        # Fetch configurations, unless the parent process already did (see fetch_config_manifests)
+        if manifests is None:
+            manifests = fetch_config_manifests(config)
+        models = manifests["models"]
+        vaes = manifests["vaes"]
+        loras = manifests["loras"]
 
         # If a specific model_id is provided, filter the configurations
         if config.specified_model_id:
@@ -1,5 +1,7 @@
 import logging
 import warnings
+import multiprocessing
+from mining_common.logging_utils import start_file_logging, configure_queue_logging, get_log_writer, poll_log
 
 def setup_warning_logging():
     """
@@ -12,32 +14,55 @@ def setup_warning_logging():
     logger = logging.getLogger('py.warnings')
     logger.setLevel(logging.WARNING)  # Adjust the level as needed
 
-def configure_logging(cuda_device_id, config, miner_id=None):
-    log_level = getattr(logging, config.log_level.upper(), logging.INFO)
-
+def get_log_filename(config, cuda_device_id, miner_id=None):
     # Construct the log filename using both cuda_device_id and miner_id
     base_log_filename = config.log_filename.split('.')[0]
     if miner_id is not None:
-        process_log_filename = f"{base_log_filename}_{cuda_device_id}_{miner_id}.log"
+        return f"{base_log_filename}_{cuda_device_id}_{miner_id}.log"
+    return f"{base_log_filename}_{cuda_device_id}.log"
+
+def configure_logging(cuda_device_id, config, miner_id=None, log_queue=None):
+    """
+    Logs to the per-device log file through a listener thread that rotates it at
+    log_max_bytes. The parent process owns the log files; a per-GPU process passes the
+    log_queue of its file's writer in the parent and only sends its records there.
+
+    Returns:
+        LogWriter or None: The writer of the log file if this process owns it.
+    """
+    log_level = getattr(logging, config.log_level.upper(), logging.INFO)
+    poll_log.interval = config.poll_log_interval
+
+    writer = None
+    if log_queue is not None:
+        configure_queue_logging(log_queue, log_level)
     else:
-        process_log_filename = f"{base_log_filename}_{cuda_device_id}.log"
-    print(f"Configuring log level to: {logging.getLevelName(log_level)}. Log file name: {process_log_filename}")  # Verifying log level
-    
-    # Setup logging with the configured filename and log level
-    logging.basicConfig(
-        filename=process_log_filename,
-        filemode='a',
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=log_level
-    )
+        process_log_filename = get_log_filename(config, cuda_device_id, miner_id)
+        print(f"Configuring log level to: {logging.getLevelName(log_level)}. Log file name: {process_log_filename}")  # Verifying log level
+
+        # Setup logging with the configured filename and log level
+        writer = start_file_logging(
+            process_log_filename, log_level, max_bytes=config.log_max_bytes, backup_count=config.log_backup_count
+        )
 
     setup_warning_logging()
 
     # Optionally, set higher log levels for external libraries to reduce noise
     for ext_logger in ['urllib3', 'botocore']:
         logging.getLogger(ext_logger).setLevel(logging.CRITICAL)
+    return writer
+
+def open_log_queue(config, cuda_device_id, miner_id=None):
+    """
+    Returns a queue for a per-GPU process to send its log records to, written to its log
+    file by a listener thread of this process.
+    """
+    writer = get_log_writer(
+        get_log_filename(config, cuda_device_id, miner_id), config.log_max_bytes, config.log_backup_count
+    )
+    return writer.listen(multiprocessing.Queue())
         
-def initialize_logging_and_args(config, cuda_device_id=None, miner_id=None):
+def initialize_logging_and_args(config, cuda_device_id=None, miner_id=None, log_queue=None):
     try:
         # Retrieve parsed argument values from the config object
         log_level = config.log_level
@@ -69,7 +94,7 @@ def initialize_logging_and_args(config, cuda_device_id=None, miner_id=None):
             cuda_device_id = 0  # Default value if not provided
 
         # Configure logging with the potentially updated config
-        configure_logging(cuda_device_id, config, miner_id)
+        configure_logging(cuda_device_id, config, miner_id, log_queue)
 
     except Exception as e:
         # Here, you can decide how you want to handle the exception.
@@ -5,6 +5,7 @@ import io
 import gc
 import logging
 import time
+from mining_common.metrics import get_metrics
 from diffusers import AutoencoderKL, DPMSolverMultistepScheduler
 from vendor.lpw_stable_diffusion_xl import StableDiffusionXLLongPromptWeightingPipeline
 from vendor.lpw_stable_diffusion import StableDiffusionLongPromptWeightingPipeline
@@ -90,6 +91,7 @@ def load_model(config, model_id):
 
     loading_latency = time.time() - start_time
     logging.info(f"Model {model_id} loaded in {loading_latency:.2f} seconds.")
+    get_metrics().observe("miner_model_load_seconds", loading_latency, model=model_id, device=str(config.cuda_device_id))
 
     return pipe, loading_latency
 
@@ -108,6 +110,7 @@ def load_lora_weights(config, pipe, base_model_type, lora_id):
     try:
         pipe.load_lora_weights(lora_file_path)
         config.loaded_loras[lora_id] = pipe
+        set_model_loaded(config, lora_id, True)
         return pipe
     except Exception as e:
         raise ValueError(f"Failed to load LoRa weights for '{lora_id}': {e}")
@@ -115,16 +118,22 @@ def load_lora_weights(config, pipe, base_model_type, lora_id):
 def unload_model(config, model_id):
     if model_id in config.loaded_models:
         del config.loaded_models[model_id]
+        set_model_loaded(config, model_id, False)
         torch.cuda.empty_cache()
         gc.collect()
 
 def unload_lora_weights(config, pipe, lora_id):
     if lora_id in config.loaded_loras:
         del config.loaded_loras[lora_id]
+        set_model_loaded(config, lora_id, False)
         pipe.unload_lora_weights()
         torch.cuda.empty_cache()
         gc.collect()
 
+def set_model_loaded(config, model_id, loaded):
+    """Reports whether a model or LoRA is loaded on the device in the miner_model_loaded gauge."""
+    get_metrics().set("miner_model_loaded", 1 if loaded else 0, model=model_id, device=str(config.cuda_device_id))
+
 def load_default_model(config):
     model_ids = get_local_model_ids(config)
     if not model_ids:
@@ -144,6 +153,7 @@ def load_default_model(config):
     if base_model_id not in config.loaded_models:
         current_model, _ = load_model(config, default_model_id)
         config.loaded_models[base_model_id] = current_model
+        set_model_loaded(config, base_model_id, True)
         logging.info(f"Default model {default_model_id} (base: {base_model_id}) loaded successfully.")
 
 def reload_model(config, model_id_from_signal):
@@ -161,6 +171,7 @@ def reload_model(config, model_id_from_signal):
     current_model, _ = load_model(config, model_id_from_signal)
     base_model_id_from_signal = config.model_configs[model_id_from_signal]['base'] if 'base' in config.model_configs[model_id_from_signal] else model_id_from_signal
     config.loaded_models[base_model_id_from_signal] = current_model
+    set_model_loaded(config, base_model_id_from_signal, True)
     if base_model_id_from_signal != model_id_from_signal:
         logging.info(f"Received model {model_id_from_signal} (base: {base_model_id_from_signal}) loaded successfully.")
     else:
@@ -1,8 +1,12 @@
 import os
+import json
 import requests
 import logging
 import time
 import boto3
+from mining_common.metrics import get_metrics
+from mining_common.logging_utils import poll_log
+from mining_common.result_spool import is_retryable
 from .model_utils import execute_model
 
 def post_request(config, url, data, miner_id=None):
@@ -20,9 +24,14 @@ def post_request(config, url, data, miner_id=None):
     return None
 
 def log_response(response, miner_id=None):
+    """
+    Returns the JSON object of a /miner_request response, or None. The response body is only
+    logged at DEBUG, and a missing response at most once per poll_log_interval, since this
+    runs on every poll.
+    """
     miner_id_info = f" for miner_id {miner_id}" if miner_id else ""
     if response:
-        logging.info(f"Response from server{miner_id_info}: {response.text}")
+        logging.debug(f"Response from server{miner_id_info}: {response.text}")
         try:
             data = response.json()
             if isinstance(data, dict):
@@ -32,7 +41,7 @@ def log_response(response, miner_id=None):
         except ValueError as ve:
             pass
     else:
-        logging.warning(f"No response received{miner_id_info}")
+        poll_log.log(logging.WARNING, "no_response", f"No response received{miner_id_info}")
     return None
 
 def upload_image_to_s3(s3_client, image_data, bucket, key):
@@ -43,12 +52,42 @@ def upload_image_to_s3(s3_client, image_data, bucket, key):
     except Exception as e:
         logging.error(f"Failed to upload image to S3: {e}")
 
+def s3_endpoint_options(config):
+    """
+    Returns the boto3 client options: the pool, timeouts and retries of config.http, and the
+    endpoint of a custom S3-compatible storage, if one is configured.
+    """
+    client_config = config.http.s3_config()
+    if not config.s3_endpoint_url:
+        return {'config': client_config}
+    from botocore.config import Config
+    return {
+        'endpoint_url': config.s3_endpoint_url,
+        'config': client_config.merge(Config(s3={'addressing_style': 'path'})),
+    }
+
+# The S3 client of the last job's temporary credentials, and those credentials
+_s3_client = (None, None)
+
+def get_s3_client(config, temp_credentials):
+    """
+    Returns an S3 client for the temporary credentials of a job. The client is reused while
+    the sequencer hands out the same credentials, so uploads keep their warm connections.
+    """
+    global _s3_client
+    client, credentials = _s3_client
+    if client is None or credentials != tuple(temp_credentials):
+        client = boto3.client('s3', 
+                              aws_access_key_id=temp_credentials[0], 
+                              aws_secret_access_key=temp_credentials[1], 
+                              aws_session_token=temp_credentials[2],
+                              **s3_endpoint_options(config))
+        _s3_client = (client, tuple(temp_credentials))
+    return client
+
 def execute_inference_and_upload(config, miner_id, job, temp_credentials):
     """Executes model inference and uploads the result to S3, returning inference time."""
-    s3 = boto3.client('s3', 
-                      aws_access_key_id=temp_credentials[0], 
-                      aws_secret_access_key=temp_credentials[1], 
-                      aws_session_token=temp_credentials[2])
+    s3 = get_s3_client(config, temp_credentials)
 
     image_data, inference_latency, loading_latency = execute_model(config, job['model_id'], job['model_input']['SD']['prompt'], job['model_input']['SD']['neg_prompt'], job['model_input']['SD']['height'], job['model_input']['SD']['width'], job['model_input']['SD']['num_iterations'], job['model_input']['SD']['guidance_scale'], job['model_input']['SD']['seed'])
     
@@ -61,7 +100,13 @@ def execute_inference_and_upload(config, miner_id, job, temp_credentials):
     return s3_key, inference_latency, loading_latency, upload_latency
 
 def submit_job_result(config, miner_id, job, temp_credentials, job_start_time, request_latency):
-    """Submits the job result after processing and logs the total and inference times."""
+    """
+    Submits the job result after processing, logs the total and inference times and records
+    them in the sd_job_phase_seconds histogram.
+
+    Returns:
+        bool: True if the result was submitted, False if the submission failed.
+    """
     s3_key, inference_latency, loading_latency, upload_latency = execute_inference_and_upload(config, miner_id, job, temp_credentials)
     # Construct result payload with latency data
     result = {
@@ -81,7 +126,7 @@ def submit_job_result(config, miner_id, job, temp_credentials, job_start_time, r
         result["identity_address"] = identity_address
     try:
         start_time = time.time()  # Start measuring time for miner_submit call
-        response = requests.post(config.base_url + "/miner_submit", json=result)
+        response = config.session.post(config.base_url + "/miner_submit", json=result)
         response.raise_for_status()
         end_time = time.time()  # End measuring time
 
@@ -109,8 +154,25 @@ def submit_job_result(config, miner_id, job, temp_credentials, job_start_time, r
 
         # Log the compiled message
         logging.info(latencies_log)
+
+        metrics = get_metrics()
+        phases = {
+            "fetch": request_latency, "load": loading_latency, "inference": inference_latency,
+            "upload": upload_latency, "submit": submit_latency,
+        }
+        for phase, seconds in phases.items():
+            if seconds is not None:
+                metrics.observe("sd_job_phase_seconds", seconds, phase=phase)
+        return True
         
     except requests.exceptions.RequestException as err:
         logging.error(f"Error occurred during job submission: {err}")
+        # The image is already uploaded: leave the retries to the spool's background submitter
+        status_code = err.response.status_code if err.response is not None else None
+        if is_retryable(status_code):
+            config.result_spool.put(
+                job['job_id'], config.base_url + "/miner_submit", json.dumps(result), job_start_time + config.sd_timeout_seconds
+            )
+        return False
 
 